@@ -8,13 +8,55 @@ import os
 import json
 import csv
 from pathlib import Path
-from PIL import Image
 from datetime import datetime
 import uuid
+import hashlib
+
+from shard_archive import ShardWriter, DEFAULT_MAX_SHARD_BYTES
+from image_layout import check_layout, image_relative_path
+from dataset_audit import load_quarantine, quarantine_key
+from category_resolver import CategoryResolver, load_category_catalog, DEFAULT_CATALOG_FILE
+from nutrient_engine import NutrientEngine, NUTRIENTS
+from nutrition_index import NutritionIndex, INDEX_FILENAME
+from metadata_store import MetadataStore, DB_FILENAME
+from autocomplete_index import builder_from_data, AUTOCOMPLETE_FILENAME
+
+# Espace de noms des image_id (uuid5 du chemin source)
+IMAGE_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "http://example.org/food-ontology#FoodImage")
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Colonnes du CSV nutritionnel
+NUTRITIONAL_HEADERS = [
+    'food_name', 'category', 'owl_class', 'food_type', 'region', 'cooking_method',
+    'main_ingredient', 'calories_per_100g', 'proteins', 'carbohydrates', 'fats',
+    'fiber', 'sodium', 'sugar', 'ingredients', 'allergens', 'description',
+    'spice_level', 'cultural_significance'
+]
 
 class AfricanMiddleEasternFoodProcessor:
-    def __init__(self, base_data_dir="./african_middle_eastern_data"):
+    def __init__(self, base_data_dir="./african_middle_eastern_data", category_catalog_file=DEFAULT_CATALOG_FILE,
+                 layout="flat", output_format="files", max_shard_bytes=DEFAULT_MAX_SHARD_BYTES,
+                 use_metadata_db=False, allow_unserved_layout=False):
+        check_layout(layout, allow_unserved_layout)
+        if output_format not in ("files", "shards"):
+            raise ValueError(f"Format de sortie inconnu: {output_format}")
+        
         self.base_dir = Path(base_data_dir)
+        # Disposition des images: 'flat' ou 'sharded' (voir image_layout.py)
+        self.layout = layout
+        # Sortie: un fichier par image, ou archives tar indexées (voir shard_archive.py)
+        self.output_format = output_format
+        self.max_shard_bytes = max_shard_bytes
+        self.shards_dir = self.base_dir / "shards"
+        # Date de traitement imposée (runs partitionnés reproductibles), sinon maintenant
+        self.processing_date = None
         self.images_dir = self.base_dir / "images"
         self.metadata_dir = self.base_dir / "metadata"
         self.nutritional_dir = self.base_dir / "nutritional"
@@ -24,192 +66,23 @@ class AfricanMiddleEasternFoodProcessor:
             directory.mkdir(parents=True, exist_ok=True)
             print(f"📁 Dossier créé: {directory}")
         
-        # Mapping pour vos plats spécifiques
-        self.food_category_mapping = {
-            "brown_chapati": {
-                "class": "CookedFood", 
-                "type": "pain_plat", 
-                "main_ingredient": "whole_wheat_flour,water,salt",
-                "region": "East_Africa",
-                "cooking_method": "grilled"
-            },
-            "white_chapati": {
-                "class": "CookedFood", 
-                "type": "pain_plat", 
-                "main_ingredient": "wheat_flour,water,salt",
-                "region": "East_Africa", 
-                "cooking_method": "grilled"
-            },
-            "busara_whole_maize_and_finger_millet_porridge": {
-                "class": "CookedFood",
-                "type": "porridge_cereales",
-                "main_ingredient": "maize,finger_millet,water,milk",
-                "region": "East_Africa",
-                "cooking_method": "boiled"
-            },
-            "drop_scones": {
-                "class": "CookedFood",
-                "type": "pancakes",
-                "main_ingredient": "flour,milk,eggs,sugar,baking_powder",
-                "region": "British",
-                "cooking_method": "grilled"
-            },
-            "fried_egg_mayai_ya_kukaangwa": {
-                "class": "CookedFood",
-                "type": "plat_oeufs",
-                "main_ingredient": "eggs,oil,salt",
-                "region": "East_Africa",
-                "cooking_method": "fried"
-            },
-            "meat_samosa_sambusa_ya_nyama": {
-                "class": "CookedFood",
-                "type": "samosa",
-                "main_ingredient": "wheat_flour,beef,onions,spices,oil",
-                "region": "East_Africa_Middle_East",
-                "cooking_method": "deep_fried"
-            },
-            "vegetable_samosa_sambusa_ya_mboga": {
-                "class": "CookedFood",
-                "type": "samosa",
-                "main_ingredient": "wheat_flour,vegetables,onions,spices,oil",
-                "region": "East_Africa_Middle_East",
-                "cooking_method": "deep_fried"
-            },
-            "omelette": {
-                "class": "CookedFood",
-                "type": "plat_oeufs", 
-                "main_ingredient": "eggs,milk,salt,oil",
-                "region": "International",
-                "cooking_method": "fried"
-            },
-            "spanish_omelette": {
-                "class": "CookedFood",
-                "type": "plat_oeufs",
-                "main_ingredient": "eggs,potatoes,onions,oil,salt",
-                "region": "European",
-                "cooking_method": "fried"
-            },
-            "pancakes_chapati_za_maji": {
-                "class": "CookedFood",
-                "type": "pancakes",
-                "main_ingredient": "flour,milk,eggs,sugar,baking_powder",
-                "region": "International",
-                "cooking_method": "grilled"
-            },
-            "stir_fried_cabbage": {
-                "class": "CookedFood",
-                "type": "legumes_sautes",
-                "main_ingredient": "cabbage,onions,tomatoes,oil",
-                "region": "East_Africa",
-                "cooking_method": "stir_fried"
-            },
-            "sukumawiki_stir_fried_kales": {
-                "class": "CookedFood",
-                "type": "legumes_sautes",
-                "main_ingredient": "kale,onions,tomatoes,oil",
-                "region": "East_Africa",
-                "cooking_method": "stir_fried"
-            },
-            "terere_stir_fried_amaranth_leaves": {
-                "class": "CookedFood",
-                "type": "legumes_sautes",
-                "main_ingredient": "amaranth_leaves,onions,tomatoes,oil",
-                "region": "East_Africa",
-                "cooking_method": "stir_fried"
-            },
-            "tosti_mayai_egg_toast": {
-                "class": "CookedFood",
-                "type": "plat_oeufs",
-                "main_ingredient": "bread,eggs,oil,salt",
-                "region": "East_Africa",
-                "cooking_method": "fried"
-            },
-            "mrenda_and_seveve_jute_mallow_and_pumpkin": {
-                "class": "CookedFood",
-                "type": "legumes_sautes",
-                "main_ingredient": "jute_mallow,pumpkin_leaves,onions,oil",
-                "region": "East_Africa",
-                "cooking_method": "stir_fried"
-            },
-            "roumy_cheese": {
-                "class": "ManufacturedFood",
-                "type": "fromage",
-                "main_ingredient": "milk,salt,rennet,cultures",
-                "region": "Middle_East",
-                "cooking_method": "fermented"
-            },
-            "kebda": {
-                "class": "CookedFood",
-                "type": "abats",
-                "main_ingredient": "liver,onions,spices,oil",
-                "region": "Middle_East",
-                "cooking_method": "fried"
-            },
-            "bamia_the_egyptian_okra": {
-                "class": "CookedFood",
-                "type": "ragout",
-                "main_ingredient": "okra,tomatoes,onions,garlic,spices",
-                "region": "Middle_East",
-                "cooking_method": "stewed"
-            },
-            "egyptian_rice_with_noodles": {
-                "class": "CookedFood",
-                "type": "riz_compose",
-                "main_ingredient": "rice,noodles,oil,salt",
-                "region": "Middle_East",
-                "cooking_method": "boiled"
-            },
-            "malfuf_mahshi": {
-                "class": "CookedFood",
-                "type": "legumes_farcis",
-                "main_ingredient": "cabbage,rice,meat,spices,tomatoes",
-                "region": "Middle_East",
-                "cooking_method": "stuffed_boiled"
-            },
-            "molokhia": {
-                "class": "CookedFood",
-                "type": "soupe_epaisse",
-                "main_ingredient": "molokhia_leaves,broth,garlic,coriander",
-                "region": "Middle_East",
-                "cooking_method": "boiled"
-            },
-            "egyptian_lamb_kofta": {
-                "class": "CookedFood",
-                "type": "viande_hachee",
-                "main_ingredient": "lamb,onions,parsley,spices,oil",
-                "region": "Middle_East",
-                "cooking_method": "grilled"
-            },
-            "stuffed_grape_leaves": {
-                "class": "CookedFood",
-                "type": "legumes_farcis",
-                "main_ingredient": "grape_leaves,rice,herbs,oil,lemon",
-                "region": "Middle_East",
-                "cooking_method": "stuffed_boiled"
-            },
-            "kibbe_quipe": {
-                "class": "CookedFood",
-                "type": "boulette",
-                "main_ingredient": "bulgur,meat,onions,spices,oil",
-                "region": "Middle_East",
-                "cooking_method": "fried"
-            },
-            "tahini_arabic": {
-                "class": "ManufacturedFood",
-                "type": "pate_graines",
-                "main_ingredient": "sesame_seeds",
-                "region": "Middle_East",
-                "cooking_method": "ground"
-            },
-            # Par défaut
-            "default": {
-                "class": "Food", 
-                "type": "aliment", 
-                "main_ingredient": "unknown",
-                "region": "Unknown",
-                "cooking_method": "unknown"
-            }
-        }
+        # Mapping pour vos plats spécifiques (catalogue JSON + résolution floue)
+        self.food_category_mapping = load_category_catalog(category_catalog_file)
+        self.category_resolver = CategoryResolver(self.food_category_mapping)
+        
+        # Base SQLite des métadonnées, tenue à jour pendant le traitement (voir metadata_store.py)
+        self.metadata_store = MetadataStore(self.metadata_dir / DB_FILENAME) if use_metadata_db else None
+        
+        # Moteur nutritionnel du traitement au fil de l'eau et lignes déjà calculées
+        # (voir nutritional_row; un seul thread, celui du traitement, s'en sert)
+        self.nutrient_engine = None
+        self.stream_rows = {}
+    
+    def close(self):
+        """Fermer la base des métadonnées"""
+        if self.metadata_store is not None:
+            self.metadata_store.close()
+            self.metadata_store = None
     
     def clean_folder_name(self, folder_name):
         """Nettoyer et normaliser le nom de dossier"""
@@ -221,25 +94,22 @@ class AfricanMiddleEasternFoodProcessor:
     
     def get_food_category_info(self, category_name):
         """Obtenir les informations sur une catégorie d'aliment"""
-        category_key = category_name.lower()
-        
-        if category_key in self.food_category_mapping:
-            return self.food_category_mapping[category_key]
-        
-        return self.food_category_mapping["default"]
+        return self.category_resolver.resolve(category_name)
     
     def is_image_file(self, file_path):
         """Vérifier si le fichier est une image"""
         image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
         return file_path.suffix.lower() in image_extensions
     
-    def extract_image_metadata(self, image_path):
+    def extract_image_metadata(self, image_path, image_id=None):
         """Extraire les métadonnées d'une image"""
+        from PIL import Image
+        
         metadata = {
             'filename': image_path.name,
             'file_size': image_path.stat().st_size,
-            'creation_date': datetime.fromtimestamp(image_path.stat().st_ctime).isoformat(),
-            'image_id': str(uuid.uuid4())
+            'creation_date': datetime.fromtimestamp(image_path.stat().st_mtime).isoformat(),
+            'image_id': image_id or str(uuid.uuid4())
         }
         
         try:
@@ -256,93 +126,230 @@ class AfricanMiddleEasternFoodProcessor:
         
         return metadata
     
-    def process_images(self, source_dir):
-        """Traiter les images"""
+    def list_category_folders(self, source_path):
+        """Dossiers de catégories, triés pour un traitement reproductible"""
+        return sorted((f for f in Path(source_path).iterdir() if f.is_dir()), key=lambda f: f.name)
+    
+    def list_category_images(self, category_folder, quarantined=()):
+        """Images d'une catégorie, triées et sans celles en quarantaine"""
+        image_files = sorted((f for f in category_folder.iterdir() if self.is_image_file(f)), key=lambda f: f.name)
+        print(f"   📸 {len(image_files)} images trouvées")
+        
+        if quarantined:
+            kept = [f for f in image_files if quarantine_key(category_folder.name, f.name) not in quarantined]
+            if len(kept) < len(image_files):
+                print(f"   🚫 {len(image_files) - len(kept)} images en quarantaine ignorées")
+            image_files = kept
+        
+        return image_files
+    
+    def make_image_id(self, original_name, filename):
+        """Identifiant stable d'une image source (même valeur à chaque traitement)"""
+        return str(uuid.uuid5(IMAGE_ID_NAMESPACE, f"{original_name}/{filename}"))
+    
+    def process_image(self, image_file, image_number, cleaned_name, original_name, shard_writer=None):
+        """Copier (ou archiver) une image et retourner ses métadonnées, None en cas d'erreur"""
+        # Nouveau nom
+        new_image_name = f"{cleaned_name}_{image_number:03d}{image_file.suffix.lower()}"
+        image_id = self.make_image_id(original_name, image_file.name)
+        relative_path = image_relative_path(cleaned_name, new_image_name, image_id, self.layout)
+        new_image_path = self.base_dir / relative_path
+        
+        # Copier le fichier (ou l'ajouter au shard courant)
+        try:
+            if shard_writer is not None:
+                shard, offset, length = shard_writer.add(image_id, relative_path, image_file)
+                image_metadata = self.extract_image_metadata(image_file, image_id)
+                image_metadata.update({
+                    'filename': new_image_name,
+                    'shard': shard,
+                    'shard_offset': offset,
+                    'shard_length': length
+                })
+            else:
+                import shutil
+                new_image_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(image_file, new_image_path)
+                image_metadata = self.extract_image_metadata(new_image_path, image_id)
+            
+            if self.metadata_store is not None:
+                image_metadata['content_hash'] = file_sha256(image_file)
+            
+            # Métadonnées
+            image_metadata.update({
+                'category_name': cleaned_name,
+                'original_category_name': original_name,
+                'original_filename': image_file.name,
+                'processed_filename': new_image_name,
+                'relative_path': relative_path,
+                'image_number': image_number
+            })
+            
+            # Info catégorie
+            category_info = self.get_food_category_info(cleaned_name)
+            image_metadata.update(category_info)
+            
+            return image_metadata
+            
+        except Exception as e:
+            print(f"   ❌ Erreur copie {image_file.name}: {e}")
+            return None
+    
+    def source_signature(self, image_files):
+        """Empreinte des fichiers source d'une catégorie (noms, tailles, dates), sans les lire"""
+        digest = hashlib.sha1()
+        for image_file in image_files:
+            stat = image_file.stat()
+            digest.update(f"{image_file.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def processed_images_exist(self, images):
+        """Les fichiers produits par un traitement précédent sont-ils toujours là?"""
+        for img in images:
+            if img.get('shard'):
+                output = (self.shards_dir / img['shard']).with_suffix('.idx')
+            else:
+                output = self.base_dir / img['relative_path']
+            if not output.exists():
+                return False
+        return True
+    
+    def iter_processed_categories(self, source_dir, quarantine_file=None, partition=None, reuse=None):
+        """Traiter les images catégorie par catégorie: génère (nom nettoyé, données)
+        
+        `reuse` associe un nom de catégorie à une entrée de point de contrôle
+        ({'signature', 'data'}, voir population_journal.py): si la source n'a
+        pas changé, ses données sont reprises sans retraiter les images. Les
+        signatures calculées sont laissées dans `source_signatures`.
+        """
         source_path = Path(source_dir)
-        organized_data = {}
+        reuse = reuse or {}
+        self.source_signatures = {}
         
         print(f"🌍 Traitement depuis: {source_path}")
         
         if not source_path.exists():
             print(f"❌ Le dossier {source_path} n'existe pas!")
-            return {}
+            return
+        
+        shard_writer = None
+        if self.output_format == "shards":
+            shard_writer = ShardWriter(self.shards_dir, self.max_shard_bytes)
+            print(f"📦 Images archivées dans: {self.shards_dir}")
         
-        # Lister les dossiers
-        folders = [f for f in source_path.iterdir() if f.is_dir()]
+        quarantined = load_quarantine(quarantine_file)
+        if quarantined:
+            print(f"🚫 {len(quarantined)} images en quarantaine seront ignorées")
+        
+        # Lister les dossiers (ou reprendre la liste calculée pour la partition)
+        listing = getattr(partition, 'listing', None)
+        if listing is not None:
+            folders = [source_path / folder for folder in listing]
+        else:
+            folders = self.list_category_folders(source_path)
+            if partition is not None:
+                folders = [f for f in folders if partition.owns_category(f.name)]
         print(f"📁 {len(folders)} dossiers trouvés:")
         for folder in folders:
             print(f"   - {folder.name}")
         
-        for category_folder in folders:
-            original_name = category_folder.name
-            cleaned_name = self.clean_folder_name(original_name)
-            
-            print(f"\n🍽️ Traitement: {original_name} → {cleaned_name}")
-            
-            # Créer le dossier de destination
-            category_path = self.images_dir / cleaned_name
-            category_path.mkdir(exist_ok=True)
-            
-            images_info = []
-            image_count = 0
-            
-            # Traiter les images
-            image_files = [f for f in category_folder.iterdir() if self.is_image_file(f)]
-            print(f"   📸 {len(image_files)} images trouvées")
-            
-            for image_file in image_files:
-                image_count += 1
+        try:
+            for category_folder in folders:
+                original_name = category_folder.name
+                cleaned_name = self.clean_folder_name(original_name)
                 
-                # Nouveau nom
-                new_image_name = f"{cleaned_name}_{image_count:03d}{image_file.suffix.lower()}"
-                new_image_path = category_path / new_image_name
+                print(f"\n🍽️ Traitement: {original_name} → {cleaned_name}")
                 
-                # Copier le fichier
-                try:
-                    import shutil
-                    shutil.copy2(image_file, new_image_path)
-                    
-                    # Métadonnées
-                    image_metadata = self.extract_image_metadata(new_image_path)
-                    image_metadata.update({
-                        'category_name': cleaned_name,
-                        'original_category_name': original_name,
-                        'original_filename': image_file.name,
-                        'processed_filename': new_image_name,
-                        'relative_path': f"images/{cleaned_name}/{new_image_name}",
-                        'image_number': image_count
-                    })
-                    
-                    # Info catégorie
-                    category_info = self.get_food_category_info(cleaned_name)
-                    image_metadata.update(category_info)
+                images_info = []
+                
+                # Traiter les images (numérotées dans l'ordre trié, même si partitionnées)
+                if listing is not None:
+                    numbered = [(number, category_folder / filename) for number, filename in listing[original_name]]
+                else:
+                    image_files = self.list_category_images(category_folder, quarantined)
+                    numbered = [
+                        (number, image_file) for number, image_file in enumerate(image_files, 1)
+                        if partition is None or partition.owns_file(original_name, image_file.name)
+                    ]
+                
+                category_data = None
+                if partition is None:
+                    signature = self.source_signature(image_files)
+                    self.source_signatures[cleaned_name] = signature
+                    previous = reuse.get(cleaned_name)
+                    if (previous is not None and previous['signature'] == signature
+                            and previous['data']['category_info'] == self.get_food_category_info(cleaned_name)
+                            and self.processed_images_exist(previous['data']['images'])):
+                        category_data = previous['data']
+                        print(f"   ⏭️ Déjà traitée et acquittée: {category_data['total_images']} images reprises")
+                
+                if category_data is None:
+                    for image_number, image_file in numbered:
+                        image_metadata = self.process_image(image_file, image_number, cleaned_name, original_name, shard_writer)
+                        if image_metadata is not None:
+                            images_info.append(image_metadata)
                     
-                    images_info.append(image_metadata)
+                    print(f"   ✅ {len(images_info)} images copiées")
                     
-                except Exception as e:
-                    print(f"   ❌ Erreur copie {image_file.name}: {e}")
-            
-            organized_data[cleaned_name] = {
-                'images': images_info,
-                'total_images': len(images_info),
-                'category_info': self.get_food_category_info(cleaned_name),
-                'original_folder_name': original_name
-            }
-            
-            print(f"   ✅ {len(images_info)} images copiées")
+                    category_data = {
+                        'images': images_info,
+                        'total_images': len(images_info),
+                        'category_info': self.get_food_category_info(cleaned_name),
+                        'original_folder_name': original_name
+                    }
+                
+                # Une transaction SQLite par catégorie
+                if self.metadata_store is not None and partition is None:
+                    row = self.nutritional_row(cleaned_name, category_data)
+                    self.metadata_store.upsert_category(cleaned_name, category_data, row)
+                
+                yield cleaned_name, category_data
+        finally:
+            if shard_writer is not None:
+                shard_writer.close()
+        
+        self.report_category_resolution()
+    
+    def process_images(self, source_dir, quarantine_file=None, partition=None, save=True):
+        """Traiter les images (en ignorant celles de la liste de quarantaine)
+        
+        Avec `partition` (voir partitioned_ingest.py), seules les images de la
+        partition sont traitées et les résultats ne sont pas sauvegardés:
+        ils sont retournés pour être fusionnés.
+        """
+        organized_data = dict(self.iter_processed_categories(source_dir, quarantine_file, partition))
         
         # Sauvegarder les résultats
-        self.save_results(organized_data)
+        if save and partition is None and organized_data:
+            self.save_results(organized_data)
         return organized_data
     
-    def save_results(self, organized_data):
-        """Sauvegarder les résultats"""
+    def report_category_resolution(self):
+        """Afficher les catégories devinées ou non résolues"""
+        resolver = self.category_resolver
+        if resolver.guesses:
+            print(f"\n🔮 {len(resolver.guesses)} catégories devinées:")
+            for name, (key, score) in sorted(resolver.guesses.items()):
+                print(f"   - {name} → {key} (similarité {score})")
+        if resolver.unresolved:
+            print(f"\n❓ {len(resolver.unresolved)} catégories inconnues (→ default):")
+            for name in sorted(resolver.unresolved):
+                print(f"   - {name}")
+        if resolver.ambiguous:
+            print(f"\n⚖️ {len(resolver.ambiguous)} catégories ambiguës (→ default):")
+            for name, candidates in sorted(resolver.ambiguous.items()):
+                print(f"   - {name}: {', '.join(f'{key} ({score})' for key, score in candidates)}")
+    
+    def save_results(self, organized_data, rows=None):
+        """Sauvegarder les résultats (rows: lignes nutritionnelles déjà calculées, dans l'ordre)"""
         # Index JSON
         index_file = self.metadata_dir / "african_middle_eastern_food_index.json"
         summary = {
             'total_categories': len(organized_data),
             'total_images': sum(cat['total_images'] for cat in organized_data.values()),
-            'processing_date': datetime.now().isoformat(),
+            'processing_date': self.processing_date or datetime.now().isoformat(),
+            'layout': self.layout,
+            'output_format': self.output_format,
             'categories': organized_data
         }
         
@@ -351,50 +358,117 @@ class AfricanMiddleEasternFoodProcessor:
         print(f"📄 Index sauvé: {index_file}")
         
         # CSV nutritionnel
-        self.create_nutritional_csv(organized_data)
+        engine = self.create_nutrient_engine(organized_data)
+        rows = self.create_nutritional_csv(organized_data, engine, rows)
+        
+        # Index de recherche nutritionnelle
+        nutrition_index = NutritionIndex.from_engine(engine, list(organized_data))
+        index_path = nutrition_index.save(self.metadata_dir / INDEX_FILENAME)
+        print(f"🔎 Index nutritionnel sauvé: {index_path}")
+        
+        # Index d'autocomplétion (plats, ingrédients, alias): mêmes entrées que autocomplete_index.py
+        autocomplete = builder_from_data(organized_data, self.food_category_mapping, rows)
+        autocomplete_path = autocomplete.write(self.metadata_dir / AUTOCOMPLETE_FILENAME)
+        print(f"🔤 Index d'autocomplétion sauvé: {autocomplete_path}")
     
-    def create_nutritional_csv(self, organized_data):
-        """Créer le CSV nutritionnel"""
-        csv_file = self.nutritional_dir / "african_middle_eastern_nutritional.csv"
+    def load_nutrient_engine(self):
+        """Moteur nutritionnel avec la table de composition, sans plats"""
+        composition_file = self.nutritional_dir / "ingredient_composition.csv"
+        if composition_file.exists():
+            return NutrientEngine.from_csv(composition_file)
+        return NutrientEngine()
+    
+    def create_nutrient_engine(self, organized_data):
+        """Préparer le moteur nutritionnel à partir des ingrédients des catégories
         
-        headers = [
-            'food_name', 'category', 'owl_class', 'food_type', 'region', 'cooking_method',
-            'main_ingredient', 'calories_per_100g', 'proteins', 'carbohydrates', 'fats', 
-            'fiber', 'sodium', 'sugar', 'ingredients', 'allergens', 'description',
-            'spice_level', 'cultural_significance'
-        ]
+        Le moteur partagé du traitement au fil de l'eau est réutilisé s'il
+        contient déjà exactement ces catégories: rien n'est recalculé.
+        """
+        engine = self.nutrient_engine
+        if engine is None or engine.dish_names != list(organized_data):
+            engine = self.load_nutrient_engine()
+            engine.set_dishes({
+                category_name: category_data['category_info']['main_ingredient']
+                for category_name, category_data in organized_data.items()
+            })
+            engine.compute()
         
-        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(headers)
+        for category_name, missing in engine.missing_ingredients.items():
+            print(f"   ⚠️ {category_name}: composition inconnue pour {', '.join(missing)}")
+        
+        return engine
+    
+    def nutritional_row(self, category_name, category_data):
+        """Ligne nutritionnelle d'une catégorie, calculée une seule fois par le moteur du traitement
+        
+        Le moteur n'est pas protégé par un verrou: appeler depuis le thread du
+        traitement seulement, et transmettre la ligne aux autres threads.
+        """
+        row = self.stream_rows.get(category_name)
+        if row is not None:
+            return row
+        if self.nutrient_engine is None:
+            self.nutrient_engine = self.load_nutrient_engine()
+        self.nutrient_engine.add_dishes({category_name: category_data['category_info']['main_ingredient']})
+        row = self.nutritional_rows({category_name: category_data}, self.nutrient_engine)[0]
+        self.stream_rows[category_name] = row
+        return row
+    
+    def nutritional_rows(self, organized_data, engine=None):
+        """Lignes nutritionnelles (dicts indexés par NUTRITIONAL_HEADERS) des catégories"""
+        if engine is None:
+            engine = self.create_nutrient_engine(organized_data)
+        
+        rows = []
+        for category_name, category_data in organized_data.items():
+            category_info = category_data['category_info']
+            profile = engine.get_profile(category_name)
+            nutrients = ["" if profile[n] is None else profile[n] for n in NUTRIENTS]
             
-            for category_name, category_data in organized_data.items():
-                category_info = category_data['category_info']
-                
-                row = [
-                    category_name,  # food_name
-                    category_info['type'],  # category
-                    category_info['class'],  # owl_class
-                    category_info['type'],   # food_type
-                    category_info['region'], # region
-                    category_info['cooking_method'], # cooking_method
-                    category_info['main_ingredient'],  # main_ingredient
-                    250,  # calories_per_100g - VALEUR PAR DÉFAUT
-                    10,   # proteins - VALEUR PAR DÉFAUT
-                    30,   # carbohydrates - VALEUR PAR DÉFAUT
-                    5,    # fats - VALEUR PAR DÉFAUT
-                    3,    # fiber - VALEUR PAR DÉFAUT
-                    200,  # sodium - VALEUR PAR DÉFAUT
-                    2,    # sugar - VALEUR PAR DÉFAUT
-                    category_info['main_ingredient'],  # ingredients
-                    "",   # allergens - À REMPLIR
-                    f"Plat traditionnel: {category_name.replace('_', ' ')}", # description
-                    "medium", # spice_level par défaut
-                    ""    # cultural_significance - À REMPLIR
-                ]
-                writer.writerow(row)
+            row = [
+                category_name,  # food_name
+                category_info['type'],  # category
+                category_info['class'],  # owl_class
+                category_info['type'],   # food_type
+                category_info['region'], # region
+                category_info['cooking_method'], # cooking_method
+                category_info['main_ingredient'],  # main_ingredient
+                *nutrients,  # calories_per_100g ... sugar - calculés depuis les ingrédients
+                category_info['main_ingredient'],  # ingredients
+                "",   # allergens - À REMPLIR
+                f"Plat traditionnel: {category_name.replace('_', ' ')}", # description
+                "medium", # spice_level par défaut
+                ""    # cultural_significance - À REMPLIR
+            ]
+            rows.append(dict(zip(NUTRITIONAL_HEADERS, row)))
+        
+        return rows
+    
+    def create_nutritional_csv(self, organized_data, engine=None, rows=None):
+        """Créer le CSV nutritionnel; retourne les lignes écrites"""
+        csv_file = self.nutritional_dir / "african_middle_eastern_nutritional.csv"
+        if rows is None:
+            rows = self.nutritional_rows(organized_data, engine)
+        
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=NUTRITIONAL_HEADERS)
+            writer.writeheader()
+            writer.writerows(rows)
         
         print(f"📊 CSV nutritionnel créé: {csv_file}")
+        return rows
+    
+    def append_nutritional_rows(self, rows):
+        """Ajouter des lignes au CSV nutritionnel sans le réécrire"""
+        csv_file = self.nutritional_dir / "african_middle_eastern_nutritional.csv"
+        new_file = not csv_file.exists()
+        
+        with open(csv_file, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=NUTRITIONAL_HEADERS)
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+        return csv_file
 
 def main():
     processor = AfricanMiddleEasternFoodProcessor()
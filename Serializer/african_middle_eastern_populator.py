@@ -10,10 +10,15 @@ from pathlib import Path
 import requests
 import time
 
+from graph_statistics import GraphStatistics, MAX_LINKED_IMAGES, SUMMARY_FILENAME, SUMMARY_GRAPH
+from graph_fingerprint import GraphFingerprint, FingerprintVerifier, RDF_TYPE, numeric_lexical
+from nutrition_index import EXPORT_DECIMALS
+from population_journal import PopulationJournal, DeadLetterFile, journal_paths, payload_digest
+
 class AfricanMiddleEasternPopulatorFixed:
-    def __init__(self):
-        self.fuseki_server = "http://localhost:3030"
-        self.dataset_name = "african-middle-eastern-kg"
+    def __init__(self, fuseki_server="http://localhost:3030", dataset_name="african-middle-eastern-kg"):
+        self.fuseki_server = fuseki_server.rstrip("/")
+        self.dataset_name = dataset_name
         
         # ENDPOINTS CORRECTS POUR FUSEKI 5.4.0
         self.update_endpoint = f"{self.fuseki_server}/{self.dataset_name}/update"
@@ -24,6 +29,18 @@ class AfricanMiddleEasternPopulatorFixed:
         self.foods_added = 0
         self.images_added = 0
         self.errors = []
+        self.last_failure = {}
+        
+        # Journal des lots acquittés et lettres mortes (voir population_journal.py)
+        self.journal = None
+        self.dead_letters = None
+        self.batches_skipped = 0
+        
+        # Agrégats tenus à jour pendant la population (voir graph_statistics.py)
+        self.statistics = GraphStatistics()
+        
+        # Empreinte attendue du graphe, par plat (voir graph_fingerprint.py)
+        self.fingerprint = GraphFingerprint()
     
     def test_endpoints(self):
         """Test des endpoints Fuseki 5.4.0"""
@@ -126,35 +143,143 @@ class AfricanMiddleEasternPopulatorFixed:
             else:
                 error_msg = f"HTTP {response.status_code}: {response.text[:200]}"
                 self.errors.append(error_msg)
+                self.last_failure = {'status': response.status_code, 'response': response.text}
                 return False
                 
         except Exception as e:
             error_msg = f"Erreur SPARQL: {str(e)}"
             self.errors.append(error_msg)
+            self.last_failure = {'error': str(e)}
             return False
     
-    def add_food_with_specialization(self, food_data, images_list):
-        """Ajouter un plat avec ses spécificités"""
+    def open_journal(self, data_dir, resume=False):
+        """Journaliser les lots acquittés (resume: sauter ceux déjà acquittés)"""
+        journal_file, dead_letter_file = journal_paths(data_dir)
+        self.journal = PopulationJournal(journal_file, resume=resume)
+        self.dead_letters = DeadLetterFile(dead_letter_file, truncate=not resume)
+        if resume:
+            print(f"📒 Reprise: {len(self.journal.committed)} lots déjà acquittés")
+    
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.dead_letters.close()
+    
+    def send_batch(self, key, query):
+        """Envoyer un lot journalisé; None s'il était déjà acquitté (reprise)"""
+        if self.journal is None:
+            return self.execute_sparql_update(query)
+        
+        digest = payload_digest(query)
+        if self.journal.is_committed(key, digest):
+            self.batches_skipped += 1
+            return None
+        
+        success = self.execute_sparql_update(query)
+        if success:
+            self.journal.commit(key, digest)
+        else:
+            self.dead_letters.add(key, query, self.last_failure)
+        return success
+    
+    def execute_sparql_query(self, query, timeout=60):
+        """Exécuter un SELECT; retourne les bindings, ou None en cas d'échec"""
+        try:
+            response = requests.post(
+                self.query_endpoint,
+                data={'query': query},
+                headers={'Accept': 'application/sparql-results+json'},
+                timeout=timeout
+            )
+            if response.status_code == 200:
+                return response.json()['results']['bindings']
+            self.errors.append(f"HTTP {response.status_code}: {response.text[:200]}")
+        except Exception as e:
+            self.errors.append(f"Erreur SPARQL: {str(e)}")
+        return None
+    
+    def literal_value(self, value):
+        """Forme lexicale stockée d'un littéral écrit avec safe_string"""
+        if not value:
+            return ""
+        return str(value).replace('\n', ' ').replace('\r', ' ')
+    
+    def image_triples(self, food_uri, img, fallback_id, triples=None):
+        """Triplets d'une :FoodImage liée à son plat (triples: liste à compléter pour l'empreinte)"""
+        image_id = img.get('image_id', fallback_id)
+        image_uri = self.create_uri(image_id, 'image_')
+        
+        if triples is not None:
+            triples.extend([
+                (image_uri, RDF_TYPE, f"{self.food_ns}FoodImage"),
+                (image_uri, f"{self.food_ns}imagePath", self.literal_value(img.get('relative_path', ''))),
+                (image_uri, f"{self.food_ns}filename", self.literal_value(img.get('filename', ''))),
+                (food_uri.strip('<>'), f"{self.food_ns}hasImage", image_uri),
+            ])
+        
+        return f"""
+            <{image_uri}> a :FoodImage ;
+                        :imagePath "{self.safe_string(img.get('relative_path', ''))}" ;
+                        :filename "{self.safe_string(img.get('filename', ''))}" .
+            {food_uri} :hasImage <{image_uri}> .
+            """
+    
+    def add_food_images(self, food_name, images, linked=0):
+        """Ajouter uniquement des images à un plat déjà présent dans le graphe
+        
+        `linked`: images déjà liées au plat; comme pour une population complète,
+        un plat n'a jamais plus de MAX_LINKED_IMAGES images dans le graphe.
+        """
+        images = images[:max(0, MAX_LINKED_IMAGES - linked)]
+        if not images:
+            return True
+        
+        food_uri = f"<{self.create_uri(food_name)}>"
+        query = f"""
+        PREFIX : <{self.food_ns}>
+        
+        INSERT DATA {{
+        """
+        triples = []
+        for i, img in enumerate(images, linked):
+            query += self.image_triples(food_uri, img, f"{food_name}_{i}", triples)
+        query += "}"
+        
+        self.fingerprint.record_food(self.create_uri(food_name), triples)
+        
+        success = self.send_batch(f"images:{food_name}:{payload_digest(query)}", query)
+        if success is None:
+            return True
+        if success:
+            self.images_added += len(images)
+            self.statistics.add_images(food_name, len(images))
+        return success
+    
+    def build_food_update(self, food_data, images_list):
+        """Requête INSERT DATA d'un plat, ses triplets (pour l'empreinte) et ses images liées"""
         food_name = food_data.get('food_name', '').strip()
-        if not food_name:
-            return False
         
         # Informations spécialisées
         region = food_data.get('region', 'Unknown')
         cooking_method = food_data.get('cooking_method', 'cooked')
         owl_class = food_data.get('owl_class', 'Food')
         spice_level = food_data.get('spice_level', 'medium')
-        
-        print(f"🍽️ {food_name}")
-        print(f"    → Région: {region}")
-        print(f"    → Classe: {owl_class}")
-        print(f"    → Méthode: {cooking_method}")
-        print(f"    → Niveau d'épices: {spice_level}")
+        description = food_data.get('description', f'Plat traditionnel {region}')
         
         # URIs
-        food_uri = f"<{self.create_uri(food_name)}>"
+        food_iri = self.create_uri(food_name)
+        food_uri = f"<{food_iri}>"
         class_uri = f"<{self.food_ns}{owl_class}>"
         
+        triples = [
+            (food_iri, RDF_TYPE, f"{self.food_ns}{owl_class}"),
+            (food_iri, f"{self.food_ns}name", self.literal_value(food_name)),
+            (food_iri, f"{self.food_ns}description", self.literal_value(description)),
+            (food_iri, f"{self.food_ns}region", self.literal_value(region)),
+            (food_iri, f"{self.food_ns}cookingMethod", self.literal_value(cooking_method)),
+            (food_iri, f"{self.food_ns}spiceLevel", self.literal_value(spice_level)),
+        ]
+        
         # Requête SPARQL pour Fuseki 5.4.0
         query = f"""
         PREFIX : <{self.food_ns}>
@@ -164,7 +289,7 @@ class AfricanMiddleEasternPopulatorFixed:
         INSERT DATA {{
             {food_uri} a {class_uri} ;
                        :name "{self.safe_string(food_name)}" ;
-                       :description "{self.safe_string(food_data.get('description', f'Plat traditionnel {region}'))}" ;
+                       :description "{self.safe_string(description)}" ;
                        :region "{self.safe_string(region)}" ;
                        :cookingMethod "{self.safe_string(cooking_method)}" ;
                        :spiceLevel "{self.safe_string(spice_level)}" ;
@@ -183,54 +308,80 @@ class AfricanMiddleEasternPopulatorFixed:
         
         for csv_prop, onto_prop in nutritional_mapping.items():
             value = food_data.get(csv_prop, '')
-            if value and self.is_number(value) and float(value) >= 0:
-                query += f'                       :{onto_prop} {float(value)} ;\n'
+            if value not in ('', None) and self.is_number(value) and float(value) >= 0:
+                # Arrondi de l'export: la forme canonique de l'empreinte est sans ambiguïté
+                number = round(float(value), EXPORT_DECIMALS)
+                query += f'                       :{onto_prop} {number} ;\n'
+                triples.append((food_iri, f"{self.food_ns}{onto_prop}", numeric_lexical(number)))
         
         # Signification culturelle
         cultural_significance = food_data.get('cultural_significance', '')
         if cultural_significance:
             query += f'                       :culturalSignificance "{self.safe_string(cultural_significance)}" ;\n'
+            triples.append((food_iri, f"{self.food_ns}culturalSignificance", self.literal_value(cultural_significance)))
         
         # Retirer le dernier point-virgule
         query = query.rstrip(' ;\n') + ' .\n'
         
-        # Ajouter les ingrédients
+        # Ajouter les ingrédients (leurs propres triplets sont partagés entre plats: hors empreinte)
         ingredients_str = food_data.get('ingredients', '')
         if ingredients_str:
             ingredients = [ing.strip() for ing in ingredients_str.split(',')]
             for ingredient in ingredients[:5]:  # Max 5 ingrédients
                 if ingredient and len(ingredient) > 1:
-                    ingredient_uri = f"<{self.create_uri(ingredient, 'ingredient_')}>"
+                    ingredient_iri = self.create_uri(ingredient, 'ingredient_')
                     query += f"""
-            {ingredient_uri} a :Ingredient ;
+            <{ingredient_iri}> a :Ingredient ;
                             :name "{self.safe_string(ingredient)}" .
-            {food_uri} :contains {ingredient_uri} .
+            {food_uri} :contains <{ingredient_iri}> .
             """
+                    triples.append((food_iri, f"{self.food_ns}contains", ingredient_iri))
         
         # Ajouter les images
         category_name = food_name.replace(' ', '_').lower()
-        food_images = [img for img in images_list if img.get('category_name') == category_name]
+        food_images = [img for img in images_list if img.get('category_name') == category_name][:MAX_LINKED_IMAGES]
         
-        for i, img in enumerate(food_images[:3]):  # Max 3 images par plat
-            image_id = img.get('image_id', f"{category_name}_{i}")
-            image_uri = f"<{self.create_uri(image_id, 'image_')}>"
-            
-            query += f"""
-            {image_uri} a :FoodImage ;
-                        :imagePath "{self.safe_string(img.get('relative_path', ''))}" ;
-                        :filename "{self.safe_string(img.get('filename', ''))}" .
-            {food_uri} :hasImage {image_uri} .
-            """
-            
-            self.images_added += 1
+        for i, img in enumerate(food_images):
+            query += self.image_triples(food_uri, img, f"{category_name}_{i}", triples)
         
         query += "}"
+        return query, triples, food_images
+    
+    def add_food_with_specialization(self, food_data, images_list, replace=False):
+        """Ajouter un plat avec ses spécificités (replace: supprimer d'abord ses triplets)"""
+        food_name = food_data.get('food_name', '').strip()
+        if not food_name:
+            return False
+        
+        print(f"🍽️ {food_name}")
+        print(f"    → Région: {food_data.get('region', 'Unknown')}")
+        print(f"    → Classe: {food_data.get('owl_class', 'Food')}")
+        print(f"    → Méthode: {food_data.get('cooking_method', 'cooked')}")
+        print(f"    → Niveau d'épices: {food_data.get('spice_level', 'medium')}")
+        
+        query, triples, food_images = self.build_food_update(food_data, images_list)
+        self.images_added += len(food_images)
+        
+        # Empreinte attendue: ce qui est envoyé, que l'envoi réussisse ou non
+        self.fingerprint.record_food(self.create_uri(food_name), triples, replace=replace)
+        
+        # Upsert: une seule requête DELETE puis INSERT
+        if replace:
+            query = f"""
+        PREFIX : <{self.food_ns}>
+        DELETE WHERE {{ <{self.create_uri(food_name)}> ?p ?o }} ;
+        """ + query
         
         # Exécuter avec Fuseki 5.4.0
-        success = self.execute_sparql_update(query)
+        success = self.send_batch(f"food:{food_name}", query)
+        if success is None:
+            self.statistics.add_food(food_data, len(food_images))
+            print(f"     ⏭️ Déjà acquitté")
+            return None
         if success:
             self.foods_added += 1
-            print(f"     ✅ Ajouté avec {len(food_images[:3])} images")
+            self.statistics.add_food(food_data, len(food_images))
+            print(f"     ✅ Ajouté avec {len(food_images)} images")
         else:
             print(f"     ❌ Échec")
         
@@ -280,17 +431,31 @@ class AfricanMiddleEasternPopulatorFixed:
             print(f"🖼️ {len(all_images)} images disponibles")
         
         # Population
+        records = ((food_data, all_images) for food_data in nutritional_data)
+        self.populate_from_records(records, total=len(nutritional_data),
+                                   summary_file=data_path / "metadata" / SUMMARY_FILENAME)
+        return True
+    
+    def populate_from_records(self, records, total=None, summary_file=None, on_pushed=None):
+        """Population depuis des enregistrements en mémoire: (ligne nutritionnelle, images)
+        
+        `on_pushed` reçoit le nom de chaque plat acquitté par Fuseki (ou déjà acquitté).
+        """
         print(f"\n📝 Population en cours...")
         print("-" * 40)
         
         start_time = time.time()
-        
-        for i, food_data in enumerate(nutritional_data, 1):
-            print(f"\n[{i}/{len(nutritional_data)}]")
-            success = self.add_food_with_specialization(food_data, all_images)
+        count = 0
+        
+        for i, (food_data, images) in enumerate(records, 1):
+            print(f"\n[{i}/{total if total is not None else '?'}]")
+            success = self.add_food_with_specialization(food_data, images)
+            count = i
+            if success is not False and on_pushed is not None:
+                on_pushed(food_data['food_name'].strip())
             
-            # Pause pour Fuseki 5.4.0
-            if i % 3 == 0:
+            # Pause pour Fuseki 5.4.0 (inutile pour un lot sauté)
+            if success is not None and i % 3 == 0:
                 time.sleep(0.5)
         
         end_time = time.time()
@@ -300,18 +465,57 @@ class AfricanMiddleEasternPopulatorFixed:
         print(f"\n" + "=" * 50)
         print(f"🌍 POPULATION TERMINÉE (Fuseki 5.4.0)")
         print(f"⏱️ Durée: {duration:.1f} secondes")
-        print(f"🍽️ Plats ajoutés: {self.foods_added}/{len(nutritional_data)}")
+        print(f"🍽️ Plats ajoutés: {self.foods_added}/{count}")
         print(f"🖼️ Images liées: {self.images_added}")
+        if self.batches_skipped:
+            print(f"⏭️ Lots déjà acquittés: {self.batches_skipped}")
         
         if self.errors:
             print(f"❌ Erreurs: {len(self.errors)}")
             for error in self.errors[:3]:
                 print(f"   - {error}")
+        if self.dead_letters is not None and self.dead_letters.count:
+            print(f"📬 {self.dead_letters.count} requêtes en échec conservées: {self.dead_letters.path}")
+            print(f"   → python population_journal.py replay")
         
-        return True
+        if count:
+            self.publish_statistics(summary_file)
+        
+        return count
+    
+    def populate_from_store(self, store, changed_only=True):
+        """Upsert des plats depuis la base SQLite (par défaut: seulement ceux modifiés)"""
+        print(f"\n📝 Upsert depuis {store.db_path}...")
+        print("-" * 40)
+        
+        pushed = []
+        total = 0
+        for food_data, images in store.iter_records(dirty_only=changed_only, images_per_category=3):
+            total += 1
+            if self.add_food_with_specialization(food_data, images, replace=True) is not False:
+                pushed.append(food_data['food_name'])
+        
+        store.mark_pushed(pushed)
+        print(f"\n🍽️ Plats mis à jour: {len(pushed)}/{total}")
+        
+        if pushed:
+            # Le résumé couvre tout le graphe, pas seulement les plats modifiés
+            self.statistics = GraphStatistics.from_records(store.iter_records(images_per_category=3))
+            self.publish_statistics(Path(store.db_path).parent / SUMMARY_FILENAME)
+        return len(pushed) == total
     
-    def verify_knowledge_graph(self):
-        """Vérification avec endpoints Fuseki 5.4.0"""
+    def publish_statistics(self, summary_file=None):
+        """Publier les agrégats: graphe nommé de résumé et fichier JSON"""
+        if summary_file is not None:
+            self.statistics.save_json(summary_file)
+            print(f"📊 Résumé JSON: {summary_file}")
+        
+        success = self.execute_sparql_update(self.statistics.summary_update(self))
+        print(f"📊 Graphe de résumé <{SUMMARY_GRAPH}>: {'✅' if success else '❌'}")
+        return success
+    
+    def verify_knowledge_graph(self, fingerprint=False):
+        """Vérification avec endpoints Fuseki 5.4.0 (fingerprint: comparer aussi les empreintes)"""
         print(f"\n🔍 VÉRIFICATION (Fuseki 5.4.0)")
         print("=" * 40)
         
@@ -361,6 +565,9 @@ class AfricanMiddleEasternPopulatorFixed:
             
         except Exception as e:
             print(f"❌ Erreur vérification: {e}")
+        
+        if fingerprint and self.fingerprint.foods:
+            return FingerprintVerifier(self, self.fingerprint).verify().ok
 
 def main():
     print("🚀 POPULATION FUSEKI 5.4.0 - VERSION CORRIGÉE")
@@ -6,14 +6,13 @@ Chargeur d'ontologie pour Windows - Version simplifiée
 import requests
 import os
 
-def load_ontology_to_fuseki():
+def load_ontology_to_fuseki(ontology_file="paste.txt", fuseki_server="http://localhost:3030",
+                            dataset_name="african-middle-eastern-kg"):
     # Configuration
-    fuseki_server = "http://localhost:3030"
-    dataset_name = "african-middle-eastern-kg"
+    fuseki_server = fuseki_server.rstrip("/")
     data_endpoint = f"{fuseki_server}/{dataset_name}/data"
     
     # Vérifier que le fichier ontologie existe
-    ontology_file = "paste.txt"
     if not os.path.exists(ontology_file):
         print(f"❌ Fichier {ontology_file} non trouvé!")
         print("💡 Créez d'abord le fichier african_middle_eastern_ontology.ttl")
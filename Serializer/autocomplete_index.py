@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Index d'autocomplétion par préfixe, exporté depuis le catalogue des plats
+
+Table de chaînes triée (sorted string table) sur les noms de plats, les
+ingrédients et les alias (noms de dossiers d'origine, chaque mot d'un nom
+composé: "mayai" retrouve "fried egg mayai ya kukaangwa"). Les clés sont
+repliées: minuscules, sans accents ni signes de translittération
+(é → e, ʿ / ʾ supprimés, _ et - → espace).
+
+Le fichier est lu par mmap, sans chargement: recherche dichotomique des
+bornes du préfixe, puis les k cibles les plus populaires (plats: nombre
+d'images; ingrédients: nombre de plats). Les cibles sont numérotées par
+popularité décroissante: le top-k d'un intervalle est formé de ses k plus
+petits numéros. Les préfixes courts très fréquents ont leur top-k (global
+et par type) précalculé dans le fichier.
+
+Usage:
+    python autocomplete_index.py build [--data-dir african_middle_eastern_data]
+    python autocomplete_index.py query <préfixe> [-k 10] [--kind dish|ingredient]
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import mmap
+import struct
+import sys
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from category_resolver import DEFAULT_CATALOG_FILE, load_category_catalog
+
+AUTOCOMPLETE_FILENAME = "african_middle_eastern_autocomplete.idx"
+
+KINDS = ("dish", "ingredient")
+
+MAGIC = b"AMEAC01\0"
+# magic, nombre d'entrées, de cibles, de préfixes en cache, k du cache
+HEADER = struct.Struct("<8sIIII")
+
+# Au-delà de ce nombre d'entrées pour un préfixe court, son top-k est précalculé
+CACHE_MIN_RANGE = 512
+CACHE_TOP_K = 20
+MAX_CACHED_PREFIX = 4
+
+NO_TARGET = np.uint32(0xFFFFFFFF)
+
+# Signes de translittération arabe / apostrophes, supprimés au repliement
+_DROPPED_CHARS = dict.fromkeys(map(ord, "ʿʾʼʻ'’`´"), None)
+
+
+def fold(text):
+    """Replier une chaîne: minuscules, sans accents, séparateurs → espace"""
+    text = unicodedata.normalize('NFKD', str(text)).translate(_DROPPED_CHARS)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = text.casefold().replace('_', ' ').replace('-', ' ')
+    return " ".join(text.split())
+
+
+def display_name(name):
+    return " ".join(str(name).replace('_', ' ').split())
+
+
+def _keys_for(name):
+    """Clé complète et clés commençant à chaque mot suivant"""
+    words = fold(name).split()
+    return [" ".join(words[i:]) for i in range(len(words)) if len(words[i]) > 1 or i == 0]
+
+
+class AutocompleteBuilder:
+    def __init__(self):
+        self.targets = {}   # (type, nom affiché) → poids
+        self.aliases = {}   # (type, nom affiché) → noms supplémentaires
+
+    def add(self, kind, name, weight=0, aliases=()):
+        target = (kind, display_name(name))
+        self.targets[target] = max(self.targets.get(target, 0), weight)
+        self.aliases.setdefault(target, set()).update(a for a in aliases if a)
+
+    def entries(self):
+        """Cibles par popularité décroissante et (clé repliée, numéro de cible) sans doublons"""
+        targets = sorted(self.targets, key=lambda target: (-self.targets[target], target))
+        entries = set()
+        for target_id, target in enumerate(targets):
+            for name in [target[1], *self.aliases[target]]:
+                for key in _keys_for(name):
+                    if key:
+                        entries.add((key.encode('utf-8'), target_id))
+        return targets, sorted(entries)
+
+    def write(self, path):
+        """Écrire le fichier d'index (tables contiguës, lisibles par mmap)"""
+        targets, entries = self.entries()
+        weights = np.array([self.targets[t] for t in targets], dtype=np.uint32)
+        kinds = np.array([KINDS.index(t[0]) for t in targets], dtype=np.uint8)
+        target_blob, target_offsets = _pack([t[1].encode('utf-8') for t in targets])
+
+        keys = [key for key, _ in entries]
+        key_blob, key_offsets = _pack(keys)
+        entry_targets = np.array([target_id for _, target_id in entries], dtype=np.uint32)
+
+        # Top-k précalculé pour les préfixes courts qui couvrent beaucoup d'entrées
+        cache_prefixes = []
+        cache_results = []
+        candidates = sorted({key[:n] for key in keys for n in range(1, MAX_CACHED_PREFIX + 1) if len(key) >= n})
+        for prefix in candidates:
+            low = bisect.bisect_left(keys, prefix)
+            high = bisect.bisect_left(keys, prefix + b"\xff")
+            if high - low < CACHE_MIN_RANGE:
+                continue
+            ranked = np.unique(entry_targets[low:high])
+            rows = [ranked] + [ranked[kinds[ranked] == i] for i in range(len(KINDS))]
+            cache_prefixes.append(prefix)
+            cache_results.append([
+                np.pad(row[:CACHE_TOP_K], (0, CACHE_TOP_K - len(row[:CACHE_TOP_K])), constant_values=NO_TARGET)
+                for row in rows
+            ])
+        cache_blob, cache_offsets = _pack(cache_prefixes)
+        cache_table = np.array(cache_results, dtype=np.uint32).reshape(
+            len(cache_prefixes), len(KINDS) + 1, CACHE_TOP_K
+        )
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sections = [
+            key_offsets, entry_targets, target_offsets, weights, cache_offsets, cache_table,
+            kinds, key_blob, target_blob, cache_blob
+        ]
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(entries), len(targets), len(cache_prefixes), CACHE_TOP_K))
+            f.write(struct.pack(f"<{len(sections)}Q", *(len(_as_bytes(s)) for s in sections)))
+            for section in sections:
+                f.write(_as_bytes(section))
+        return path
+
+
+def _as_bytes(section):
+    return section if isinstance(section, bytes) else section.tobytes()
+
+
+def _pack(strings):
+    """Concaténation de chaînes et offsets uint32 (n + 1)"""
+    offsets = np.zeros(len(strings) + 1, dtype=np.uint32)
+    if strings:
+        offsets[1:] = np.cumsum([len(s) for s in strings])
+    return b"".join(strings), offsets
+
+
+def _distinct_prefix(sorted_values, k):
+    """Les k premières valeurs distinctes d'une liste triée"""
+    top = []
+    for value in sorted_values:
+        if not top or value != top[-1]:
+            if len(top) == k:
+                break
+            top.append(value)
+    return top
+
+
+class _KeyView:
+    """Séquence des clés du fichier, pour bisect (sans copier la table)"""
+
+    def __init__(self, buffer, start, offsets):
+        self.buffer = buffer
+        self.start = start
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.buffer[self.start + self.offsets[i]:self.start + self.offsets[i + 1]]
+
+
+class AutocompleteIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, n_entries, n_targets, n_cache, cache_k = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Fichier d'autocomplétion invalide: {self.path}")
+        sizes = struct.unpack_from("<10Q", self._mmap, HEADER.size)
+        starts = [HEADER.size + struct.calcsize("<10Q")]
+        for size in sizes[:-1]:
+            starts.append(starts[-1] + size)
+
+        def array(section, dtype):
+            return np.frombuffer(self._mmap, dtype=dtype, count=sizes[section] // np.dtype(dtype).itemsize,
+                                 offset=starts[section])
+
+        self.key_offsets = array(0, np.uint32)
+        self.entry_targets = array(1, np.uint32)
+        self.target_offsets = array(2, np.uint32)
+        self.weights = array(3, np.uint32)
+        cache_offsets = array(4, np.uint32)
+        self.cache_table = array(5, np.uint32).reshape(n_cache, len(KINDS) + 1, cache_k)
+        self.kinds = array(6, np.uint8)
+        # Offsets en memoryview: accès unitaire rapide (entiers Python), sans copie
+        self._views = [
+            memoryview(self._mmap)[starts[section]:starts[section] + sizes[section]].cast('I')
+            for section in (0, 2, 4)
+        ]
+        self.keys = _KeyView(self._mmap, starts[7], self._views[0])
+        self.targets = _KeyView(self._mmap, starts[8], self._views[1])
+        self.cache_keys = _KeyView(self._mmap, starts[9], self._views[2])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def close(self):
+        self.keys = self.cache_keys = self.targets = None
+        self.key_offsets = self.entry_targets = self.target_offsets = None
+        self.weights = self.cache_table = self.kinds = None
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def target(self, target_id):
+        return self.targets[target_id].decode('utf-8'), KINDS[int(self.kinds[target_id])], int(self.weights[target_id])
+
+    def prefix_range(self, prefix):
+        """Bornes [low, high) des clés commençant par le préfixe (replié)"""
+        key = fold(prefix).encode('utf-8')
+        low = bisect.bisect_left(self.keys, key)
+        high = bisect.bisect_left(self.keys, key + b"\xff", low)
+        return low, high
+
+    def complete(self, prefix, k=10, kind=None):
+        """Top-k (nom, type, poids) pour un préfixe saisi"""
+        key = fold(prefix).encode('utf-8')
+        if not key:
+            return []
+
+        row = 0 if kind is None else KINDS.index(kind) + 1
+        if len(key) <= MAX_CACHED_PREFIX and k <= self.cache_table.shape[2]:
+            i = bisect.bisect_left(self.cache_keys, key)
+            if i < len(self.cache_keys) and self.cache_keys[i] == key:
+                return [self.target(t) for t in self.cache_table[i, row, :k].tolist() if t != NO_TARGET]
+
+        low = bisect.bisect_left(self.keys, key)
+        high = bisect.bisect_left(self.keys, key + b"\xff", low)
+        # Numéros de cible = rangs de popularité: les k plus petits numéros distincts
+        ranked = np.sort(self.entry_targets[low:high])
+        if kind is not None:
+            ranked = ranked[self.kinds[ranked] == row - 1]
+        # Une cible a peu de clés: les k * 8 premiers rangs suffisent presque toujours
+        top = _distinct_prefix(ranked[:k * 8].tolist(), k)
+        if len(top) < k and len(ranked) > k * 8:
+            top = _distinct_prefix(ranked.tolist(), k)
+        return [self.target(t) for t in top]
+
+
+def builder_from_data(organized_data, catalog=None, ingredient_rows=()):
+    """Cibles du catalogue, de l'index des images et des lignes nutritionnelles"""
+    builder = AutocompleteBuilder()
+    dish_ingredients = {}
+
+    for category_name, info in (catalog or {}).items():
+        if category_name == "default":
+            continue
+        builder.add("dish", category_name, 0)
+        dish_ingredients[category_name] = info.get('main_ingredient', '')
+
+    for category_name, category_data in organized_data.items():
+        original_names = {category_data.get('original_folder_name')}
+        original_names.update(img.get('original_category_name') for img in category_data.get('images', []))
+        builder.add("dish", category_name, category_data.get('total_images', 0), original_names)
+        dish_ingredients[category_name] = category_data.get('category_info', {}).get('main_ingredient', '')
+
+    for row in ingredient_rows:
+        if row.get('food_name'):
+            builder.add("dish", row['food_name'], 0)
+            dish_ingredients.setdefault(row['food_name'], row.get('ingredients', ''))
+
+    usage = Counter()
+    for ingredients in dish_ingredients.values():
+        for ingredient in {ing.strip() for ing in (ingredients or '').split(',') if ing.strip()}:
+            usage[ingredient] += 1
+    for ingredient, count in usage.items():
+        builder.add("ingredient", ingredient, count)
+
+    return builder
+
+
+def build_from_data_dir(data_dir="african_middle_eastern_data", catalog_file=DEFAULT_CATALOG_FILE):
+    """Reconstruire l'index depuis le catalogue, l'index JSON et le CSV"""
+    data_path = Path(data_dir)
+    organized_data = {}
+    index_file = data_path / "metadata" / "african_middle_eastern_food_index.json"
+    if index_file.exists():
+        with open(index_file, 'r', encoding='utf-8') as f:
+            organized_data = json.load(f).get('categories', {})
+
+    rows = []
+    nutrition_file = data_path / "nutritional" / "african_middle_eastern_nutritional.csv"
+    if nutrition_file.exists():
+        with open(nutrition_file, 'r', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+
+    builder = builder_from_data(organized_data, load_category_catalog(catalog_file), rows)
+    return builder.write(data_path / "metadata" / AUTOCOMPLETE_FILENAME)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index d'autocomplétion des plats et ingrédients")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build')
+    build_parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    query_parser = subparsers.add_parser('query')
+    query_parser.add_argument('prefix')
+    query_parser.add_argument('-k', type=int, default=10)
+    query_parser.add_argument('--kind', choices=KINDS)
+    query_parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        path = build_from_data_dir(args.data_dir)
+        index = AutocompleteIndex(path)
+        print(f"🔤 Index d'autocomplétion: {len(index)} clés → {path}")
+        index.close()
+        return 0
+
+    index = AutocompleteIndex(Path(args.data_dir) / "metadata" / AUTOCOMPLETE_FILENAME)
+    for name, kind, weight in index.complete(args.prefix, args.k, args.kind):
+        print(f"   {name} ({kind}, {weight})")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Résolution floue des noms de dossiers vers les catégories du catalogue
+
+Les clés du catalogue sont normalisées puis indexées par trigrammes
+(index inversé trigramme → catégories). Un nom de dossier inconnu est
+comparé uniquement aux catégories qui partagent des trigrammes avec lui,
+classées par similarité (coefficient de Dice sur les trigrammes). Si les
+deux meilleures catégories sont trop proches, le nom est déclaré ambigu et
+n'est pas deviné.
+"""
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_CATALOG_FILE = Path(__file__).resolve().parent / "food_category_catalog.json"
+DEFAULT_KEY = "default"
+
+# Similarité minimale pour accepter une correspondance devinée
+DEFAULT_THRESHOLD = 0.6
+
+# Écart minimal entre les deux meilleurs scores pour trancher entre deux catégories
+DEFAULT_AMBIGUITY_MARGIN = 0.05
+
+
+def load_category_catalog(catalog_file=DEFAULT_CATALOG_FILE):
+    """Charger le catalogue {catégorie: infos} depuis un fichier JSON"""
+    with open(catalog_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def normalize_name(name):
+    """Minuscules, sans accents, séparateurs ramenés à '_'"""
+    name = unicodedata.normalize('NFKD', str(name))
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return "_".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def trigrams(normalized):
+    """Trigrammes d'un nom normalisé, bornes comprises"""
+    padded = f"  {normalized.replace('_', ' ')} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CategoryResolver:
+    def __init__(self, catalog, threshold=DEFAULT_THRESHOLD, default_key=DEFAULT_KEY,
+                 ambiguity_margin=DEFAULT_AMBIGUITY_MARGIN):
+        self.catalog = catalog
+        self.threshold = threshold
+        self.ambiguity_margin = ambiguity_margin
+        self.default_key = default_key
+
+        self.exact = {}
+        self.keys = sorted(key for key in catalog if key != default_key)
+        postings = {}
+        trigram_counts = []
+        for key_id, key in enumerate(self.keys):
+            normalized = normalize_name(key)
+            self.exact[normalized] = key
+            grams = trigrams(normalized)
+            trigram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(key_id)
+
+        # Index inversé trigramme → identifiants des catégories
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.trigram_counts = np.array(trigram_counts, dtype=np.float64)
+
+        self._cache = {}
+        # Correspondances devinées: {nom: (catégorie, score)}
+        self.guesses = {}
+        self.unresolved = set()
+        # Noms ambigus: {nom: [(catégorie, score), ...]} des meilleures candidates
+        self.ambiguous = {}
+        self._ambiguous_matches = {}
+
+    @classmethod
+    def from_file(cls, catalog_file=DEFAULT_CATALOG_FILE, **kwargs):
+        return cls(load_category_catalog(catalog_file), **kwargs)
+
+    def candidates(self, name, k=2):
+        """Meilleures catégories pour un nom: [(clé, score), ...] par score décroissant
+
+        Seules les catégories qui partagent un trigramme avec le nom sont scorées.
+        """
+        normalized = normalize_name(name)
+        grams = trigrams(normalized)
+        matched = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not matched:
+            return []
+
+        key_ids, shared = np.unique(np.concatenate(matched), return_counts=True)
+        scores = 2.0 * shared / (len(grams) + self.trigram_counts[key_ids])
+        # Tri par score décroissant, puis par clé (ordre stable des égalités)
+        top = np.lexsort((key_ids, -scores))[:k]
+        return [(self.keys[key_ids[i]], round(float(scores[i]), 3)) for i in top]
+
+    def match(self, name):
+        """Meilleure catégorie pour un nom: (clé, score) ou (None, meilleur score)"""
+        normalized = normalize_name(name)
+        if normalized in self._cache:
+            return self._cache[normalized]
+
+        if normalized in self.exact:
+            result = (self.exact[normalized], 1.0)
+        else:
+            candidates = self.candidates(normalized)
+            best_key, best_score = candidates[0] if candidates else (None, 0.0)
+
+            if best_score < self.threshold:
+                result = (None, best_score)
+            elif len(candidates) > 1 and best_score - candidates[1][1] < self.ambiguity_margin:
+                # Deux catégories presque aussi proches: ne pas choisir au hasard de l'ordre des clés
+                self._ambiguous_matches[normalized] = candidates
+                result = (None, best_score)
+            else:
+                result = (best_key, best_score)
+
+        self._cache[normalized] = result
+        return result
+
+    def resolve(self, name):
+        """Infos de catégorie pour un nom de dossier (repli sur 'default')"""
+        key, score = self.match(name)
+
+        if key is None:
+            ambiguous = self._ambiguous_matches.get(normalize_name(name))
+            if ambiguous:
+                self.ambiguous[name] = ambiguous
+            else:
+                self.unresolved.add(name)
+            return self.catalog[self.default_key]
+
+        if score < 1.0:
+            self.guesses[name] = (key, score)
+        return self.catalog[key]
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Audit non interactif d'une arborescence d'images (remplace check_paths.py)
+
+Parcourt <source>/<catégorie>/<images> avec os.scandir, en parallèle par
+catégorie, puis vérifie que chaque image se décode via un pool de processus.
+Les fichiers corrompus peuvent être écrits dans une liste de quarantaine
+que process_images ignore.
+
+Code de sortie: 0 si tout se décode, 1 si le dossier est introuvable ou si
+des images corrompues ont été trouvées (utilisable en CI).
+
+Usage:
+    python dataset_audit.py <dossier_source> [--workers N] [--no-verify]
+                            [--report audit.json] [--quarantine quarantine.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp'}
+
+# Tranches de taille de fichier (borne supérieure en octets, libellé)
+SIZE_BUCKETS = [
+    (50 * 1024, "<50KB"),
+    (200 * 1024, "50-200KB"),
+    (1024 * 1024, "200KB-1MB"),
+    (5 * 1024 * 1024, "1-5MB"),
+    (float('inf'), ">5MB"),
+]
+
+
+def size_bucket(size):
+    for limit, label in SIZE_BUCKETS:
+        if size < limit:
+            return label
+    return SIZE_BUCKETS[-1][1]
+
+
+def quarantine_key(category_name, filename):
+    """Clé d'un fichier dans la liste de quarantaine: '<dossier>/<fichier>'"""
+    return f"{category_name}/{filename}"
+
+
+def load_quarantine(quarantine_file):
+    """Charger la liste de quarantaine (ensemble de clés '<dossier>/<fichier>')"""
+    if not quarantine_file or not os.path.exists(quarantine_file):
+        return set()
+    with open(quarantine_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {entry['key'] for entry in data.get('files', [])}
+
+
+def scan_category(category_path):
+    """Lister les images d'une catégorie: (nom, taille, extension)"""
+    images = []
+    others = 0
+    with os.scandir(category_path) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            extension = os.path.splitext(entry.name)[1].lower()
+            if extension in IMAGE_EXTENSIONS:
+                images.append((entry.name, entry.stat(follow_symlinks=False).st_size, extension))
+            else:
+                others += 1
+    return images, others
+
+
+def verify_image(path):
+    """Vérifier qu'une image se décode; retourne (chemin, format, erreur)"""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            image_format = img.format
+            img.verify()
+        # verify() ne décode pas les pixels: charger pour détecter les troncatures
+        with Image.open(path) as img:
+            img.load()
+        return path, image_format, None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+class DatasetAuditor:
+    def __init__(self, source_dir, workers=None, verify=True):
+        self.source_path = Path(source_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.verify = verify
+
+    def scan(self):
+        """Parcourir les catégories en parallèle"""
+        with os.scandir(self.source_path) as entries:
+            categories = sorted(
+                (entry.name, entry.path) for entry in entries if entry.is_dir(follow_symlinks=False)
+            )
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = pool.map(scan_category, [path for _, path in categories])
+            return {name: result for (name, _), result in zip(categories, results)}
+
+    def verify_images(self, scanned):
+        """Décoder toutes les images via un pool de processus"""
+        paths = [
+            os.path.join(self.source_path, category_name, filename)
+            for category_name, (images, _) in scanned.items()
+            for filename, _, _ in images
+        ]
+        if not paths:
+            return {}
+
+        chunksize = max(1, len(paths) // (self.workers * 8))
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return {path: (fmt, error) for path, fmt, error in pool.map(verify_image, paths, chunksize=chunksize)}
+
+    def run(self):
+        """Lancer l'audit et retourner le rapport"""
+        scanned = self.scan()
+        verified = self.verify_images(scanned) if self.verify else {}
+
+        categories = {}
+        corrupt = []
+        totals = Counter()
+        all_formats = Counter()
+        all_sizes = Counter()
+
+        for category_name, (images, others) in scanned.items():
+            formats = Counter()
+            sizes = Counter()
+            total_bytes = 0
+
+            for filename, size, extension in images:
+                total_bytes += size
+                sizes[size_bucket(size)] += 1
+
+                path = os.path.join(self.source_path, category_name, filename)
+                image_format, error = verified.get(path, (extension.lstrip('.').upper(), None))
+                if error:
+                    corrupt.append({
+                        'key': quarantine_key(category_name, filename),
+                        'path': path,
+                        'size': size,
+                        'error': error
+                    })
+                else:
+                    formats[image_format] += 1
+
+            categories[category_name] = {
+                'images': len(images),
+                'other_files': others,
+                'bytes': total_bytes,
+                'formats': dict(formats),
+                'sizes': dict(sizes)
+            }
+            totals['images'] += len(images)
+            totals['bytes'] += total_bytes
+            all_formats.update(formats)
+            all_sizes.update(sizes)
+
+        return {
+            'source': str(self.source_path.absolute()),
+            'audit_date': datetime.now().isoformat(),
+            'verified': self.verify,
+            'total_categories': len(categories),
+            'total_images': totals['images'],
+            'total_bytes': totals['bytes'],
+            'formats': dict(all_formats),
+            'sizes': dict(all_sizes),
+            'corrupt_images': len(corrupt),
+            'categories': categories,
+            'corrupt': corrupt
+        }
+
+
+def write_quarantine(report, quarantine_file):
+    """Écrire la liste de quarantaine lue par process_images"""
+    data = {
+        'source': report['source'],
+        'audit_date': report['audit_date'],
+        'files': report['corrupt']
+    }
+    with open(quarantine_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def print_report(report):
+    print(f"🔍 Audit: {report['source']}")
+    print(f"📁 {report['total_categories']} catégories, "
+          f"📸 {report['total_images']} images, "
+          f"💾 {report['total_bytes'] / (1024 * 1024):.1f} Mo")
+
+    for category_name, stats in report['categories'].items():
+        extra = f", {stats['other_files']} autres fichiers" if stats['other_files'] else ""
+        print(f"  📁 {category_name}: {stats['images']} images, "
+              f"{stats['bytes'] / (1024 * 1024):.1f} Mo{extra}")
+
+    print(f"🖼️ Formats: {report['formats']}")
+    print(f"📏 Tailles: {report['sizes']}")
+
+    if not report['verified']:
+        print("⏭️ Vérification d'intégrité désactivée")
+    elif report['corrupt']:
+        print(f"❌ {report['corrupt_images']} images corrompues:")
+        for entry in report['corrupt']:
+            print(f"   - {entry['key']}: {entry['error']}")
+    else:
+        print("✅ Toutes les images se décodent correctement")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit d'un dossier d'images de plats")
+    parser.add_argument('source', help="Dossier source (un sous-dossier par catégorie)")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut: CPU)")
+    parser.add_argument('--no-verify', action='store_true', help="Ne pas décoder les images")
+    parser.add_argument('--report', help="Fichier JSON où écrire le rapport")
+    parser.add_argument('--quarantine', help="Fichier JSON où écrire les images corrompues")
+    args = parser.parse_args(argv)
+
+    source = os.path.expanduser(args.source.strip())
+    if not os.path.isdir(source):
+        print(f"❌ Le dossier {source} n'existe pas!")
+        return 1
+
+    report = DatasetAuditor(source, workers=args.workers, verify=not args.no_verify).run()
+    print_report(report)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📄 Rapport sauvé: {args.report}")
+
+    if args.quarantine:
+        write_quarantine(report, args.quarantine)
+        print(f"🚫 Quarantaine sauvée: {args.quarantine} ({report['corrupt_images']} fichiers)")
+
+    return 1 if report['corrupt'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
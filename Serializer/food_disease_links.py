@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Index précalculé des liens plat ↔ maladie et plat ↔ facteur de risque
+
+Jointure hors ligne de trois sources:
+  - Disease_Ontology.ttl: classes de maladies et leur hiérarchie (subClassOf),
+  - disease_nutrition_rules.json: poids nutriments / ingrédients par maladie
+    ou facteur de risque (hérités par les sous-classes),
+  - les profils nutritionnels et ingrédients des plats (CSV du populateur).
+
+Chaque nutriment est ramené à [-1, 1] entre un seuil "faible" et un seuil
+"élevé" pour 100 g; le score d'un plat pour une cible est la somme pondérée
+de ces niveaux et des ingrédients présents, divisée par la somme des poids
+(score dans [-1, 1]). Les poids des règles sont des heuristiques, pas des
+recommandations médicales: un score positif signale un profil nutritionnel
+plutôt favorable, un score négatif un profil plutôt défavorable. Seuls les
+liens de score absolu suffisant sont gardés.
+
+Le résultat est publié:
+  - dans un graphe nommé (liens directs à un saut: :heuristicFavorableFor,
+    :heuristicUnfavorableFor, :heuristicMitigatesRiskFactor,
+    :heuristicIncreasesRiskFactor, et un nœud :NutrientHeuristicLink portant
+    le :nutrientHeuristicScore), remplacé d'un bloc: les lots sont insérés
+    dans un graphe de préparation puis déplacés (MOVE) sur le graphe publié,
+  - dans une matrice creuse plats × cibles (.npz à côté des métadonnées).
+
+Usage:
+    python food_disease_links.py build [--data-dir african_middle_eastern_data] [--publish]
+    python food_disease_links.py query <maladie|facteur|plat> [-k 10] [--data-dir ...]
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from category_resolver import normalize_name
+from nutrient_engine import NUTRIENTS
+
+SERIALIZER_DIR = Path(__file__).resolve().parent
+DEFAULT_ONTOLOGY_FILE = SERIALIZER_DIR / "Disease_Ontology.ttl"
+DEFAULT_RULES_FILE = SERIALIZER_DIR / "disease_nutrition_rules.json"
+
+LINKS_FILENAME = "african_middle_eastern_food_disease_links.npz"
+LINKS_GRAPH = "http://example.org/food-ontology/graph/food-disease"
+STAGING_SUFFIX = "-staging"
+MEDICAL_NS = "http://example.org/medical-ontology#"
+
+TARGET_KINDS = ("disease", "risk_factor")
+
+# Seuils "faible" / "élevé" pour 100 g (repères des étiquetages nutritionnels)
+REFERENCE_RANGES = {
+    'calories_per_100g': (100.0, 250.0),
+    'proteins': (3.0, 12.0),
+    'carbohydrates': (10.0, 45.0),
+    'fats': (3.0, 17.5),
+    'fiber': (3.0, 6.0),
+    'sodium': (120.0, 600.0),
+    'sugar': (5.0, 22.5),
+}
+
+# Score absolu minimal pour publier un lien
+DEFAULT_MIN_SCORE = 0.2
+
+# Prédicats des liens directs: (type de cible, signe du score) → propriété
+# (scores heuristiques issus des règles, pas des affirmations médicales)
+LINK_PROPERTIES = {
+    ('disease', 1): 'heuristicFavorableFor',
+    ('disease', -1): 'heuristicUnfavorableFor',
+    ('risk_factor', 1): 'heuristicMitigatesRiskFactor',
+    ('risk_factor', -1): 'heuristicIncreasesRiskFactor',
+}
+
+_CLASS_BLOCK = re.compile(r'^:(\w+)\s+rdf:type\s+owl:Class\b(.*?)\.[ \t]*$', re.M | re.S)
+
+
+def load_disease_classes(ontology_file=DEFAULT_ONTOLOGY_FILE):
+    """Classes déclarées `:X rdf:type owl:Class` → (libellé, super-classes directes)"""
+    with open(ontology_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    classes = {}
+    for name, body in _CLASS_BLOCK.findall(text):
+        label = re.search(r'rdfs:label\s+"([^"]*)"', body)
+        parents = re.search(r'rdfs:subClassOf\s+([^;]+)', body)
+        classes[name] = (
+            label.group(1) if label else name,
+            re.findall(r':(\w+)', parents.group(1)) if parents else []
+        )
+    return classes
+
+
+def ancestors(classes, name):
+    """La classe et toutes ses super-classes"""
+    seen = []
+    stack = [name]
+    while stack:
+        current = stack.pop()
+        if current in seen or current not in classes:
+            continue
+        seen.append(current)
+        stack.extend(classes[current][1])
+    return seen
+
+
+def load_rules(rules_file=DEFAULT_RULES_FILE):
+    """Charger les règles nutriments / ingrédients par maladie et facteur de risque"""
+    with open(rules_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _ingredient_key(name):
+    """Nom d'ingrédient normalisé, singulier approximatif (kales → kale)"""
+    key = normalize_name(name)
+    return key[:-1] if key.endswith('s') and len(key) > 3 else key
+
+
+class FoodDiseaseLinks:
+    def __init__(self, foods, targets, target_kinds, target_labels, scores):
+        self.foods = np.asarray(foods, dtype=str)
+        self.targets = np.asarray(targets, dtype=str)
+        self.target_kinds = np.asarray(target_kinds, dtype=str)
+        self.target_labels = np.asarray(target_labels, dtype=str)
+        self.scores = sparse.csr_matrix(scores, dtype=np.float32)
+        self._by_target = None
+        self.food_index = {name: i for i, name in enumerate(self.foods.tolist())}
+        self.target_index = {name: i for i, name in enumerate(self.targets.tolist())}
+
+    @classmethod
+    def compute(cls, food_rows, classes, rules, min_score=DEFAULT_MIN_SCORE):
+        """Jointure: lignes nutritionnelles × règles héritées par la hiérarchie des maladies"""
+        unknown = [name for name in rules.get('diseases', {}) if name not in classes]
+        for name in unknown:
+            print(f"   ⚠️ Maladie absente de l'ontologie: {name}")
+
+        # Cibles: maladies (avec règles propres ou héritées) puis facteurs de risque
+        targets, kinds, labels, target_rules = [], [], [], []
+        for name in sorted(classes):
+            lineage = ancestors(classes, name)
+            if 'Disease' not in lineage or name == 'Disease':
+                continue
+            inherited = [rules['diseases'][c] for c in lineage if c in rules.get('diseases', {})]
+            if inherited:
+                targets.append(name)
+                kinds.append('disease')
+                labels.append(classes[name][0])
+                target_rules.append(inherited)
+        for name, rule in sorted(rules.get('risk_factors', {}).items()):
+            targets.append(name)
+            kinds.append('risk_factor')
+            labels.append(rule.get('label', name))
+            target_rules.append([rule])
+
+        ingredients = sorted({
+            _ingredient_key(ing)
+            for rule_list in target_rules for rule in rule_list for ing in rule.get('ingredients', {})
+        })
+        ingredient_column = {ing: j for j, ing in enumerate(ingredients)}
+
+        # Poids cibles × nutriments et cibles × ingrédients (règles héritées additionnées)
+        nutrient_weights = np.zeros((len(targets), len(NUTRIENTS)))
+        ingredient_weights = np.zeros((len(targets), len(ingredients)))
+        for t, rule_list in enumerate(target_rules):
+            for rule in rule_list:
+                for nutrient, weight in rule.get('nutrients', {}).items():
+                    nutrient_weights[t, NUTRIENTS.index(nutrient)] += weight
+                for ingredient, weight in rule.get('ingredients', {}).items():
+                    ingredient_weights[t, ingredient_column[_ingredient_key(ingredient)]] += weight
+
+        # Plats: niveaux nutritionnels dans [-1, 1] et présence des ingrédients
+        foods = []
+        levels = []
+        presence = []
+        low = np.array([REFERENCE_RANGES[n][0] for n in NUTRIENTS])
+        high = np.array([REFERENCE_RANGES[n][1] for n in NUTRIENTS])
+        for row in food_rows:
+            food_name = row.get('food_name', '').strip()
+            if not food_name:
+                continue
+            foods.append(food_name)
+            levels.append([float(row[n]) if row.get(n) not in (None, '') else np.nan for n in NUTRIENTS])
+            row_presence = np.zeros(len(ingredients))
+            for ingredient in row.get('ingredients', '').split(','):
+                column = ingredient_column.get(_ingredient_key(ingredient)) if ingredient.strip() else None
+                if column is not None:
+                    row_presence[column] = 1.0
+            presence.append(row_presence)
+
+        levels = np.asarray(levels, dtype=np.float64).reshape(len(foods), len(NUTRIENTS))
+        levels = np.clip(2 * (levels - low) / (high - low) - 1, -1, 1)
+        levels = np.nan_to_num(levels, nan=0.0)   # nutriment inconnu: neutre
+        presence = np.asarray(presence).reshape(len(foods), len(ingredients))
+
+        norm = np.abs(nutrient_weights).sum(axis=1) + np.abs(ingredient_weights).sum(axis=1)
+        norm[norm == 0] = 1.0
+        scores = (levels @ nutrient_weights.T + presence @ ingredient_weights.T) / norm
+        scores[np.abs(scores) < min_score] = 0.0
+
+        return cls(foods, targets, kinds, labels, sparse.csr_matrix(np.round(scores, 3)))
+
+    def save(self, links_file):
+        links_file = Path(links_file)
+        links_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(links_file, 'wb') as f:
+            np.savez(
+                f,
+                foods=self.foods,
+                targets=self.targets,
+                target_kinds=self.target_kinds,
+                target_labels=self.target_labels,
+                data=self.scores.data,
+                indices=self.scores.indices,
+                indptr=self.scores.indptr,
+                shape=np.asarray(self.scores.shape)
+            )
+        return links_file
+
+    @classmethod
+    def load(cls, links_file):
+        with np.load(links_file) as data:
+            scores = sparse.csr_matrix(
+                (data['data'], data['indices'], data['indptr']), shape=tuple(data['shape'])
+            )
+            return cls(data['foods'], data['targets'], data['target_kinds'], data['target_labels'], scores)
+
+    @property
+    def by_target(self):
+        """Colonnes compressées: tous les plats d'une cible en une tranche"""
+        if self._by_target is None:
+            self._by_target = self.scores.tocsc()
+        return self._by_target
+
+    def foods_for(self, target, relation=1, k=None):
+        """Plats liés à une cible, du score le plus fort au plus faible (relation: 1 favorable, -1 à limiter)"""
+        column = self.target_index[target]
+        start, end = self.by_target.indptr[column], self.by_target.indptr[column + 1]
+        rows = self.by_target.indices[start:end]
+        values = self.by_target.data[start:end] * relation
+        keep = values > 0
+        order = np.argsort(-values[keep], kind='stable')[:k]
+        return [(self.foods[rows[keep][i]], float(values[keep][i] * relation)) for i in order]
+
+    def targets_for(self, food):
+        """Cibles liées à un plat: (cible, type, score)"""
+        row = self.food_index[food]
+        start, end = self.scores.indptr[row], self.scores.indptr[row + 1]
+        links = zip(self.scores.indices[start:end], self.scores.data[start:end])
+        return sorted(
+            ((self.targets[t], self.target_kinds[t], float(score)) for t, score in links),
+            key=lambda link: -abs(link[2])
+        )
+
+    def graph_updates(self, populator, graph_uri=LINKS_GRAPH, batch_size=500):
+        """Requêtes SPARQL qui remplacent le graphe nommé des liens
+
+        Les lots remplissent un graphe de préparation vidé au premier lot; la
+        dernière requête le déplace sur le graphe publié (MOVE remplace la
+        destination en une seule opération). Une publication interrompue laisse
+        donc l'ancien graphe intact.
+        """
+        staging_uri = graph_uri + STAGING_SUFFIX
+        coo = self.scores.tocoo()
+        header = f"""
+        PREFIX : <{populator.food_ns}>
+        PREFIX med: <{MEDICAL_NS}>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+        """
+
+        target_triples = []
+        for name, kind, label in zip(self.targets, self.target_kinds, self.target_labels):
+            if kind == 'risk_factor':
+                target_triples.append(f'med:{name} a med:RiskFactor ; rdfs:label "{populator.safe_string(label)}"@en .')
+
+        link_triples = []
+        for row, column, score in zip(coo.row, coo.col, coo.data):
+            food_uri = f"<{populator.create_uri(self.foods[row])}>"
+            target = f"med:{self.targets[column]}"
+            prop = LINK_PROPERTIES[(self.target_kinds[column], 1 if score > 0 else -1)]
+            link_uri = f"<{populator.create_uri(f'{self.foods[row]}_{self.targets[column]}', 'link_')}>"
+            link_triples.append(
+                f"{food_uri} :{prop} {target} .\n"
+                f"                {link_uri} a :NutrientHeuristicLink ; :food {food_uri} ; :target {target} ; "
+                f':linkType :{prop} ; :nutrientHeuristicScore "{float(score):.3f}"^^xsd:decimal .'
+            )
+
+        queries = []
+        chunks = [target_triples + link_triples[:batch_size]]
+        chunks += [link_triples[i:i + batch_size] for i in range(batch_size, len(link_triples), batch_size)]
+        for i, chunk in enumerate(chunks):
+            drop = f"DROP SILENT GRAPH <{staging_uri}> ;" if i == 0 else ""
+            body = "\n                ".join(chunk)
+            queries.append(f"""{header}
+        {drop}
+        INSERT DATA {{
+            GRAPH <{staging_uri}> {{
+                {body}
+            }}
+        }}
+        """)
+        queries.append(f"MOVE SILENT GRAPH <{staging_uri}> TO <{graph_uri}>")
+        return queries
+
+    def publish(self, populator, graph_uri=LINKS_GRAPH, batch_size=500):
+        """Remplacer le graphe nommé des liens dans Fuseki"""
+        queries = self.graph_updates(populator, graph_uri, batch_size)
+        sent = 0
+        for query in queries:
+            if not populator.execute_sparql_update(query):
+                print(f"❌ Publication interrompue ({sent}/{len(queries)} requêtes), graphe publié inchangé: "
+                      f"{populator.errors[-1]}")
+                return False
+            sent += 1
+        print(f"🩺 Graphe <{graph_uri}>: {self.scores.nnz} liens en {sent - 1} lots")
+        return True
+
+
+def build_links(data_dir="african_middle_eastern_data", ontology_file=DEFAULT_ONTOLOGY_FILE,
+                rules_file=DEFAULT_RULES_FILE, min_score=DEFAULT_MIN_SCORE):
+    """Calculer les liens depuis le CSV nutritionnel et les sauvegarder"""
+    nutrition_file = Path(data_dir) / "nutritional" / "african_middle_eastern_nutritional.csv"
+    with open(nutrition_file, 'r', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    links = FoodDiseaseLinks.compute(rows, load_disease_classes(ontology_file), load_rules(rules_file), min_score)
+    links_file = links.save(Path(data_dir) / "metadata" / LINKS_FILENAME)
+    return links, links_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Liens plats ↔ maladies / facteurs de risque")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build')
+    build_parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    build_parser.add_argument('--ontology', default=str(DEFAULT_ONTOLOGY_FILE))
+    build_parser.add_argument('--rules', default=str(DEFAULT_RULES_FILE))
+    build_parser.add_argument('--min-score', type=float, default=DEFAULT_MIN_SCORE)
+    build_parser.add_argument('--publish', action='store_true', help="Publier le graphe nommé dans Fuseki")
+    build_parser.add_argument('--fuseki-url', default="http://localhost:3030")
+    build_parser.add_argument('--dataset', default="african-middle-eastern-kg")
+
+    query_parser = subparsers.add_parser('query')
+    query_parser.add_argument('name', help="Maladie / facteur de risque (ex: Hypertension) ou plat")
+    query_parser.add_argument('-k', type=int, default=10)
+    query_parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        links, links_file = build_links(args.data_dir, args.ontology, args.rules, args.min_score)
+        print(f"🩺 {links.scores.nnz} liens ({len(links.foods)} plats × {len(links.targets)} cibles) → {links_file}")
+        if args.publish:
+            from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+
+            populator = AfricanMiddleEasternPopulatorFixed(args.fuseki_url, args.dataset)
+            return 0 if links.publish(populator) else 1
+        return 0
+
+    links = FoodDiseaseLinks.load(Path(args.data_dir) / "metadata" / LINKS_FILENAME)
+    if args.name in links.target_index:
+        for relation, title in ((1, "✅ Favorables"), (-1, "⚠️ À limiter")):
+            print(title)
+            for food, score in links.foods_for(args.name, relation, args.k):
+                print(f"   {food}: {score:+.3f}")
+    elif args.name in links.food_index:
+        for target, kind, score in links.targets_for(args.name):
+            print(f"   {target} ({kind}): {score:+.3f}")
+    else:
+        print(f"❌ Inconnu: {args.name}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Vérification du graphe par empreintes au lieu de simples comptes
+
+Pendant la génération des triplets, le populateur calcule pour chaque plat
+une empreinte indépendante de l'ordre: nombre de triplets et somme des
+hachages (SHA-1 tronqué) de chaque triplet <s> <p> <o>. Les plats sont
+répartis en partitions par un hachage stable de leur URI.
+
+Fuseki calcule les mêmes agrégats avec SHA1() et SUM() de SPARQL 1.1:
+  1. une requête GROUP BY partition compare toutes les partitions,
+  2. une requête GROUP BY plat, limitée aux partitions divergentes,
+  3. une requête par plat divergent liste ses triplets pour le diff.
+Une vérification complète coûte donc une poignée de requêtes, quelle que
+soit la taille du graphe.
+
+Périmètre d'un plat: les triplets dont il est le sujet et ceux de ses
+:FoodImage. Les triplets propres aux ingrédients, partagés entre plats,
+n'en font pas partie (le lien :contains, lui, est couvert).
+
+Un objet numérique est haché sous une forme canonique (valeur arrondie
+comme à l'export, en entier de dixièmes): la forme lexicale renvoyée par
+Fuseki (100, 100.0, 1.0E2) ne change pas l'empreinte.
+
+Usage:
+    python graph_fingerprint.py [--data-dir african_middle_eastern_data] [--partitions 64]
+                                [--fuseki-url http://localhost:3030] [--dataset african-middle-eastern-kg]
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from nutrition_index import EXPORT_DECIMALS
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+DEFAULT_PARTITIONS = 64
+
+# Chiffres hexadécimaux du SHA-1 utilisés pour le hachage d'un triplet / la partition d'un plat
+TRIPLE_HASH_DIGITS = 12
+PARTITION_HASH_DIGITS = 8
+
+# Nombre maximal de plats dont on liste les triplets pour le diff
+MAX_TRIPLE_DIFFS = 5
+
+# Facteur de la forme canonique des nombres (arrondi de l'export)
+NUMERIC_SCALE = 10 ** EXPORT_DECIMALS
+
+
+def triple_hash(subject, predicate, obj):
+    """Hachage entier d'un triplet, identique au calcul SPARQL"""
+    digest = hashlib.sha1(f"{subject} {predicate} {obj}".encode('utf-8')).hexdigest()
+    return int(digest[:TRIPLE_HASH_DIGITS], 16)
+
+
+def numeric_lexical(value):
+    """Forme canonique d'un objet numérique, identique au calcul SPARQL
+
+    Entier de value × NUMERIC_SCALE, arrondi au plus proche (demi vers le
+    haut, comme ROUND en SPARQL).
+    """
+    return str(math.floor(float(value) * NUMERIC_SCALE + 0.5))
+
+
+def _sparql_object(var):
+    """Expression SPARQL: forme hachée de l'objet ?var (canonique s'il est numérique)"""
+    return f"IF(isNumeric({var}), STR(xsd:integer(ROUND({var} * {NUMERIC_SCALE}))), STR({var}))"
+
+
+def food_partition(food_iri, partitions):
+    """Partition d'un plat, identique au calcul SPARQL"""
+    digest = hashlib.sha1(food_iri.encode('utf-8')).hexdigest()
+    return int(digest[:PARTITION_HASH_DIGITS], 16) % partitions
+
+
+def _sparql_hex_to_int(var, digits):
+    """Expression SPARQL: entier des `digits` premiers chiffres hexadécimaux de ?var"""
+    expression = "0"
+    for i in range(1, digits + 1):
+        digit = f'STRLEN(STRBEFORE("0123456789abcdef", SUBSTR({var}, {i}, 1)))'
+        expression = f"({expression} * 16 + {digit})"
+    return expression
+
+
+class GraphFingerprint:
+    def __init__(self, partitions=DEFAULT_PARTITIONS):
+        self.partitions = partitions
+        self.foods = {}   # URI du plat → ensemble de triplets (s, p, forme lexicale de o)
+
+    def record_food(self, food_iri, triples, replace=False):
+        """Ajouter les triplets envoyés pour un plat (replace: ils remplacent les précédents)"""
+        if replace or food_iri not in self.foods:
+            self.foods[food_iri] = set()
+        self.foods[food_iri].update(triples)
+
+    def food_digest(self, food_iri):
+        """(nombre de triplets, somme des hachages) d'un plat"""
+        triples = self.foods.get(food_iri, ())
+        return len(triples), sum(triple_hash(*triple) for triple in triples)
+
+    def partition_digests(self):
+        """(nombre de triplets, somme des hachages) par partition"""
+        digests = defaultdict(lambda: [0, 0])
+        for food_iri in self.foods:
+            count, total = self.food_digest(food_iri)
+            digest = digests[food_partition(food_iri, self.partitions)]
+            digest[0] += count
+            digest[1] += total
+        return {part: tuple(digest) for part, digest in digests.items()}
+
+    def foods_in_partitions(self, partitions):
+        partitions = set(partitions)
+        return [iri for iri in self.foods if food_partition(iri, self.partitions) in partitions]
+
+
+class FingerprintReport:
+    def __init__(self):
+        self.queries = 0
+        self.mismatched_partitions = []
+        self.mismatched_foods = []
+        self.missing_foods = []
+        self.unexpected_foods = []
+        self.triple_diffs = {}   # plat → (triplets manquants, triplets en trop)
+
+    @property
+    def ok(self):
+        return not self.mismatched_partitions
+
+
+class FingerprintVerifier:
+    def __init__(self, populator, fingerprint):
+        self.populator = populator
+        self.fingerprint = fingerprint
+        self.ns = populator.food_ns
+
+    def _scope(self):
+        """Motif SPARQL: ?food et chacun de ses triplets ?s ?p ?o"""
+        return f"""
+            {{ SELECT DISTINCT ?food WHERE {{ ?food <{self.ns}region> ?region }} }}
+            {{ ?food ?p ?o BIND(?food AS ?s) }}
+            UNION
+            {{ ?food <{self.ns}hasImage> ?s . ?s ?p ?o }}
+        """
+
+    def _hash_binds(self):
+        partitions = self.fingerprint.partitions
+        return f"""
+            BIND(SHA1(CONCAT(STR(?s), " ", STR(?p), " ", {_sparql_object('?o')})) AS ?tripleHex)
+            BIND({_sparql_hex_to_int('?tripleHex', TRIPLE_HASH_DIGITS)} AS ?h)
+            BIND(SHA1(STR(?food)) AS ?foodHex)
+            BIND({_sparql_hex_to_int('?foodHex', PARTITION_HASH_DIGITS)} AS ?x)
+            BIND(xsd:integer(?x - {partitions} * FLOOR(?x / {partitions})) AS ?part)
+        """
+
+    def _select(self, query, report):
+        report.queries += 1
+        bindings = self.populator.execute_sparql_query(query)
+        if bindings is None:
+            raise RuntimeError(self.populator.errors[-1])
+        return bindings
+
+    def partition_query(self):
+        return f"""
+        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+        SELECT ?part (COUNT(*) AS ?n) (SUM(?h) AS ?sum) WHERE {{
+            {self._scope()}
+            {self._hash_binds()}
+        }}
+        GROUP BY ?part
+        """
+
+    def food_query(self, partitions):
+        values = ", ".join(str(part) for part in sorted(partitions))
+        return f"""
+        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+        SELECT ?food (COUNT(*) AS ?n) (SUM(?h) AS ?sum) WHERE {{
+            {self._scope()}
+            {self._hash_binds()}
+            FILTER(?part IN ({values}))
+        }}
+        GROUP BY ?food
+        """
+
+    def triples_query(self, food_iri):
+        return f"""
+        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+        SELECT ?s ?p ({_sparql_object('?o')} AS ?object) WHERE {{
+            VALUES ?food {{ <{food_iri}> }}
+            {{ ?food ?p ?o BIND(?food AS ?s) }}
+            UNION
+            {{ ?food <{self.ns}hasImage> ?s . ?s ?p ?o }}
+        }}
+        """
+
+    def verify(self):
+        """Comparer les empreintes, en descendant seulement dans les partitions divergentes"""
+        print(f"\n🧬 Vérification par empreintes ({len(self.fingerprint.foods)} plats, "
+              f"{self.fingerprint.partitions} partitions)")
+        report = FingerprintReport()
+
+        # Niveau 1: toutes les partitions en une requête
+        expected = self.fingerprint.partition_digests()
+        actual = {
+            int(float(b['part']['value'])): (int(b['n']['value']), int(b['sum']['value']))
+            for b in self._select(self.partition_query(), report)
+            if 'part' in b   # agrégat d'un graphe vide: une ligne sans ?part
+        }
+        report.mismatched_partitions = sorted(
+            part for part in set(expected) | set(actual) if expected.get(part) != actual.get(part)
+        )
+        if report.ok:
+            print(f"   ✅ Graphe conforme ({report.queries} requête)")
+            return report
+
+        print(f"   ⚠️ {len(report.mismatched_partitions)} partitions divergentes")
+
+        # Niveau 2: plats des partitions divergentes
+        actual_foods = {
+            b['food']['value']: (int(b['n']['value']), int(b['sum']['value']))
+            for b in self._select(self.food_query(report.mismatched_partitions), report)
+            if 'food' in b
+        }
+        for food_iri in self.fingerprint.foods_in_partitions(report.mismatched_partitions):
+            if food_iri not in actual_foods:
+                report.missing_foods.append(food_iri)
+            elif actual_foods[food_iri] != self.fingerprint.food_digest(food_iri):
+                report.mismatched_foods.append(food_iri)
+        report.unexpected_foods = sorted(set(actual_foods) - set(self.fingerprint.foods))
+
+        # Niveau 3: diff des triplets des premiers plats divergents
+        for food_iri in report.mismatched_foods[:MAX_TRIPLE_DIFFS]:
+            server_triples = {
+                (b['s']['value'], b['p']['value'], b['object']['value'])
+                for b in self._select(self.triples_query(food_iri), report)
+            }
+            expected_triples = self.fingerprint.foods[food_iri]
+            report.triple_diffs[food_iri] = (
+                sorted(expected_triples - server_triples), sorted(server_triples - expected_triples)
+            )
+
+        print(f"   ❌ Plats absents: {len(report.missing_foods)}")
+        for food_iri in report.missing_foods[:5]:
+            print(f"      - {food_iri}")
+        print(f"   ❌ Plats divergents: {len(report.mismatched_foods)}")
+        for food_iri, (missing, extra) in report.triple_diffs.items():
+            print(f"      - {food_iri}: {len(missing)} triplets manquants, {len(extra)} en trop")
+            for triple in missing[:3]:
+                print(f"          - {' '.join(triple)}")
+            for triple in extra[:3]:
+                print(f"          + {' '.join(triple)}")
+        if report.unexpected_foods:
+            print(f"   ⚠️ Plats inattendus dans le graphe: {len(report.unexpected_foods)}")
+        print(f"   🔎 {report.queries} requêtes")
+        return report
+
+
+def expected_fingerprint(populator, data_dir, partitions=DEFAULT_PARTITIONS):
+    """Empreinte attendue d'une population complète depuis le CSV et l'index (sans envoi)"""
+    data_path = Path(data_dir)
+    fingerprint = GraphFingerprint(partitions)
+
+    all_images = []
+    images_file = data_path / "metadata" / "african_middle_eastern_food_index.json"
+    if images_file.exists():
+        with open(images_file, 'r', encoding='utf-8') as f:
+            for cat_data in json.load(f).get('categories', {}).values():
+                all_images.extend(cat_data.get('images', []))
+
+    nutrition_file = data_path / "nutritional" / "african_middle_eastern_nutritional.csv"
+    with open(nutrition_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            food_name = row.get('food_name', '').strip()
+            if food_name:
+                _, triples, _ = populator.build_food_update(row, all_images)
+                fingerprint.record_food(populator.create_uri(food_name), triples)
+    return fingerprint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vérifier le graphe Fuseki par empreintes")
+    parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    parser.add_argument('--partitions', type=int, default=DEFAULT_PARTITIONS, help="Nombre de partitions")
+    parser.add_argument('--fuseki-url', default="http://localhost:3030")
+    parser.add_argument('--dataset', default="african-middle-eastern-kg")
+    args = parser.parse_args(argv)
+
+    from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+
+    populator = AfricanMiddleEasternPopulatorFixed(args.fuseki_url, args.dataset)
+    fingerprint = expected_fingerprint(populator, args.data_dir, args.partitions)
+
+    try:
+        report = FingerprintVerifier(populator, fingerprint).verify()
+    except RuntimeError as e:
+        print(f"❌ Vérification impossible: {e}")
+        return 2
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Statistiques agrégées du graphe, calculées pendant la population
+
+Le populateur met à jour ces agrégats au fil des plats envoyés (comptes par
+région, classe OWL, méthode de cuisson, niveau d'épices et ingrédient;
+min / max / moyenne de chaque nutriment) puis les publie dans un petit
+graphe nommé de résumé et dans un fichier JSON à côté de l'index. Les
+tableaux de bord et les listes de filtres lisent ces nombres au lieu de
+parcourir tout le graphe avec COUNT / GROUP BY.
+
+Usage:
+    python graph_statistics.py [--data-dir african_middle_eastern_data]   (recalcul depuis le CSV et l'index)
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+SUMMARY_FILENAME = "african_middle_eastern_graph_summary.json"
+SUMMARY_GRAPH = "http://example.org/food-ontology/graph/summary"
+
+# Images liées à un plat dans le graphe (le populateur n'en envoie pas plus)
+MAX_LINKED_IMAGES = 3
+
+# Colonne de la ligne nutritionnelle → facette
+FACETS = {
+    'region': 'region',
+    'owl_class': 'class',
+    'cooking_method': 'cookingMethod',
+    'spice_level': 'spiceLevel',
+}
+
+# Colonne CSV → propriété de l'ontologie (mêmes noms que le populateur)
+NUTRIENT_PROPERTIES = {
+    'calories_per_100g': 'calories',
+    'proteins': 'protein',
+    'carbohydrates': 'carbohydrates',
+    'fats': 'fat',
+    'fiber': 'fiber',
+    'sodium': 'sodium',
+    'sugar': 'sugar'
+}
+
+
+def facet_id(facet, value):
+    """Identifiant d'URI d'une valeur de facette: empreinte de la valeur brute
+
+    create_uri remplace tout caractère non alphanumérique par '_', ce qui
+    confondrait 'East Africa' et 'East_Africa' ou 'Côte' et 'C_te'.
+    """
+    return f"{facet}_{hashlib.sha1(str(value).encode('utf-8')).hexdigest()[:16]}"
+
+
+def food_ingredients(food_data, limit=5):
+    """Ingrédients réellement envoyés pour un plat (même filtre que le populateur)"""
+    ingredients = [ing.strip() for ing in food_data.get('ingredients', '').split(',')]
+    return [ing for ing in ingredients[:limit] if ing and len(ing) > 1]
+
+
+class GraphStatistics:
+    def __init__(self):
+        # Contribution de chaque plat, pour qu'un upsert remplace au lieu d'additionner
+        self.foods = {}
+        self.facets = {facet: Counter() for facet in list(FACETS.values()) + ['ingredient']}
+        self.nutrient_sums = Counter()
+        self.nutrient_counts = Counter()
+        self._extrema = {}
+        self._stale_extrema = set()
+        self.image_count = 0
+
+    def add_food(self, food_data, image_count=0):
+        """Prendre en compte un plat envoyé (remplace sa contribution précédente)"""
+        food_name = food_data.get('food_name', '').strip()
+        if not food_name:
+            return
+
+        if food_name in self.foods:
+            self.remove_food(food_name)
+
+        facets = {facet: food_data.get(column) or 'Unknown' for column, facet in FACETS.items()}
+        nutrients = {}
+        for column, prop in NUTRIENT_PROPERTIES.items():
+            value = food_data.get(column, '')
+            try:
+                value = float(value)
+            except (ValueError, TypeError):
+                continue
+            if value >= 0:
+                nutrients[prop] = value
+
+        contribution = {
+            'facets': facets,
+            'ingredients': food_ingredients(food_data),
+            'nutrients': nutrients,
+            'images': image_count
+        }
+        self.foods[food_name] = contribution
+
+        for facet, value in facets.items():
+            self.facets[facet][value] += 1
+        for ingredient in contribution['ingredients']:
+            self.facets['ingredient'][ingredient] += 1
+        for prop, value in nutrients.items():
+            self.nutrient_sums[prop] += value
+            self.nutrient_counts[prop] += 1
+            if prop in self._extrema and prop not in self._stale_extrema:
+                low, high = self._extrema[prop]
+                self._extrema[prop] = (min(low, value), max(high, value))
+            elif prop not in self._extrema:
+                self._extrema[prop] = (value, value)
+        self.image_count += image_count
+
+    def add_images(self, food_name, count):
+        """Images ajoutées à un plat déjà présent"""
+        if food_name in self.foods:
+            self.foods[food_name]['images'] += count
+        self.image_count += count
+
+    def remove_food(self, food_name):
+        """Retirer la contribution d'un plat"""
+        contribution = self.foods.pop(food_name, None)
+        if contribution is None:
+            return
+
+        for facet, value in contribution['facets'].items():
+            self.facets[facet][value] -= 1
+            if self.facets[facet][value] <= 0:
+                del self.facets[facet][value]
+        for ingredient in contribution['ingredients']:
+            self.facets['ingredient'][ingredient] -= 1
+            if self.facets['ingredient'][ingredient] <= 0:
+                del self.facets['ingredient'][ingredient]
+        for prop, value in contribution['nutrients'].items():
+            self.nutrient_sums[prop] -= value
+            self.nutrient_counts[prop] -= 1
+            # Un extremum retiré ne se met pas à jour sans les autres valeurs: recalcul à la lecture
+            if prop in self._extrema and value in self._extrema[prop]:
+                self._stale_extrema.add(prop)
+        self.image_count -= contribution['images']
+
+    def nutrient_stats(self):
+        """min / max / moyenne par nutriment"""
+        for prop in self._stale_extrema:
+            values = [food['nutrients'][prop] for food in self.foods.values() if prop in food['nutrients']]
+            if values:
+                self._extrema[prop] = (min(values), max(values))
+            else:
+                self._extrema.pop(prop, None)
+        self._stale_extrema.clear()
+
+        stats = {}
+        for prop in NUTRIENT_PROPERTIES.values():
+            count = self.nutrient_counts[prop]
+            if count <= 0:
+                continue
+            low, high = self._extrema[prop]
+            stats[prop] = {
+                'count': count,
+                'min': low,
+                'max': high,
+                'mean': round(self.nutrient_sums[prop] / count, 3)
+            }
+        return stats
+
+    def to_dict(self):
+        return {
+            'generated_date': datetime.now().isoformat(),
+            'food_count': len(self.foods),
+            'image_count': self.image_count,
+            'facets': {
+                facet: dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+                for facet, counts in self.facets.items()
+            },
+            'nutrients': self.nutrient_stats()
+        }
+
+    def save_json(self, summary_file):
+        """Écrire le résumé JSON (remplacement atomique)"""
+        summary_file = Path(summary_file)
+        summary_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = Path(f"{summary_file}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, summary_file)
+        return summary_file
+
+    def summary_update(self, populator, graph_uri=SUMMARY_GRAPH):
+        """Requête SPARQL qui remplace le graphe nommé de résumé"""
+        summary = self.to_dict()
+        ns = populator.food_ns
+        summary_uri = f"<{populator.create_uri('dataset', 'summary_')}>"
+
+        triples = [
+            f"{summary_uri} a :DatasetSummary ;",
+            f"    :foodCount {summary['food_count']} ;",
+            f"    :imageCount {summary['image_count']} ;",
+            f'    :generatedDate "{summary["generated_date"]}"^^xsd:dateTime .'
+        ]
+        for facet, counts in summary['facets'].items():
+            for value, count in counts.items():
+                facet_uri = f"<{populator.create_uri(facet_id(facet, value), 'summary_')}>"
+                triples.append(
+                    f'{facet_uri} a :FacetCount ; :facet "{facet}" ; '
+                    f':value "{populator.safe_string(value)}" ; :count {count} .'
+                )
+                triples.append(f"{summary_uri} :hasFacetCount {facet_uri} .")
+        for prop, stats in summary['nutrients'].items():
+            stats_uri = f"<{populator.create_uri(f'nutrient_{prop}', 'summary_')}>"
+            triples.append(
+                f'{stats_uri} a :NutrientStatistics ; :nutrient :{prop} ; :count {stats["count"]} ; '
+                f':min {float(stats["min"])} ; :max {float(stats["max"])} ; :mean {float(stats["mean"])} .'
+            )
+            triples.append(f"{summary_uri} :hasNutrientStatistics {stats_uri} .")
+
+        body = "\n                ".join(triples)
+        return f"""
+        PREFIX : <{ns}>
+        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+
+        DROP SILENT GRAPH <{graph_uri}> ;
+        INSERT DATA {{
+            GRAPH <{graph_uri}> {{
+                {body}
+            }}
+        }}
+        """
+
+    @classmethod
+    def from_records(cls, records):
+        """Recalculer depuis des enregistrements (ligne nutritionnelle, images)"""
+        statistics = cls()
+        for food_data, images in records:
+            statistics.add_food(food_data, len(images))
+        return statistics
+
+
+def load_summary(data_dir="african_middle_eastern_data"):
+    """Lire le résumé JSON publié (None s'il n'existe pas encore)"""
+    summary_file = Path(data_dir) / "metadata" / SUMMARY_FILENAME
+    if not summary_file.exists():
+        return None
+    with open(summary_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_statistics(data_dir="african_middle_eastern_data", organized_data=None):
+    """Recalculer les agrégats depuis le CSV exporté, sans recalcul nutritionnel
+
+    `organized_data` évite de relire l'index JSON quand il est déjà en mémoire.
+    Retourne None si le CSV n'existe pas encore.
+    """
+    data_path = Path(data_dir)
+    nutrition_file = data_path / "nutritional" / "african_middle_eastern_nutritional.csv"
+    if not nutrition_file.exists():
+        return None
+
+    if organized_data is None:
+        organized_data = {}
+        index_file = data_path / "metadata" / "african_middle_eastern_food_index.json"
+        if index_file.exists():
+            with open(index_file, 'r', encoding='utf-8') as f:
+                organized_data = json.load(f).get('categories', {})
+
+    images_per_food = Counter({
+        category_name: min(MAX_LINKED_IMAGES, category_data.get('total_images', 0))
+        for category_name, category_data in organized_data.items()
+    })
+
+    statistics = GraphStatistics()
+    with open(nutrition_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('food_name', '').strip():
+                category_name = row['food_name'].replace(' ', '_').lower()
+                statistics.add_food(row, images_per_food[category_name])
+    return statistics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recalculer le résumé statistique du graphe")
+    parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    args = parser.parse_args(argv)
+
+    data_path = Path(args.data_dir)
+    statistics = load_statistics(data_path)
+    if statistics is None:
+        print(f"❌ CSV non trouvé: {data_path / 'nutritional' / 'african_middle_eastern_nutritional.csv'}")
+        return 1
+
+    summary_file = statistics.save_json(data_path / "metadata" / SUMMARY_FILENAME)
+    summary = statistics.to_dict()
+    print(f"📊 {summary['food_count']} plats, {summary['image_count']} images → {summary_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Disposition des images traitées: plate ou répartie par hachage
+
+  flat    : images/<catégorie>/<fichier>
+  sharded : images/<catégorie>/<ab>/<cd>/<fichier>
+            où ab, cd sont les premiers octets du SHA-1 de l'image_id
+
+Le script permet aussi de migrer sur place une arborescence existante
+d'une disposition à l'autre. Il met à jour l'index JSON, la base SQLite si
+elle existe, et réécrit les triplets :imagePath déjà présents dans Fuseki.
+
+L'ImageController Java sert encore images/<catégorie>/<fichier>: seule la
+disposition plate est servie par l'API web. Passer à 'sharded' demande
+donc --allow-unserved-layout, tant que le contrôleur ne lit pas :imagePath.
+
+Usage:
+    python image_layout.py [--data-dir african_middle_eastern_data] [--to sharded|flat]
+                           [--allow-unserved-layout] [--skip-graph]
+                           [--fuseki-url http://localhost:3030] [--dataset african-middle-eastern-kg]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+LAYOUTS = ("flat", "sharded")
+SHARD_DEPTH = 2
+
+# Dispositions que l'ImageController Java sait servir
+SERVED_LAYOUTS = ("flat",)
+
+# Images par requête de réécriture des :imagePath
+PATH_UPDATE_BATCH = 500
+
+
+def check_layout(layout, allow_unserved=False):
+    """Refuser une disposition inconnue, ou non servie par l'API web sans accord explicite"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Disposition inconnue: {layout}")
+    if layout not in SERVED_LAYOUTS and not allow_unserved:
+        raise ValueError(
+            f"La disposition '{layout}' n'est pas servie par l'ImageController "
+            f"(images/<catégorie>/<fichier>): utilisez allow_unserved_layout / --allow-unserved-layout"
+        )
+
+
+def shard_parts(image_id, depth=SHARD_DEPTH):
+    """Sous-dossiers de hachage pour un image_id: ['ab', 'cd']"""
+    digest = hashlib.sha1(str(image_id).encode('utf-8')).hexdigest()
+    return [digest[2 * i:2 * i + 2] for i in range(depth)]
+
+
+def image_relative_path(category_name, filename, image_id, layout="flat"):
+    """Chemin relatif (depuis le dossier de données) d'une image traitée"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Disposition inconnue: {layout}")
+    parts = ["images", category_name]
+    if layout == "sharded":
+        parts.extend(shard_parts(image_id))
+    parts.append(filename)
+    return "/".join(parts)
+
+
+def image_path_updates(populator, images, batch_size=PATH_UPDATE_BATCH):
+    """Requêtes SPARQL qui remplacent le :imagePath des :FoodImage déjà dans le graphe
+
+    `images` est une liste de (image_id, chemin relatif). Les images absentes
+    du graphe ne sont pas créées.
+    """
+    queries = []
+    for start in range(0, len(images), batch_size):
+        values = "\n                ".join(
+            f'(<{populator.create_uri(image_id, "image_")}> "{populator.safe_string(path)}")'
+            for image_id, path in images[start:start + batch_size]
+        )
+        queries.append(f"""
+        PREFIX : <{populator.food_ns}>
+        DELETE {{ ?image :imagePath ?old }}
+        INSERT {{ ?image :imagePath ?new }}
+        WHERE {{
+            VALUES (?image ?new) {{
+                {values}
+            }}
+            ?image :imagePath ?old .
+        }}
+        """)
+    return queries
+
+
+def migrate_layout(data_dir, target_layout, populator=None):
+    """Déplacer les images vers la disposition cible et réécrire l'index
+
+    Les déplacements utilisent os.replace (pas de copie). La migration est
+    rejouable: une image déjà à sa place cible est simplement conservée, et
+    les :imagePath du graphe sont réécrits pour toutes les images de l'index.
+    Retourne (images déplacées, images introuvables, succès de la mise à jour du graphe).
+    """
+    data_path = Path(data_dir)
+    index_file = data_path / "metadata" / "african_middle_eastern_food_index.json"
+    with open(index_file, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+
+    moved = 0
+    missing = []
+    paths = []
+    for category_name, category_data in index.get('categories', {}).items():
+        for img in category_data.get('images', []):
+            current = data_path / img['relative_path']
+            new_relative = image_relative_path(
+                category_name, img['processed_filename'], img['image_id'], target_layout
+            )
+            target = data_path / new_relative
+
+            if current != target:
+                if current.exists():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(current, target)
+                    moved += 1
+                elif not target.exists():
+                    missing.append(img['relative_path'])
+                    continue
+
+            img['relative_path'] = new_relative
+            paths.append((img['image_id'], new_relative))
+
+    # Supprimer les sous-dossiers de hachage vidés
+    for category_name in index.get('categories', {}):
+        category_path = data_path / "images" / category_name
+        if not category_path.exists():
+            continue
+        for directory, _, _ in sorted(os.walk(category_path), key=lambda d: -len(d[0])):
+            if Path(directory) != category_path and not os.listdir(directory):
+                os.rmdir(directory)
+
+    index['layout'] = target_layout
+    tmp_file = index_file.with_suffix('.json.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, index_file)
+
+    # Base SQLite des métadonnées, si elle est tenue à jour
+    from metadata_store import DB_FILENAME, MetadataStore
+
+    db_path = data_path / "metadata" / DB_FILENAME
+    if db_path.exists():
+        with MetadataStore(db_path) as store:
+            store.update_image_paths(paths)
+
+    # Triplets :imagePath déjà publiés
+    graph_updated = True
+    if populator is not None:
+        for query in image_path_updates(populator, paths):
+            if not populator.execute_sparql_update(query):
+                graph_updated = False
+                break
+
+    return moved, missing, graph_updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrer la disposition des images traitées")
+    parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    parser.add_argument('--to', choices=LAYOUTS, default="sharded", help="Disposition cible")
+    parser.add_argument('--allow-unserved-layout', action='store_true',
+                        help="Autoriser une disposition que l'ImageController ne sert pas")
+    parser.add_argument('--skip-graph', action='store_true', help="Ne pas réécrire les :imagePath dans Fuseki")
+    parser.add_argument('--fuseki-url', default="http://localhost:3030")
+    parser.add_argument('--dataset', default="african-middle-eastern-kg")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.data_dir):
+        print(f"❌ Dossier {args.data_dir} non trouvé!")
+        return 1
+    try:
+        check_layout(args.to, args.allow_unserved_layout)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    populator = None
+    if not args.skip_graph:
+        from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+
+        populator = AfricanMiddleEasternPopulatorFixed(args.fuseki_url, args.dataset)
+
+    print(f"🔀 Migration vers la disposition '{args.to}'...")
+    moved, missing, graph_updated = migrate_layout(args.data_dir, args.to, populator)
+    print(f"✅ {moved} images déplacées")
+    if missing:
+        print(f"⚠️ {len(missing)} images introuvables:")
+        for path in missing[:10]:
+            print(f"   - {path}")
+    if populator is not None:
+        if graph_updated:
+            print("🔗 :imagePath réécrits dans Fuseki")
+        else:
+            print(f"❌ Réécriture des :imagePath interrompue: {populator.errors[-1]}")
+            print("   Relancer la migration (rejouable) une fois Fuseki disponible")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
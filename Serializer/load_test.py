@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Test de charge en lecture: rejoue le mélange de requêtes NutriGraph sur Fuseki
+
+Types de requêtes (mêmes formes que le populateur et SparqlService côté Java):
+  - count:           COUNT des plats (vérification du populateur)
+  - group_by:        plats par région, GROUP BY / ORDER BY (vérification du populateur)
+  - text:            recherche par nom, CONTAINS(LCASE(...))
+  - region:          plats d'une région
+  - nutrition_range: plats dans une plage de calories / protéines
+  - food_detail:     fiche d'un plat = détails + images + ingrédients (3 requêtes)
+
+Les paramètres (plats, régions, fragments de noms, plages) sont tirés du CSV
+nutritionnel. Deux modes de charge:
+  - --concurrency N: N clients en boucle fermée (chaque client attend sa réponse),
+  - --rate R:        R requêtes/s en boucle ouverte; la latence est mesurée depuis
+                     l'instant planifié, l'attente dans la file est donc comptée.
+Rapport: p50 / p95 / p99, moyenne et débit par type de requête.
+
+La cible est Fuseki, ou un enregistrement (commande record) rejoué comme
+substitut: mêmes réponses, latences enregistrées (--latency-scale). Contre
+Fuseki, --expect compare le nombre de lignes de chaque réponse à
+l'enregistrement, et --baseline compare le p95 à un rapport précédent: de quoi
+comparer les configurations TDB2 / ja:MemoryModel de fuseki-config/config.ttl
+ou la mémoire JVM (JVM_ARGS) et détecter une régression avant un déploiement.
+
+Usage:
+    python load_test.py record [--data-dir ...] [--fuseki-url ...] [--dataset ...] [--output recording.json]
+    python load_test.py run [--concurrency 8 | --rate 50] [--duration 30] [--warmup 5]
+                            [--mix text=3,food_detail=4,...] [--replay recording.json]
+                            [--expect recording.json] [--report report.json]
+                            [--baseline report.json] [--max-regression 0.25]
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import requests
+
+QUERY_TYPES = ("count", "group_by", "text", "region", "nutrition_range", "food_detail")
+
+# Poids par défaut: surtout des lectures d'écrans (recherche, fiches), peu d'agrégats
+DEFAULT_MIX = {
+    'count': 1,
+    'group_by': 1,
+    'text': 3,
+    'region': 2,
+    'nutrition_range': 2,
+    'food_detail': 4,
+}
+
+PERCENTILES = (50, 95, 99)
+
+DEFAULT_RECORDING = "load_test_recording.json"
+DEFAULT_MAX_REGRESSION = 0.25
+
+# Bornes des plages de calories / protéines tirées pour nutrition_range
+CALORIE_BANDS = ((0, 100), (100, 200), (200, 300), (300, 500), (150, 400))
+PROTEIN_BANDS = ((None, None), (5, None), (10, None), (None, 15))
+
+FOOD_NS = "http://example.org/food-ontology#"
+PREFIXES = f"""
+PREFIX : <{FOOD_NS}>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+"""
+
+
+def query_digest(query):
+    return hashlib.sha1(query.encode('utf-8')).hexdigest()
+
+
+def parse_mix(spec):
+    """'text=3,food_detail=4' → poids par type (les types absents valent 0)"""
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in QUERY_TYPES:
+            raise ValueError(f"Type de requête inconnu: {name} (types: {', '.join(QUERY_TYPES)})")
+        mix[name] = float(weight) if weight else 1.0
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("Mélange vide")
+    return mix
+
+
+class QueryMix:
+    """Génère les requêtes de chaque type à partir des plats du CSV nutritionnel"""
+
+    def __init__(self, data_dir, mix=None):
+        self.mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+        self.foods = []
+        self.regions = set()
+        self.fragments = set()
+
+        nutrition_file = Path(data_dir) / "nutritional" / "african_middle_eastern_nutritional.csv"
+        with open(nutrition_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                food_name = row.get('food_name', '').strip()
+                if not food_name:
+                    continue
+                self.foods.append(self.food_uri(food_name))
+                if row.get('region'):
+                    self.regions.add(row['region'])
+                for word in food_name.replace('_', ' ').split():
+                    if len(word) > 3:
+                        self.fragments.add(word[:5].lower())
+
+        if not self.foods:
+            raise ValueError(f"Aucun plat dans {nutrition_file}")
+        self.regions = sorted(self.regions) or ["Unknown"]
+        self.fragments = sorted(self.fragments) or ["a"]
+
+    @staticmethod
+    def food_uri(name):
+        """Même URI que AfricanMiddleEasternPopulatorFixed.create_uri"""
+        clean_name = "".join(c if c.isalnum() else "_" for c in str(name)).strip("_")
+        return f"{FOOD_NS}{clean_name}"
+
+    # --- Formes de requêtes ---
+
+    @staticmethod
+    def count_query():
+        return [f"""{PREFIXES}
+SELECT (COUNT(?food) as ?count) WHERE {{
+    ?food :name ?name .
+}}
+"""]
+
+    @staticmethod
+    def group_by_query():
+        return [f"""{PREFIXES}
+SELECT ?region (COUNT(?food) as ?count) WHERE {{
+    ?food :region ?region .
+}}
+GROUP BY ?region
+ORDER BY DESC(?count)
+"""]
+
+    @staticmethod
+    def text_query(fragment):
+        return [f"""{PREFIXES}
+SELECT ?food ?name ?class ?classLabel ?calories ?protein ?description WHERE {{
+    ?food :name ?name ;
+          a ?class .
+    ?class rdfs:label ?classLabel .
+    OPTIONAL {{ ?food :calories ?calories }}
+    OPTIONAL {{ ?food :protein ?protein }}
+    OPTIONAL {{ ?food :description ?description }}
+    FILTER(CONTAINS(LCASE(?name), LCASE("{fragment}")))
+    FILTER(?class != <http://www.w3.org/2002/07/owl#NamedIndividual>)
+}}
+ORDER BY ?name
+LIMIT 50
+"""]
+
+    @staticmethod
+    def region_query(region):
+        return [f"""{PREFIXES}
+SELECT ?food ?name ?class ?classLabel ?spiceLevel ?cookingMethod ?calories WHERE {{
+    ?food :name ?name ;
+          a ?class ;
+          :region "{region}" .
+    ?class rdfs:label ?classLabel .
+    OPTIONAL {{ ?food :spiceLevel ?spiceLevel }}
+    OPTIONAL {{ ?food :cookingMethod ?cookingMethod }}
+    OPTIONAL {{ ?food :calories ?calories }}
+    FILTER(?class != <http://www.w3.org/2002/07/owl#NamedIndividual>)
+}}
+ORDER BY ?name
+"""]
+
+    @staticmethod
+    def nutrition_range_query(calories, protein):
+        filters = []
+        for var, (low, high) in (('calories', calories), ('protein', protein)):
+            if low is not None:
+                filters.append(f"    FILTER(?{var} >= {float(low)})")
+            if high is not None:
+                filters.append(f"    FILTER(?{var} <= {float(high)})")
+        filters = "\n".join(filters)
+        return [f"""{PREFIXES}
+SELECT ?food ?name ?class ?classLabel ?calories ?protein ?carbohydrates ?fat WHERE {{
+    ?food :name ?name ;
+          a ?class ;
+          :calories ?calories ;
+          :protein ?protein .
+    ?class rdfs:label ?classLabel .
+    OPTIONAL {{ ?food :carbohydrates ?carbohydrates }}
+    OPTIONAL {{ ?food :fat ?fat }}
+    FILTER(?class != <http://www.w3.org/2002/07/owl#NamedIndividual>)
+{filters}
+}}
+ORDER BY ?calories
+LIMIT 100
+"""]
+
+    @staticmethod
+    def food_detail_queries(food_uri):
+        optionals = "\n".join(
+            f"    OPTIONAL {{ <{food_uri}> :{prop} ?{prop} }}"
+            for prop in ('calories', 'protein', 'carbohydrates', 'fat', 'fiber', 'sodium', 'sugar', 'description')
+        )
+        details = f"""{PREFIXES}
+SELECT ?name ?class ?classLabel ?group ?groupName ?calories ?protein ?carbohydrates ?fat ?fiber ?sodium ?sugar ?description WHERE {{
+    <{food_uri}> :name ?name ;
+                 a ?class .
+    ?class rdfs:label ?classLabel .
+    OPTIONAL {{ <{food_uri}> :belongsTo ?group . ?group :name ?groupName }}
+{optionals}
+}}
+"""
+        images = f"""{PREFIXES}
+SELECT ?image ?imagePath ?filename ?width ?height WHERE {{
+    <{food_uri}> :hasImage ?image .
+    ?image :imagePath ?imagePath .
+    OPTIONAL {{ ?image :filename ?filename }}
+    OPTIONAL {{ ?image :width ?width }}
+    OPTIONAL {{ ?image :height ?height }}
+}}
+"""
+        ingredients = f"""{PREFIXES}
+SELECT ?ingredientName WHERE {{
+    <{food_uri}> :contains ?ingredient .
+    ?ingredient :name ?ingredientName .
+}}
+ORDER BY ?ingredientName
+"""
+        return [details, images, ingredients]
+
+    # --- Tirage et énumération ---
+
+    def _queries(self, query_type, choose):
+        if query_type == "count":
+            return self.count_query()
+        if query_type == "group_by":
+            return self.group_by_query()
+        if query_type == "text":
+            return self.text_query(choose(self.fragments))
+        if query_type == "region":
+            return self.region_query(choose(self.regions))
+        if query_type == "nutrition_range":
+            return self.nutrition_range_query(choose(CALORIE_BANDS), choose(PROTEIN_BANDS))
+        return self.food_detail_queries(choose(self.foods))
+
+    def sample(self, rng):
+        """(type, requêtes) tiré selon les poids du mélange"""
+        query_type = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        return query_type, self._queries(query_type, rng.choice)
+
+    def all_queries(self):
+        """Toutes les requêtes que sample() peut produire (pour l'enregistrement)"""
+        pools = {
+            'count': [()],
+            'group_by': [()],
+            'text': self.fragments,
+            'region': self.regions,
+            'nutrition_range': [(c, p) for c in CALORIE_BANDS for p in PROTEIN_BANDS],
+            'food_detail': self.foods,
+        }
+        for query_type in QUERY_TYPES:
+            for params in pools[query_type]:
+                if query_type == "nutrition_range":
+                    yield query_type, self.nutrition_range_query(*params)
+                else:
+                    yield query_type, self._queries(query_type, lambda pool: params)
+
+
+class FusekiBackend:
+    """Envoie les requêtes au endpoint /query (une session HTTP par client)"""
+
+    def __init__(self, fuseki_server="http://localhost:3030", dataset_name="african-middle-eastern-kg", timeout=60):
+        self.query_endpoint = f"{fuseki_server.rstrip('/')}/{dataset_name}/query"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def execute(self, query):
+        """Bindings de la réponse; lève une exception en cas d'échec"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.post(
+            self.query_endpoint,
+            data={'query': query},
+            headers={'Accept': 'application/sparql-results+json'},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()['results']['bindings']
+
+
+class RecordedBackend:
+    """Substitut de Fuseki: rejoue les réponses enregistrées avec leur latence"""
+
+    def __init__(self, recording, latency_scale=1.0):
+        self.responses = recording['responses']
+        self.latency_scale = latency_scale
+
+    def execute(self, query):
+        response = self.responses.get(query_digest(query))
+        if response is None:
+            raise KeyError(f"Requête absente de l'enregistrement ({query_digest(query)[:12]})")
+        if self.latency_scale > 0:
+            time.sleep(response['latency'] * self.latency_scale)
+        return response['bindings']
+
+
+def load_recording(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def record(backend, query_mix, output_file, target):
+    """Exécuter une fois chaque requête possible et enregistrer réponse et latence"""
+    responses = {}
+    failures = 0
+    for query_type, queries in query_mix.all_queries():
+        for query in queries:
+            digest = query_digest(query)
+            if digest in responses:
+                continue
+            start = time.perf_counter()
+            try:
+                bindings = backend.execute(query)
+            except Exception as e:
+                failures += 1
+                print(f"   ❌ {query_type}: {e}")
+                continue
+            responses[digest] = {
+                'type': query_type,
+                'latency': time.perf_counter() - start,
+                'rows': len(bindings),
+                'bindings': bindings,
+            }
+
+    recording = {'target': target, 'date': datetime.now().isoformat(), 'responses': responses}
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(recording, f, ensure_ascii=False)
+    print(f"🎙️ {len(responses)} réponses enregistrées → {output_file} ({failures} échecs)")
+    return failures == 0
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies = defaultdict(list)   # type → latences (s) des requêtes réussies
+        self.errors = defaultdict(int)
+        self.mismatches = defaultdict(int)   # nombre de lignes différent de l'enregistrement
+        self.first_errors = {}
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, query_type, latency, error=None, mismatch=False):
+        with self._lock:
+            if error is not None:
+                self.errors[query_type] += 1
+                self.first_errors.setdefault(query_type, error)
+            else:
+                self.latencies[query_type].append(latency)
+                if mismatch:
+                    self.mismatches[query_type] += 1
+
+    def summary(self):
+        """Statistiques par type (latences en ms, débit en requêtes/s)"""
+        summary = {}
+        for query_type in sorted(set(self.latencies) | set(self.errors)):
+            latencies = np.array(self.latencies.get(query_type, []), dtype=np.float64) * 1000
+            stats = {
+                'requests': int(latencies.size),
+                'errors': self.errors.get(query_type, 0),
+                'mismatches': self.mismatches.get(query_type, 0),
+                'throughput': round(latencies.size / self.elapsed, 2) if self.elapsed else 0.0,
+            }
+            if latencies.size:
+                stats['mean_ms'] = round(float(latencies.mean()), 2)
+                for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+                    stats[f'p{p}_ms'] = round(float(value), 2)
+            summary[query_type] = stats
+        return summary
+
+    def print_report(self):
+        summary = self.summary()
+        total = sum(stats['requests'] for stats in summary.values())
+        print(f"\n📈 {total} requêtes réussies en {self.elapsed:.1f}s ({total / max(self.elapsed, 1e-9):.1f} req/s)")
+        header = f"   {'type':<16}{'req':>7}{'err':>6}{'req/s':>9}{'moy':>9}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+        print(header + "   (ms)")
+        for query_type, stats in summary.items():
+            line = f"   {query_type:<16}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput']:>9.1f}"
+            if stats['requests']:
+                line += f"{stats['mean_ms']:>9.1f}" + "".join(f"{stats[f'p{p}_ms']:>9.1f}" for p in PERCENTILES)
+            print(line)
+        for query_type, error in self.first_errors.items():
+            print(f"   ❌ {query_type}: {error}")
+        for query_type, count in self.mismatches.items():
+            print(f"   ⚠️ {query_type}: {count} réponses avec un nombre de lignes différent de l'enregistrement")
+
+
+def run_load(backend, query_mix, concurrency=8, rate=None, duration=30.0, warmup=0.0,
+             max_requests=None, expected=None, seed=None):
+    """Lancer la charge; seules les requêtes commencées après le préchauffage sont mesurées
+
+    Aucune requête n'est commencée après l'échéance; la durée mesurée va
+    jusqu'à la fin de la dernière, pour que le débit rapporte des requêtes
+    terminées à la durée réellement écoulée.
+    """
+    result = LoadResult()
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+    sent = [0]
+
+    def next_sample():
+        """Tirage suivant, ou None quand la limite de requêtes est atteinte"""
+        with rng_lock:
+            if max_requests is not None and sent[0] >= max_requests:
+                return None
+            sent[0] += 1
+            return query_mix.sample(rng)
+
+    def execute(query_type, queries, scheduled):
+        error = None
+        mismatch = False
+        try:
+            for query in queries:
+                bindings = backend.execute(query)
+                if expected is not None:
+                    response = expected.get(query_digest(query))
+                    mismatch = mismatch or (response is not None and response['rows'] != len(bindings))
+        except Exception as e:
+            error = str(e)
+        if scheduled >= measure_from:
+            result.add(query_type, time.perf_counter() - scheduled, error, mismatch)
+
+    if rate is None:
+        # Boucle fermée: chaque client enchaîne ses requêtes
+        def client():
+            while time.perf_counter() < deadline:
+                sample = next_sample()
+                if sample is None:
+                    return
+                execute(*sample, time.perf_counter())
+        workers = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    else:
+        # Boucle ouverte: arrivées planifiées à intervalle fixe, servies par un pool de clients
+        arrivals = queue.Queue()
+
+        def scheduler():
+            scheduled = start
+            while scheduled < deadline:
+                sample = next_sample()
+                if sample is None:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                arrivals.put((sample, scheduled))
+                scheduled += 1.0 / rate
+            for _ in range(concurrency):
+                arrivals.put(None)
+
+        def client():
+            while True:
+                item = arrivals.get()
+                if item is None:
+                    return
+                (query_type, queries), scheduled = item
+                execute(query_type, queries, scheduled)
+        workers = [threading.Thread(target=scheduler, daemon=True)]
+        workers += [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # Jusqu'à la dernière réponse: les requêtes commencées avant l'échéance et
+    # terminées après sont comptées, leur temps aussi
+    result.elapsed = max(time.perf_counter() - measure_from, 1e-9)
+    return result
+
+
+def compare_with_baseline(summary, baseline, max_regression=DEFAULT_MAX_REGRESSION):
+    """Types dont le p95 dépasse celui du rapport de référence de plus de max_regression"""
+    regressions = []
+    for query_type, stats in summary.items():
+        reference = baseline.get('summary', {}).get(query_type, {})
+        if 'p95_ms' in stats and reference.get('p95_ms'):
+            ratio = stats['p95_ms'] / reference['p95_ms'] - 1
+            if ratio > max_regression:
+                regressions.append((query_type, reference['p95_ms'], stats['p95_ms'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge en lecture sur Fuseki (mélange de requêtes NutriGraph)")
+    parser.add_argument('command', choices=("record", "run"))
+    parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    parser.add_argument('--fuseki-url', default="http://localhost:3030")
+    parser.add_argument('--dataset', default="african-middle-eastern-kg")
+    parser.add_argument('--output', default=DEFAULT_RECORDING, help="Fichier d'enregistrement (record)")
+    parser.add_argument('--mix', help="Poids par type, ex. text=3,food_detail=4 (défaut: mélange standard)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Clients simultanés")
+    parser.add_argument('--rate', type=float, help="Débit cible en requêtes/s (boucle ouverte)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Durée mesurée (s)")
+    parser.add_argument('--warmup', type=float, default=0.0, help="Préchauffage non mesuré (s)")
+    parser.add_argument('--requests', type=int, help="Nombre maximal de requêtes")
+    parser.add_argument('--seed', type=int, help="Graine du tirage des requêtes")
+    parser.add_argument('--replay', help="Rejouer un enregistrement au lieu d'interroger Fuseki")
+    parser.add_argument('--latency-scale', type=float, default=1.0, help="Facteur des latences rejouées (0: aucune)")
+    parser.add_argument('--expect', help="Enregistrement de référence pour vérifier le nombre de lignes")
+    parser.add_argument('--report', help="Écrire le rapport JSON")
+    parser.add_argument('--baseline', help="Rapport JSON de référence (p95 par type)")
+    parser.add_argument('--max-regression', type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="Hausse relative du p95 tolérée par rapport à la référence")
+    args = parser.parse_args(argv)
+
+    try:
+        query_mix = QueryMix(args.data_dir, parse_mix(args.mix))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    if args.command == "record":
+        backend = FusekiBackend(args.fuseki_url, args.dataset)
+        target = f"{args.fuseki_url.rstrip('/')}/{args.dataset}"
+        return 0 if record(backend, query_mix, args.output, target) else 1
+
+    if args.replay:
+        backend = RecordedBackend(load_recording(args.replay), args.latency_scale)
+        target = f"replay:{args.replay}"
+    else:
+        backend = FusekiBackend(args.fuseki_url, args.dataset)
+        target = f"{args.fuseki_url.rstrip('/')}/{args.dataset}"
+    expected = load_recording(args.expect)['responses'] if args.expect else None
+
+    mode = f"{args.rate:g} req/s" if args.rate else "boucle fermée"
+    print(f"🏋️ Charge sur {target}: {args.concurrency} clients, {mode}, {args.duration:g}s "
+          f"(+{args.warmup:g}s de préchauffage)")
+    print(f"   Mélange: {', '.join(f'{name}={weight:g}' for name, weight in query_mix.mix.items())}")
+
+    result = run_load(backend, query_mix, args.concurrency, args.rate, args.duration, args.warmup,
+                      args.requests, expected, args.seed)
+    result.print_report()
+    summary = result.summary()
+
+    if args.report:
+        report = {
+            'target': target,
+            'date': datetime.now().isoformat(),
+            'concurrency': args.concurrency,
+            'rate': args.rate,
+            'duration': result.elapsed,
+            'mix': query_mix.mix,
+            'summary': summary,
+        }
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Rapport → {args.report}")
+
+    failed = any(stats['errors'] or stats['mismatches'] for stats in summary.values())
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(summary, json.load(f), args.max_regression)
+        for query_type, before, after, ratio in regressions:
+            print(f"   📉 {query_type}: p95 {before:.1f} → {after:.1f} ms (+{ratio:.0%})")
+        if not regressions:
+            print(f"   ✅ Aucune régression de p95 au-delà de {args.max_regression:.0%}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
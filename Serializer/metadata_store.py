@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Base SQLite des métadonnées (alternative à l'index JSON)
+
+Tables normalisées: catégories (avec leur ligne nutritionnelle), images,
+ingrédients et liaison catégorie ↔ ingrédient, indexées par catégorie,
+région, méthode de cuisson et empreinte de contenu. La base est en mode
+WAL: les lecteurs (populateur, scripts d'audit, backend) interrogent
+directement la base pendant qu'une ingestion écrit.
+
+Usage:
+    python metadata_store.py import [--data-dir african_middle_eastern_data]
+    python metadata_store.py stats  [--data-dir african_middle_eastern_data]
+    python metadata_store.py push   [--data-dir ...] [--all] [--fuseki-url http://localhost:3030]
+                                    [--dataset african-middle-eastern-kg]   (upsert des plats modifiés)
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+DB_FILENAME = "african_middle_eastern_food.db"
+
+CATEGORY_COLUMNS = [
+    'name', 'original_folder_name', 'owl_class', 'food_type', 'region', 'cooking_method',
+    'main_ingredient', 'calories_per_100g', 'proteins', 'carbohydrates', 'fats',
+    'fiber', 'sodium', 'sugar', 'allergens', 'description', 'spice_level',
+    'cultural_significance'
+]
+
+IMAGE_COLUMNS = [
+    'image_id', 'category', 'filename', 'file_size', 'creation_date', 'width', 'height',
+    'format', 'mode', 'aspect_ratio', 'original_category_name', 'original_filename',
+    'processed_filename', 'relative_path', 'image_number', 'content_hash',
+    'shard', 'shard_offset', 'shard_length'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    name TEXT PRIMARY KEY,
+    original_folder_name TEXT,
+    owl_class TEXT,
+    food_type TEXT,
+    region TEXT,
+    cooking_method TEXT,
+    main_ingredient TEXT,
+    calories_per_100g REAL,
+    proteins REAL,
+    carbohydrates REAL,
+    fats REAL,
+    fiber REAL,
+    sodium REAL,
+    sugar REAL,
+    allergens TEXT,
+    description TEXT,
+    spice_level TEXT,
+    cultural_significance TEXT,
+    total_images INTEGER NOT NULL DEFAULT 0,
+    -- 1 quand la catégorie a changé depuis le dernier envoi à Fuseki
+    dirty INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_categories_region ON categories(region);
+CREATE INDEX IF NOT EXISTS idx_categories_cooking_method ON categories(cooking_method);
+CREATE INDEX IF NOT EXISTS idx_categories_dirty ON categories(dirty) WHERE dirty = 1;
+
+CREATE TABLE IF NOT EXISTS images (
+    image_id TEXT PRIMARY KEY,
+    category TEXT NOT NULL REFERENCES categories(name),
+    filename TEXT,
+    file_size INTEGER,
+    creation_date TEXT,
+    width INTEGER,
+    height INTEGER,
+    format TEXT,
+    mode TEXT,
+    aspect_ratio REAL,
+    original_category_name TEXT,
+    original_filename TEXT,
+    processed_filename TEXT,
+    relative_path TEXT,
+    image_number INTEGER,
+    content_hash TEXT,
+    shard TEXT,
+    shard_offset INTEGER,
+    shard_length INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_images_category ON images(category, image_number);
+CREATE INDEX IF NOT EXISTS idx_images_content_hash ON images(content_hash);
+
+CREATE TABLE IF NOT EXISTS ingredients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS category_ingredients (
+    category TEXT NOT NULL REFERENCES categories(name),
+    ingredient_id INTEGER NOT NULL REFERENCES ingredients(id),
+    position INTEGER NOT NULL,
+    PRIMARY KEY (category, ingredient_id)
+);
+CREATE INDEX IF NOT EXISTS idx_category_ingredients_ingredient ON category_ingredients(ingredient_id);
+"""
+
+
+def _upsert_sql(table, columns, key):
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != key)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT({key}) DO UPDATE SET {updates}"
+    )
+
+
+def _number(value):
+    return None if value in ('', None) else float(value)
+
+
+class MetadataStore:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Écriture ---------------------------------------------------------------
+
+    def upsert_category(self, category_name, category_data, nutritional_row):
+        """Insérer ou mettre à jour une catégorie, ses ingrédients et ses images (une transaction)"""
+        with self.conn:
+            self._upsert_category(category_name, category_data, nutritional_row)
+
+    def upsert_categories(self, items):
+        """Version par lot: items = [(nom, données, ligne nutritionnelle), ...]"""
+        with self.conn:
+            for category_name, category_data, nutritional_row in items:
+                self._upsert_category(category_name, category_data, nutritional_row)
+
+    def _upsert_category(self, category_name, category_data, row):
+        values = {
+            'name': category_name,
+            'original_folder_name': category_data.get('original_folder_name'),
+            'owl_class': row.get('owl_class'),
+            'food_type': row.get('food_type'),
+            'region': row.get('region'),
+            'cooking_method': row.get('cooking_method'),
+            'main_ingredient': row.get('main_ingredient'),
+            'allergens': row.get('allergens'),
+            'description': row.get('description'),
+            'spice_level': row.get('spice_level'),
+            'cultural_significance': row.get('cultural_significance'),
+        }
+        for nutrient in ('calories_per_100g', 'proteins', 'carbohydrates', 'fats', 'fiber', 'sodium', 'sugar'):
+            values[nutrient] = _number(row.get(nutrient))
+
+        previous = self.conn.execute(
+            f"SELECT {', '.join(CATEGORY_COLUMNS)} FROM categories WHERE name = ?", (category_name,)
+        ).fetchone()
+        changed = previous is None or any(previous[c] != values[c] for c in CATEGORY_COLUMNS)
+
+        self.conn.execute(
+            _upsert_sql('categories', CATEGORY_COLUMNS, 'name'),
+            [values[c] for c in CATEGORY_COLUMNS]
+        )
+
+        # Ingrédients
+        ingredients = [i.strip() for i in (row.get('ingredients') or '').split(',') if i.strip() and i.strip() != 'unknown']
+        self.conn.executemany("INSERT OR IGNORE INTO ingredients (name) VALUES (?)", [(i,) for i in ingredients])
+        self.conn.execute("DELETE FROM category_ingredients WHERE category = ?", (category_name,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO category_ingredients (category, ingredient_id, position) "
+            "SELECT ?, id, ? FROM ingredients WHERE name = ?",
+            [(category_name, position, name) for position, name in enumerate(ingredients)]
+        )
+
+        # Images
+        images = category_data.get('images', [])
+        known = {r['image_id'] for r in self.conn.execute(
+            "SELECT image_id FROM images WHERE category = ?", (category_name,)
+        )}
+        new_ids = {img['image_id'] for img in images}
+        # La liste reçue fait foi: retirer les images disparues ou mises en quarantaine
+        vanished = known - new_ids
+        if vanished:
+            self.conn.executemany("DELETE FROM images WHERE image_id = ?", [(i,) for i in vanished])
+        changed = changed or bool(new_ids - known) or bool(vanished)
+
+        self.conn.executemany(
+            _upsert_sql('images', IMAGE_COLUMNS, 'image_id'),
+            [[category_name if c == 'category' else img.get(c) for c in IMAGE_COLUMNS] for img in images]
+        )
+        total = self.conn.execute("SELECT COUNT(*) FROM images WHERE category = ?", (category_name,)).fetchone()[0]
+
+        self.conn.execute(
+            "UPDATE categories SET total_images = ?, dirty = CASE WHEN ? THEN 1 ELSE dirty END WHERE name = ?",
+            (total, int(changed), category_name)
+        )
+
+    def remove_categories_except(self, category_names):
+        """Supprimer les catégories absentes de `category_names` (et leurs images); retourne leurs noms"""
+        keep = set(category_names)
+        removed = [r[0] for r in self.conn.execute("SELECT name FROM categories") if r[0] not in keep]
+        with self.conn:
+            for table, column in (('images', 'category'), ('category_ingredients', 'category'), ('categories', 'name')):
+                self.conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(n,) for n in removed])
+        return removed
+
+    def update_image_paths(self, paths):
+        """Mettre à jour les chemins relatifs après une migration de disposition: [(image_id, chemin)]"""
+        with self.conn:
+            self.conn.executemany("UPDATE images SET relative_path = ? WHERE image_id = ?",
+                                  [(path, image_id) for image_id, path in paths])
+
+    def mark_pushed(self, category_names):
+        """Marquer des catégories comme envoyées à Fuseki"""
+        with self.conn:
+            self.conn.executemany("UPDATE categories SET dirty = 0 WHERE name = ?", [(n,) for n in category_names])
+
+    # Lecture ----------------------------------------------------------------
+
+    def find_categories(self, region=None, cooking_method=None, owl_class=None, ingredient=None, dirty_only=False):
+        """Noms des catégories correspondant aux critères (utilise les index)"""
+        query = "SELECT c.name FROM categories c"
+        clauses, params = [], []
+        if ingredient is not None:
+            query += (" JOIN category_ingredients ci ON ci.category = c.name"
+                      " JOIN ingredients i ON i.id = ci.ingredient_id")
+            clauses.append("i.name = ?")
+            params.append(ingredient)
+        for column, value in (('region', region), ('cooking_method', cooking_method), ('owl_class', owl_class)):
+            if value is not None:
+                clauses.append(f"c.{column} = ?")
+                params.append(value)
+        if dirty_only:
+            clauses.append("c.dirty = 1")
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY c.name"
+        return [r[0] for r in self.conn.execute(query, params)]
+
+    def category_images(self, category_name, limit=None):
+        """Images d'une catégorie, avec la clé 'category_name' de l'index JSON (filtre du populateur)"""
+        query = "SELECT *, category AS category_name FROM images WHERE category = ? ORDER BY image_number"
+        params = [category_name]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [dict(r) for r in self.conn.execute(query, params)]
+
+    def find_by_content_hash(self, content_hash):
+        return [dict(r) for r in self.conn.execute("SELECT * FROM images WHERE content_hash = ?", (content_hash,))]
+
+    def category_ingredients(self, category_name):
+        return [r[0] for r in self.conn.execute(
+            "SELECT i.name FROM category_ingredients ci JOIN ingredients i ON i.id = ci.ingredient_id "
+            "WHERE ci.category = ? ORDER BY ci.position", (category_name,)
+        )]
+
+    def nutritional_row(self, category_name):
+        """Ligne au format du CSV nutritionnel (pour le populateur)"""
+        r = self.conn.execute("SELECT * FROM categories WHERE name = ?", (category_name,)).fetchone()
+        if r is None:
+            return None
+        row = {c: ("" if r[c] is None else r[c]) for c in CATEGORY_COLUMNS if c not in ('name', 'original_folder_name')}
+        row['food_name'] = r['name']
+        row['category'] = r['food_type']
+        row['ingredients'] = ",".join(self.category_ingredients(category_name))
+        return row
+
+    def iter_records(self, dirty_only=False, images_per_category=None):
+        """(ligne nutritionnelle, images) par catégorie, pour populate_from_records"""
+        for name in self.find_categories(dirty_only=dirty_only):
+            yield self.nutritional_row(name), self.category_images(name, images_per_category)
+
+    def stats(self):
+        return {
+            'categories': self.conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0],
+            'images': self.conn.execute("SELECT COUNT(*) FROM images").fetchone()[0],
+            'ingredients': self.conn.execute("SELECT COUNT(*) FROM ingredients").fetchone()[0],
+            'dirty': self.conn.execute("SELECT COUNT(*) FROM categories WHERE dirty = 1").fetchone()[0],
+            'regions': dict(self.conn.execute(
+                "SELECT region, COUNT(*) FROM categories GROUP BY region ORDER BY region"
+            ).fetchall()),
+        }
+
+
+def import_json_index(store, processor):
+    """Importer l'index JSON et le CSV existants dans la base"""
+    index_file = processor.metadata_dir / "african_middle_eastern_food_index.json"
+    with open(index_file, 'r', encoding='utf-8') as f:
+        organized_data = json.load(f).get('categories', {})
+
+    rows = {row['food_name']: row for row in processor.nutritional_rows(organized_data)}
+    store.upsert_categories(
+        (name, data, rows[name]) for name, data in organized_data.items()
+    )
+    removed = store.remove_categories_except(organized_data)
+    if removed:
+        print(f"🗑️ {len(removed)} catégories absentes de l'index supprimées")
+    return len(organized_data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Base SQLite des métadonnées")
+    parser.add_argument('command', choices=('import', 'stats', 'push'))
+    parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    parser.add_argument('--all', action='store_true', help="push: renvoyer tous les plats, pas seulement les modifiés")
+    parser.add_argument('--fuseki-url', default="http://localhost:3030")
+    parser.add_argument('--dataset', default="african-middle-eastern-kg")
+    args = parser.parse_args(argv)
+
+    db_path = Path(args.data_dir) / "metadata" / DB_FILENAME
+
+    with MetadataStore(db_path) as store:
+        if args.command == 'import':
+            from african_middle_eastern_food_processor import AfricanMiddleEasternFoodProcessor
+
+            count = import_json_index(store, AfricanMiddleEasternFoodProcessor(args.data_dir))
+            print(f"✅ {count} catégories importées dans {db_path}")
+
+        if args.command == 'push':
+            from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+
+            populator = AfricanMiddleEasternPopulatorFixed(args.fuseki_url, args.dataset)
+            if not populator.test_endpoints():
+                print("❌ Endpoints non fonctionnels")
+                return 1
+            if not populator.populate_from_store(store, changed_only=not args.all):
+                return 1
+
+        for key, value in store.stats().items():
+            print(f"   {key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
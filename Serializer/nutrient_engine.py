@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Moteur de calcul nutritionnel vectorisé à partir de la composition des plats
+
+Le moteur maintient deux matrices :
+  - ingrédients × nutriments (valeurs pour 100g de chaque ingrédient)
+  - plats × ingrédients (matrice creuse des grammes de chaque ingrédient)
+Le profil de chaque plat (pour 100g) est obtenu par un seul produit matriciel.
+"""
+
+import csv
+
+import numpy as np
+from scipy import sparse
+
+# Colonnes nutritionnelles du CSV (pour 100g)
+NUTRIENTS = (
+    'calories_per_100g', 'proteins', 'carbohydrates', 'fats',
+    'fiber', 'sodium', 'sugar'
+)
+
+# Composition de référence des ingrédients (valeurs approximatives pour 100g)
+# calories, protéines, glucides, lipides, fibres, sodium (mg), sucres,
+# puis grammes typiques de l'ingrédient dans une recette
+DEFAULT_INGREDIENT_COMPOSITION = {
+    "whole_wheat_flour": (340, 13.2, 72.0, 2.5, 10.7, 2, 0.4, 100),
+    "wheat_flour":       (364, 10.3, 76.3, 1.0, 2.7, 2, 0.3, 100),
+    "flour":             (364, 10.3, 76.3, 1.0, 2.7, 2, 0.3, 100),
+    "water":             (0, 0.0, 0.0, 0.0, 0.0, 0, 0.0, 60),
+    "salt":              (0, 0.0, 0.0, 0.0, 0.0, 38758, 0.0, 1.5),
+    "maize":             (365, 9.4, 74.3, 4.7, 7.3, 35, 0.6, 50),
+    "finger_millet":     (336, 7.3, 72.0, 1.3, 3.6, 11, 0.6, 50),
+    "milk":              (61, 3.2, 4.8, 3.3, 0.0, 43, 5.1, 100),
+    "eggs":              (143, 12.6, 0.7, 9.5, 0.0, 142, 0.4, 100),
+    "sugar":             (387, 0.0, 100.0, 0.0, 0.0, 1, 100.0, 10),
+    "baking_powder":     (53, 0.0, 27.7, 0.0, 0.2, 10600, 0.0, 2),
+    "oil":               (884, 0.0, 0.0, 100.0, 0.0, 0, 0.0, 10),
+    "beef":              (250, 26.0, 0.0, 15.0, 0.0, 72, 0.0, 80),
+    "meat":              (250, 26.0, 0.0, 15.0, 0.0, 72, 0.0, 80),
+    "lamb":              (282, 16.6, 0.0, 23.4, 0.0, 59, 0.0, 100),
+    "liver":             (135, 20.4, 3.9, 3.6, 0.0, 69, 0.0, 100),
+    "onions":            (40, 1.1, 9.3, 0.1, 1.7, 4, 4.2, 30),
+    "garlic":            (149, 6.4, 33.0, 0.5, 2.1, 17, 1.0, 5),
+    "spices":            (300, 12.0, 55.0, 10.0, 30.0, 50, 3.0, 2),
+    "herbs":             (36, 3.0, 6.3, 0.8, 3.3, 56, 0.9, 5),
+    "parsley":           (36, 3.0, 6.3, 0.8, 3.3, 56, 0.9, 10),
+    "coriander":         (23, 2.1, 3.7, 0.5, 2.8, 46, 0.9, 5),
+    "lemon":             (29, 1.1, 9.3, 0.3, 2.8, 2, 2.5, 10),
+    "vegetables":        (65, 2.8, 13.0, 0.3, 4.0, 40, 4.0, 80),
+    "potatoes":          (77, 2.0, 17.5, 0.1, 2.2, 6, 0.8, 100),
+    "tomatoes":          (18, 0.9, 3.9, 0.2, 1.2, 5, 2.6, 40),
+    "cabbage":           (25, 1.3, 5.8, 0.1, 2.5, 18, 3.2, 150),
+    "kale":              (49, 4.3, 8.8, 0.9, 3.6, 38, 2.3, 150),
+    "amaranth_leaves":   (23, 2.5, 4.0, 0.3, 2.2, 20, 0.0, 150),
+    "jute_mallow":       (34, 4.7, 5.8, 0.3, 2.0, 8, 0.0, 100),
+    "molokhia_leaves":   (34, 4.7, 5.8, 0.3, 2.0, 8, 0.0, 100),
+    "pumpkin_leaves":    (19, 3.2, 2.3, 0.4, 2.2, 11, 0.0, 100),
+    "okra":              (33, 1.9, 7.5, 0.2, 3.2, 7, 1.5, 150),
+    "grape_leaves":      (93, 5.6, 17.3, 2.1, 11.0, 9, 6.3, 40),
+    "bread":             (265, 9.0, 49.0, 3.2, 2.7, 491, 5.0, 60),
+    "rice":              (130, 2.7, 28.0, 0.3, 0.4, 1, 0.1, 100),
+    "noodles":           (138, 4.5, 25.0, 2.0, 1.2, 6, 0.6, 30),
+    "bulgur":            (83, 3.1, 18.6, 0.2, 4.5, 5, 0.1, 100),
+    "broth":             (7, 1.0, 0.6, 0.2, 0.0, 340, 0.3, 200),
+    "sesame_seeds":      (573, 17.7, 23.4, 49.7, 11.8, 11, 0.3, 100),
+    "rennet":            (0, 0.0, 0.0, 0.0, 0.0, 0, 0.0, 0.1),
+    "cultures":          (0, 0.0, 0.0, 0.0, 0.0, 0, 0.0, 0.1),
+}
+
+# Grammes supposés pour un ingrédient absent de la table de composition
+DEFAULT_INGREDIENT_GRAMS = 50.0
+
+
+def parse_ingredients(main_ingredient):
+    """Découper la chaîne 'a,b,c' du mapping en liste d'ingrédients"""
+    if not main_ingredient or main_ingredient == "unknown":
+        return []
+    return [ing.strip().lower() for ing in main_ingredient.split(',') if ing.strip()]
+
+
+class NutrientEngine:
+    def __init__(self, composition=None):
+        composition = composition or DEFAULT_INGREDIENT_COMPOSITION
+
+        self.ingredient_index = {}
+        self.typical_grams = []
+        nutrient_rows = []
+        for name, values in composition.items():
+            self.ingredient_index[name] = len(nutrient_rows)
+            nutrient_rows.append(values[:len(NUTRIENTS)])
+            self.typical_grams.append(values[len(NUTRIENTS)])
+
+        # Matrice ingrédients × nutriments (pour 100g) et masque des ingrédients
+        # dont la composition est connue; la capacité croît géométriquement
+        self._nutrient_buffer = np.array(nutrient_rows, dtype=np.float64).reshape(-1, len(NUTRIENTS))
+        self._known_buffer = np.ones(len(nutrient_rows), dtype=np.float64)
+        self._unknown_columns = set()
+
+        self.dish_index = {}
+        self.dish_names = []
+        self.missing_ingredients = {}
+        self.weights = None       # plats × ingrédients (CSR)
+        self._weights_csc = None  # même matrice, accès par colonne
+        self.profiles = None      # plats × nutriments (pour 100g)
+        self._pending = []        # blocs de poids ajoutés par add_dishes, pas encore fusionnés
+        self._pending_profiles = []
+
+    @classmethod
+    def from_csv(cls, csv_file):
+        """Charger une table de composition (colonne 'ingredient' + nutriments + 'typical_grams')"""
+        composition = {}
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                name = row.get('ingredient', '').strip().lower()
+                if not name:
+                    continue
+                values = [float(row.get(n) or 0) for n in NUTRIENTS]
+                values.append(float(row.get('typical_grams') or DEFAULT_INGREDIENT_GRAMS))
+                composition[name] = tuple(values)
+        return cls(composition)
+
+    @property
+    def nutrient_matrix(self):
+        """Matrice ingrédients × nutriments (vue sur les lignes utilisées)"""
+        return self._nutrient_buffer[:len(self.typical_grams)]
+
+    @property
+    def known(self):
+        return self._known_buffer[:len(self.typical_grams)]
+
+    def _add_ingredients(self, names):
+        """Ajouter des ingrédients inconnus en une fois (réallocation géométrique)"""
+        names = [name for name in dict.fromkeys(names) if name not in self.ingredient_index]
+        if not names:
+            return
+        count = len(self.typical_grams)
+        needed = count + len(names)
+        capacity = self._nutrient_buffer.shape[0]
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity)
+            nutrient_buffer = np.zeros((capacity, len(NUTRIENTS)), dtype=np.float64)
+            nutrient_buffer[:count] = self._nutrient_buffer[:count]
+            known_buffer = np.zeros(capacity, dtype=np.float64)
+            known_buffer[:count] = self._known_buffer[:count]
+            self._nutrient_buffer, self._known_buffer = nutrient_buffer, known_buffer
+
+        for column, name in enumerate(names, start=count):
+            self.ingredient_index[name] = column
+            self.typical_grams.append(DEFAULT_INGREDIENT_GRAMS)
+            self._nutrient_buffer[column] = 0.0
+            self._known_buffer[column] = 0.0
+            self._unknown_columns.add(column)
+
+    def _ensure_ingredient(self, name):
+        """Obtenir la colonne d'un ingrédient, en l'ajoutant comme inconnu si besoin"""
+        if name not in self.ingredient_index:
+            self._add_ingredients([name])
+        return self.ingredient_index[name]
+
+    def _weights_for(self, dishes):
+        """Matrice creuse plats × ingrédients de `dishes`, noms et ingrédients manquants"""
+        # Normaliser les recettes, puis ajouter tous les ingrédients inconnus en une fois
+        recipes = {}
+        for dish_name, recipe in dishes.items():
+            if isinstance(recipe, str):
+                recipe = parse_ingredients(recipe)
+            recipes[dish_name] = list(recipe.items()) if isinstance(recipe, dict) else [(ing, None) for ing in recipe]
+        self._add_ingredients(ingredient for items in recipes.values() for ingredient, _ in items)
+
+        indptr = [0]
+        indices = []
+        data = []
+        names = []
+        missing_ingredients = {}
+        ingredient_index = self.ingredient_index
+        typical_grams = self.typical_grams
+
+        for dish_name, items in recipes.items():
+            missing = []
+            for ingredient, grams in items:
+                column = ingredient_index[ingredient]
+                if column in self._unknown_columns:
+                    missing.append(ingredient)
+                indices.append(column)
+                data.append(typical_grams[column] if grams is None else float(grams))
+
+            if missing:
+                missing_ingredients[dish_name] = missing
+            names.append(dish_name)
+            indptr.append(len(indices))
+
+        shape = (len(names), len(self.typical_grams))
+        weights = sparse.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=shape
+        )
+        weights.sum_duplicates()
+        return weights, names, missing_ingredients
+
+    def set_dishes(self, dishes):
+        """Construire la matrice creuse plats × ingrédients
+
+        `dishes` associe un nom de plat soit à une chaîne 'a,b,c', soit à une
+        liste d'ingrédients, soit à un dict {ingrédient: grammes}.
+        """
+        self.weights, self.dish_names, self.missing_ingredients = self._weights_for(dishes)
+        self.dish_index = {dish_name: row for row, dish_name in enumerate(self.dish_names)}
+        self._weights_csc = self.weights.tocsc()
+        self.profiles = None
+        self._pending = []
+        self._pending_profiles = []
+
+    def add_dishes(self, dishes):
+        """Ajouter des plats en ne calculant que leurs profils
+
+        Les plats déjà chargés sont ignorés. Les nouvelles lignes restent en
+        attente et sont intégrées à la matrice de poids en une fois, au
+        prochain calcul global ou à la prochaine mise à jour d'ingrédient.
+        Retourne les noms ajoutés.
+        """
+        dishes = {name: recipe for name, recipe in dishes.items() if name not in self.dish_index}
+        if not dishes:
+            return []
+
+        weights, names, missing_ingredients = self._weights_for(dishes)
+        self._pending.append(weights)
+        self._pending_profiles.extend(self._profiles_for(weights))
+        for dish_name in names:
+            self.dish_index[dish_name] = len(self.dish_names)
+            self.dish_names.append(dish_name)
+        self.missing_ingredients.update(missing_ingredients)
+        return names
+
+    def _merge_pending(self):
+        """Intégrer les plats ajoutés par add_dishes à la matrice de poids et aux profils"""
+        if not self._pending:
+            return
+        columns = len(self.typical_grams)
+        blocks = self._pending if self.weights is None else [self.weights] + self._pending
+        for block in blocks:
+            block.resize((block.shape[0], columns))
+        merged_profiles = self.weights is None or self.profiles is not None
+        if merged_profiles:
+            existing = [] if self.profiles is None else [self.profiles]
+            self.profiles = np.vstack(existing + [np.asarray(self._pending_profiles)])
+
+        self.weights = sparse.vstack(blocks, format='csr')
+        self._weights_csc = self.weights.tocsc()
+        self._pending = []
+        self._pending_profiles = []
+
+    def _compute_rows(self, rows=None):
+        return self._profiles_for(self.weights if rows is None else self.weights[rows])
+
+    def _profiles_for(self, weights):
+        """Profil pour 100g = Σ grammes·valeurs / Σ grammes (ingrédients connus seulement)"""
+        columns = weights.shape[1]
+        totals = weights @ self.nutrient_matrix[:columns]
+        known_grams = weights @ self.known[:columns]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = totals / known_grams[:, None]
+        result[known_grams <= 0] = np.nan
+        return result
+
+    def compute(self):
+        """Calculer tous les profils en un seul produit matriciel"""
+        self._merge_pending()
+        if self.weights is None:
+            raise ValueError("Aucun plat chargé: appelez set_dishes() d'abord")
+        self.profiles = self._compute_rows()
+        return self.profiles
+
+    def update_ingredient(self, ingredient, values):
+        """Mettre à jour un ingrédient et recalculer uniquement les plats concernés
+
+        `values` est un dict {nutriment: valeur}; les nutriments absents gardent
+        leur valeur actuelle. Retourne les noms des plats recalculés.
+        """
+        ingredient = ingredient.strip().lower()
+        column = self._ensure_ingredient(ingredient)
+
+        for nutrient, value in values.items():
+            self.nutrient_matrix[column, NUTRIENTS.index(nutrient)] = float(value)
+        self.known[column] = 1.0
+        self._unknown_columns.discard(column)
+
+        self._merge_pending()
+        if self.weights is None:
+            return []
+
+        # La matrice de poids a pu grandir d'une colonne (nouvel ingrédient)
+        if column >= self.weights.shape[1]:
+            return []
+
+        start, end = self._weights_csc.indptr[column], self._weights_csc.indptr[column + 1]
+        rows = np.unique(self._weights_csc.indices[start:end])
+        if rows.size == 0:
+            return []
+
+        if self.profiles is None:
+            self.compute()
+        else:
+            self.profiles[rows] = self._compute_rows(rows)
+
+        updated = [self.dish_names[r] for r in rows]
+        for dish_name in updated:
+            missing = self.missing_ingredients.get(dish_name)
+            if missing and ingredient in missing:
+                missing.remove(ingredient)
+                if not missing:
+                    del self.missing_ingredients[dish_name]
+        return updated
+
+    def get_profile(self, dish_name, decimals=1):
+        """Profil nutritionnel d'un plat (None pour les valeurs inconnues)"""
+        index = self.dish_index[dish_name]
+        merged = len(self.dish_names) - len(self._pending_profiles)
+        if index >= merged:
+            # Plat ajouté par add_dishes: profil déjà calculé, sans fusion
+            row = self._pending_profiles[index - merged]
+        else:
+            if self.profiles is None:
+                self.compute()
+            row = self.profiles[index]
+        return {
+            nutrient: (None if np.isnan(value) else round(float(value), decimals))
+            for nutrient, value in zip(NUTRIENTS, row)
+        }
+
+    def get_all_profiles(self, decimals=1):
+        """Profils de tous les plats chargés"""
+        return {name: self.get_profile(name, decimals) for name in self.dish_names}
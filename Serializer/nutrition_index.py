@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Index nutritionnel multi-dimensionnel pour la recherche "Nutrition Focus"
+
+Construit à l'ingestion à partir des profils nutritionnels des plats:
+  - une colonne triée par nutriment (recherche dichotomique pour les intervalles)
+  - un k-d tree sur les profils normalisés (profil le plus proche)
+L'index est sauvegardé en .npz à côté des métadonnées.
+"""
+
+import csv
+from pathlib import Path
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from nutrient_engine import NUTRIENTS
+
+INDEX_FILENAME = "african_middle_eastern_nutrition_index.npz"
+
+# Arrondi des valeurs publiées (CSV nutritionnel et triplets)
+EXPORT_DECIMALS = 1
+
+# Nombre maximal de k-d trees de sous-espaces (profils partiels) gardés en cache
+MAX_SUBSPACE_TREES = 16
+
+# Noms des propriétés de l'ontologie → colonnes du CSV
+NUTRIENT_ALIASES = {
+    'calories': 'calories_per_100g',
+    'protein': 'proteins',
+    'fat': 'fats',
+}
+
+
+class NutritionIndex:
+    def __init__(self, names, values):
+        self.names = np.asarray(names, dtype=str)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.names), len(NUTRIENTS))
+
+        # Colonnes triées: order[:, j] trie values[:, j] (NaN en fin de colonne)
+        self.order = np.argsort(self.values, axis=0, kind='stable')
+        self.sorted_values = np.take_along_axis(self.values, self.order, axis=0)
+        self.valid_counts = (~np.isnan(self.values)).sum(axis=0)
+
+        self._tree = None
+        self._tree_rows = None
+        self._scale = None
+        self._subspace_trees = {}
+
+    @classmethod
+    def from_engine(cls, engine, dish_names=None, decimals=EXPORT_DECIMALS):
+        """Construire l'index depuis un NutrientEngine déjà calculé
+
+        Les valeurs sont arrondies comme dans le CSV et les triplets publiés,
+        pour que les bornes des intervalles donnent les mêmes plats.
+        """
+        if dish_names is None:
+            dish_names = engine.dish_names
+        values = []
+        for name in dish_names:
+            profile = engine.get_profile(name, decimals)
+            values.append([np.nan if profile[n] is None else profile[n] for n in NUTRIENTS])
+        return cls(dish_names, values)
+
+    @classmethod
+    def from_csv(cls, csv_file):
+        """Construire l'index depuis le CSV nutritionnel"""
+        names = []
+        values = []
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                name = row.get('food_name', '').strip()
+                if not name:
+                    continue
+                names.append(name)
+                values.append([float(row[n]) if row.get(n) not in (None, '') else np.nan for n in NUTRIENTS])
+        return cls(names, values)
+
+    def save(self, index_file):
+        """Sauvegarder l'index (tableaux bruts, rechargés sans re-tri)"""
+        index_file = Path(index_file)
+        with open(index_file, 'wb') as f:
+            np.savez(
+                f,
+                names=self.names,
+                values=self.values,
+                order=self.order,
+                nutrients=np.asarray(NUTRIENTS, dtype=str)
+            )
+        return index_file
+
+    @classmethod
+    def load(cls, index_file):
+        """Recharger un index sauvegardé"""
+        with np.load(index_file, allow_pickle=False) as data:
+            if tuple(data['nutrients']) != NUTRIENTS:
+                raise ValueError(f"Index {index_file} construit avec d'autres nutriments")
+
+            index = cls.__new__(cls)
+            index.names = data['names']
+            index.values = data['values']
+            index.order = data['order']
+
+        index.sorted_values = np.take_along_axis(index.values, index.order, axis=0)
+        index.valid_counts = (~np.isnan(index.values)).sum(axis=0)
+        index._tree = None
+        index._tree_rows = None
+        index._scale = None
+        index._subspace_trees = {}
+        return index
+
+    def _column(self, nutrient):
+        nutrient = NUTRIENT_ALIASES.get(nutrient, nutrient)
+        if nutrient not in NUTRIENTS:
+            raise KeyError(f"Nutriment inconnu: {nutrient}")
+        return NUTRIENTS.index(nutrient)
+
+    def _range_rows(self, column, low, high):
+        """Lignes dont la valeur est dans [low, high] (dichotomie sur la colonne triée)"""
+        count = self.valid_counts[column]
+        sorted_column = self.sorted_values[:count, column]
+        start = 0 if low is None else np.searchsorted(sorted_column, low, side='left')
+        end = count if high is None else np.searchsorted(sorted_column, high, side='right')
+        return self.order[start:end, column]
+
+    def range_query(self, **ranges):
+        """Plats dont chaque nutriment est dans l'intervalle donné
+
+        Exemple: index.range_query(calories=(None, 200), protein=(10, None))
+        """
+        if not ranges:
+            return self.names.tolist()
+
+        candidates = None
+        # Commencer par l'intervalle le plus sélectif
+        row_sets = sorted(
+            (self._range_rows(self._column(n), low, high) for n, (low, high) in ranges.items()),
+            key=len
+        )
+        for rows in row_sets:
+            if candidates is None:
+                candidates = rows
+            else:
+                candidates = np.intersect1d(candidates, rows, assume_unique=True)
+            if candidates.size == 0:
+                break
+
+        return self.names[np.sort(candidates)].tolist()
+
+    def _build_tree(self):
+        """k-d tree sur les profils complets, chaque nutriment ramené à l'écart-type 1
+
+        L'écart-type de chaque nutriment est pris sur toutes ses valeurs connues,
+        pour que les sous-espaces partagent la même normalisation.
+        """
+        known = ~np.isnan(self.values)
+        scale = np.ones(len(NUTRIENTS))
+        for column in range(len(NUTRIENTS)):
+            if known[:, column].any():
+                scale[column] = self.values[known[:, column], column].std()
+        scale[scale == 0] = 1.0
+        self._scale = scale
+
+        self._tree_rows = np.flatnonzero(known.all(axis=1))
+        self._tree = cKDTree(self.values[self._tree_rows] / scale)
+
+    def _subspace_tree(self, columns):
+        """k-d tree des profils connus sur quelques nutriments (mis en cache)
+
+        Un plat sans valeur pour un autre nutriment reste candidat: chaque
+        sous-espace garde ses propres lignes (plats complets sur ces colonnes).
+        Retourne (arbre, lignes de l'index).
+        """
+        entry = self._subspace_trees.get(columns)
+        if entry is None:
+            if len(self._subspace_trees) >= MAX_SUBSPACE_TREES:
+                # Éviction du plus ancien (les dicts gardent l'ordre d'insertion)
+                del self._subspace_trees[next(iter(self._subspace_trees))]
+            points = self.values[:, list(columns)]
+            rows = np.flatnonzero(~np.isnan(points).any(axis=1))
+            entry = (cKDTree(points[rows] / self._scale[list(columns)]), rows)
+            self._subspace_trees[columns] = entry
+        return entry
+
+    def nearest(self, k=5, **profile):
+        """Plats au profil le plus proche de celui demandé
+
+        Les nutriments non précisés ne comptent pas dans la distance: un
+        profil partiel interroge un k-d tree du sous-espace demandé, construit
+        à la première requête sur ce sous-espace (O(n log n)) puis réutilisé.
+        Retourne une liste de (nom, distance normalisée).
+        """
+        if self._tree is None:
+            self._build_tree()
+
+        targets = {self._column(n): value for n, value in profile.items()}
+        if not targets:
+            raise ValueError("Précisez au moins un nutriment")
+
+        columns = tuple(sorted(targets))
+        target = np.array([targets[c] for c in columns], dtype=np.float64) / self._scale[list(columns)]
+        if len(columns) == len(NUTRIENTS):
+            tree, tree_rows = self._tree, self._tree_rows
+        else:
+            tree, tree_rows = self._subspace_tree(columns)
+        if not tree_rows.size:
+            return []
+
+        k = min(k, tree_rows.size)
+        distances, positions = tree.query(target, k=k)
+        distances, positions = np.atleast_1d(distances), np.atleast_1d(positions)
+
+        rows = tree_rows[positions]
+        return [(str(self.names[r]), round(float(d), 4)) for r, d in zip(rows, distances)]
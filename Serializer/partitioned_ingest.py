@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Traitement partitionné sur plusieurs machines avec fusion déterministe
+
+Un dossier de travail partagé sert de file d'attente:
+  <work>/job.json                      paramètres du job (source, partitions, date, bail)
+  <work>/listings/partition-0003.json  images de la partition, listées une fois par init
+  <work>/claims/partition-0003.0       réservation (création exclusive): hôte, pid, date
+  <work>/partials/partition-0003.json  résultat partiel d'une partition
+
+Une réservation est un bail: le worker rafraîchit la date de modification
+du fichier pendant le traitement. Un bail expiré (ou dont le processus est
+mort, sur le même hôte) est repris par un autre worker, qui crée la
+génération suivante (partition-0003.1) en création exclusive: un seul
+repreneur gagne.
+
+Chaque image (ou catégorie) est attribuée à une partition par un hachage
+stable. Les workers placent les images directement dans le dossier de
+données (chemins disjoints) et écrivent leur index partiel; la commande
+`merge` recombine les partiels et produit l'index JSON et le CSV,
+identiques octet pour octet à un traitement sur une seule machine avec la
+même date de traitement.
+
+Usage:
+    python partitioned_ingest.py init  <work> <source> --partitions 16 [--by file|category] [--lease 300]
+    python partitioned_ingest.py work  <work>            (sur chaque machine, autant de fois que voulu)
+    python partitioned_ingest.py merge <work>
+    python partitioned_ingest.py run   <work> <source> --partitions 16 --workers 4   (local)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from multiprocessing import Process
+from pathlib import Path
+
+from dataset_audit import load_quarantine
+from image_layout import check_layout
+
+PARTITION_MODES = ("file", "category")
+
+# Durée d'un bail de réservation sans rafraîchissement (s)
+DEFAULT_LEASE_SECONDS = 300
+
+
+def stable_partition(key, partitions):
+    """Partition d'une clé, identique sur toutes les machines"""
+    digest = hashlib.sha1(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % partitions
+
+
+class Partition:
+    def __init__(self, index, count, mode="file", listing=None):
+        if mode not in PARTITION_MODES:
+            raise ValueError(f"Mode de partition inconnu: {mode}")
+        self.index = index
+        self.count = count
+        self.mode = mode
+        # {dossier: [(numéro, fichier), ...]} calculé à l'init; évite de relister la source
+        self.listing = listing
+
+    def owns_category(self, category_name):
+        if self.mode == "category":
+            return stable_partition(category_name, self.count) == self.index
+        return True
+
+    def owns_file(self, category_name, filename):
+        if self.mode == "category":
+            return True
+        return stable_partition(f"{category_name}/{filename}", self.count) == self.index
+
+
+def partition_name(index):
+    return f"partition-{index:04d}"
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _Heartbeat(threading.Thread):
+    """Rafraîchir le bail d'une réservation pendant le traitement de la partition"""
+
+    def __init__(self, claim_file, interval):
+        super().__init__(daemon=True)
+        self.claim_file = claim_file
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                os.utime(self.claim_file)
+            except OSError:
+                pass
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _write_json(path, data):
+    """Écriture atomique (fichier temporaire puis renommage)"""
+    tmp_path = Path(f"{path}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class PartitionedJob:
+    def __init__(self, work_dir):
+        self.work_dir = Path(work_dir)
+        self.job_file = self.work_dir / "job.json"
+        self.claims_dir = self.work_dir / "claims"
+        self.partials_dir = self.work_dir / "partials"
+        self.listings_dir = self.work_dir / "listings"
+        self._config = None
+
+    @property
+    def config(self):
+        if self._config is None:
+            with open(self.job_file, 'r', encoding='utf-8') as f:
+                self._config = json.load(f)
+        return self._config
+
+    def init(self, source_dir, partitions, mode="file", data_dir="african_middle_eastern_data",
+             quarantine_file=None, layout="flat", processing_date=None, allow_unserved_layout=False,
+             lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Créer le dossier de travail, le fichier de job et les listes d'images des partitions"""
+        check_layout(layout, allow_unserved_layout)
+        for directory in [self.work_dir, self.claims_dir, self.partials_dir, self.listings_dir]:
+            directory.mkdir(parents=True, exist_ok=True)
+
+        self._config = {
+            'source_dir': str(Path(source_dir).absolute()),
+            'data_dir': str(Path(data_dir).absolute()),
+            'partitions': partitions,
+            'mode': mode,
+            'layout': layout,
+            'allow_unserved_layout': allow_unserved_layout,
+            'quarantine_file': str(Path(quarantine_file).absolute()) if quarantine_file else None,
+            'processing_date': processing_date or datetime.now().isoformat(),
+            'lease_seconds': lease_seconds
+        }
+        _write_json(self.job_file, self._config)
+        self.write_listings()
+        return self._config
+
+    def write_listings(self):
+        """Lister la source une seule fois et écrire les images de chaque partition
+
+        Les numéros d'images sont ceux du traitement séquentiel (ordre trié,
+        quarantaine exclue). En mode fichier, chaque partition garde tous les
+        dossiers, même sans image à elle, comme le traitement séquentiel.
+        """
+        processor = self.make_processor()
+        quarantined = load_quarantine(self.config['quarantine_file'])
+        count, mode = self.config['partitions'], self.config['mode']
+        listings = [{} for _ in range(count)]
+
+        for category_folder in processor.list_category_folders(self.config['source_dir']):
+            folder = category_folder.name
+            image_files = processor.list_category_images(category_folder, quarantined)
+            if mode == "category":
+                index = stable_partition(folder, count)
+                listings[index][folder] = [(number, f.name) for number, f in enumerate(image_files, 1)]
+                continue
+            for listing in listings:
+                listing[folder] = []
+            for number, image_file in enumerate(image_files, 1):
+                listings[stable_partition(f"{folder}/{image_file.name}", count)][folder].append((number, image_file.name))
+
+        for index, listing in enumerate(listings):
+            _write_json(self.listings_dir / f"{partition_name(index)}.json", listing)
+
+    def load_partition(self, index):
+        listing_file = self.listings_dir / f"{partition_name(index)}.json"
+        listing = None
+        if listing_file.exists():
+            with open(listing_file, 'r', encoding='utf-8') as f:
+                listing = {folder: [tuple(entry) for entry in entries] for folder, entries in json.load(f).items()}
+        return Partition(index, self.config['partitions'], self.config['mode'], listing)
+
+    def make_processor(self):
+        from african_middle_eastern_food_processor import AfricanMiddleEasternFoodProcessor
+
+        processor = AfricanMiddleEasternFoodProcessor(
+            self.config['data_dir'], layout=self.config['layout'],
+            allow_unserved_layout=self.config.get('allow_unserved_layout', False)
+        )
+        processor.processing_date = self.config['processing_date']
+        return processor
+
+    @property
+    def lease_seconds(self):
+        return self.config.get('lease_seconds', DEFAULT_LEASE_SECONDS)
+
+    def partial_file(self, index):
+        return self.partials_dir / f"{partition_name(index)}.json"
+
+    def current_claim(self, index):
+        """Réservation la plus récente d'une partition: (génération, fichier, infos) ou None"""
+        claims = []
+        for claim_file in self.claims_dir.glob(f"{partition_name(index)}.*"):
+            generation = claim_file.name.rsplit('.', 1)[1]
+            if generation.isdigit():
+                claims.append((int(generation), claim_file))
+        if not claims:
+            return None
+        generation, claim_file = max(claims)
+        try:
+            with open(claim_file, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # Fichier en cours d'écriture par son créateur
+            info = {}
+        return generation, claim_file, info
+
+    def lease_remaining(self, claim_file, info):
+        """Secondes avant expiration du bail (négatif: expiré)"""
+        if info.get('host') == socket.gethostname() and info.get('pid') and not _process_alive(info['pid']):
+            return -1.0
+        try:
+            heartbeat = claim_file.stat().st_mtime
+        except FileNotFoundError:
+            return -1.0
+        return heartbeat + self.lease_seconds - time.time()
+
+    def claim(self):
+        """Réserver la prochaine partition libre ou abandonnée: (index, fichier de réservation)"""
+        for index in range(self.config['partitions']):
+            if self.partial_file(index).exists():
+                continue
+            current = self.current_claim(index)
+            if current is not None and self.lease_remaining(current[1], current[2]) > 0:
+                continue
+
+            generation = 0 if current is None else current[0] + 1
+            claim_file = self.claims_dir / f"{partition_name(index)}.{generation}"
+            try:
+                fd = os.open(claim_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'host': socket.gethostname(),
+                    'pid': os.getpid(),
+                    'claimed': datetime.now().isoformat(),
+                    'generation': generation
+                }, f)
+            if current is not None:
+                owner = current[2]
+                print(f"♻️ {partition_name(index)}: bail de {owner.get('host')}:{owner.get('pid')} expiré, reprise")
+            return index, claim_file
+        return None
+
+    def work(self):
+        """Traiter des partitions jusqu'à ce qu'il n'en reste plus; retourne leur nombre"""
+        processor = self.make_processor()
+        processed = 0
+
+        while True:
+            claimed = self.claim()
+            if claimed is None:
+                return processed
+            index, claim_file = claimed
+
+            print(f"\n🧩 {partition_name(index)} ({socket.gethostname()}:{os.getpid()})")
+            heartbeat = _Heartbeat(claim_file, self.lease_seconds / 3)
+            heartbeat.start()
+            try:
+                organized_data = processor.process_images(
+                    self.config['source_dir'], self.config['quarantine_file'], partition=self.load_partition(index)
+                )
+            finally:
+                heartbeat.stop()
+            # Résultat déterministe: si la partition a été reprise entre-temps, les deux partiels sont identiques
+            _write_json(self.partial_file(index), organized_data)
+            processed += 1
+
+    def pending(self):
+        """Partitions dont le résultat partiel n'existe pas encore"""
+        return [index for index in range(self.config['partitions']) if not self.partial_file(index).exists()]
+
+    def describe_pending(self):
+        """État des partitions non terminées: non réservée, en cours, ou bail expiré"""
+        descriptions = []
+        for index in self.pending():
+            current = self.current_claim(index)
+            if current is None:
+                descriptions.append(f"{partition_name(index)}: non réservée")
+                continue
+            _, claim_file, info = current
+            owner = f"{info.get('host')}:{info.get('pid')}"
+            remaining = self.lease_remaining(claim_file, info)
+            if remaining > 0:
+                descriptions.append(f"{partition_name(index)}: en cours ({owner}, bail {remaining:.0f}s)")
+            else:
+                descriptions.append(f"{partition_name(index)}: abandonnée par {owner} (bail expiré, reprise au prochain work)")
+        return descriptions
+
+    def merge(self):
+        """Fusionner les partiels et écrire l'index JSON et le CSV définitifs"""
+        pending = self.describe_pending()
+        if pending:
+            raise RuntimeError(f"{len(pending)} partitions non terminées:\n" + "\n".join(f"   - {p}" for p in pending))
+
+        merged = {}
+        for index in range(self.config['partitions']):
+            with open(self.partial_file(index), 'r', encoding='utf-8') as f:
+                partial = json.load(f)
+            for category_name, category_data in partial.items():
+                if category_name not in merged:
+                    merged[category_name] = dict(category_data, images=[])
+                merged[category_name]['images'].extend(category_data['images'])
+
+        # Même ordre que le traitement séquentiel: dossiers triés, images par numéro
+        organized_data = {}
+        for category_name, category_data in sorted(merged.items(), key=lambda item: item[1]['original_folder_name']):
+            images = sorted(category_data['images'], key=lambda img: img['image_number'])
+            organized_data[category_name] = {
+                'images': images,
+                'total_images': len(images),
+                'category_info': category_data['category_info'],
+                'original_folder_name': category_data['original_folder_name']
+            }
+
+        processor = self.make_processor()
+        processor.save_results(organized_data)
+        return organized_data
+
+
+def run_local(work_dir, workers):
+    """Lancer plusieurs workers locaux sur le même dossier de travail"""
+    processes = [Process(target=PartitionedJob(work_dir).work) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return all(process.exitcode == 0 for process in processes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Traitement partitionné des images")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_init_arguments(subparser):
+        subparser.add_argument('source', help="Dossier source des images")
+        subparser.add_argument('--partitions', type=int, required=True, help="Nombre de partitions")
+        subparser.add_argument('--by', choices=PARTITION_MODES, default="file", help="Unité de partition")
+        subparser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données (partagé)")
+        subparser.add_argument('--quarantine', help="Liste de quarantaine (dataset_audit.py)")
+        subparser.add_argument('--layout', choices=("flat", "sharded"), default="flat")
+        subparser.add_argument('--allow-unserved-layout', action='store_true',
+                               help="Autoriser une disposition que l'ImageController ne sert pas")
+        subparser.add_argument('--processing-date', help="Date de traitement imposée (ISO)")
+        subparser.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS,
+                               help="Durée du bail d'une réservation sans rafraîchissement (s)")
+
+    for command in ("init", "work", "merge", "run"):
+        subparser = subparsers.add_parser(command)
+        subparser.add_argument('work_dir', help="Dossier de travail partagé")
+        if command in ("init", "run"):
+            add_init_arguments(subparser)
+        if command == "run":
+            subparser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    args = parser.parse_args(argv)
+    job = PartitionedJob(args.work_dir)
+
+    if args.command in ("init", "run"):
+        config = job.init(
+            args.source, args.partitions, args.by, args.data_dir,
+            args.quarantine, args.layout, args.processing_date, args.allow_unserved_layout, args.lease
+        )
+        print(f"🧩 Job créé: {config['partitions']} partitions par {config['mode']}")
+
+    if args.command == "work":
+        processed = job.work()
+        print(f"✅ {processed} partitions traitées")
+
+    if args.command == "run":
+        if not run_local(args.work_dir, args.workers):
+            print("❌ Un worker a échoué")
+            return 1
+
+    if args.command in ("merge", "run"):
+        try:
+            organized_data = job.merge()
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return 1
+        total_images = sum(cat['total_images'] for cat in organized_data.values())
+        print(f"🎉 Fusion terminée: {len(organized_data)} catégories, {total_images} images")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
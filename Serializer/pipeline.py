@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Pipeline complet non interactif: ontologie → traitement des images → population
+
+Les trois étapes tournent dans un seul processus. Les catégories traitées
+passent directement au populateur (file en mémoire, le traitement de la
+catégorie suivante chevauche l'envoi à Fuseki); l'index JSON, le CSV et
+l'index nutritionnel sont écrits en parallèle, hors du chemin critique.
+
+Configuration: arguments, puis variables d'environnement, puis le fichier
+.env à la racine du projet (FUSEKI_URL ou FUSEKI_PORT, FUSEKI_DATASET_NAME,
+DATA_PATH, IMAGES_SOURCE). IMAGES_SOURCE est le dossier des photos brutes
+à traiter; IMAGES_PATH, dans le même .env, désigne le dossier de sortie
+(DATA_PATH/images) servi par l'application et n'est pas lu ici.
+
+Usage:
+    python pipeline.py config
+    python pipeline.py check
+    python pipeline.py run --source <dossier_images> [--skip-ontology] [--skip-populate]
+                            [--layout flat|sharded [--allow-unserved-layout]]
+                            [--metadata-db] [--fingerprint] [--resume]
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+from pathlib import Path
+
+SERIALIZER_DIR = Path(__file__).resolve().parent
+ENV_FILE = SERIALIZER_DIR.parent / ".env"
+
+_END = object()
+
+
+def read_env_file(env_file=ENV_FILE):
+    """Lire un fichier .env simple (CLE=valeur, commentaires #)"""
+    values = {}
+    if not env_file.exists():
+        return values
+    with open(env_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip().strip('"').strip("'")
+    return values
+
+
+def load_config(args=None, env_file=ENV_FILE):
+    """Fusionner arguments > environnement > .env > valeurs par défaut"""
+    file_values = read_env_file(env_file)
+
+    def setting(name, default=None):
+        return os.environ.get(name, file_values.get(name, default))
+
+    fuseki_url = setting('FUSEKI_URL') or f"http://localhost:{setting('FUSEKI_PORT', '3030')}"
+
+    data_dir = setting('DATA_PATH')
+    if data_dir and 'DATA_PATH' not in os.environ:
+        # Chemins du .env relatifs à la racine du projet
+        data_dir = str((env_file.parent / data_dir).resolve())
+
+    config = {
+        'fuseki_url': fuseki_url.rstrip('/'),
+        'dataset_name': setting('FUSEKI_DATASET_NAME', "african-middle-eastern-kg"),
+        'data_dir': data_dir or str(SERIALIZER_DIR / "african_middle_eastern_data"),
+        'ontology_file': setting('ONTOLOGY_FILE', str(SERIALIZER_DIR / "paste.txt")),
+        # Photos brutes en entrée; à ne pas confondre avec IMAGES_PATH (sortie servie)
+        'source_dir': setting('IMAGES_SOURCE'),
+        'quarantine_file': None,
+        'layout': "flat",
+        'allow_unserved_layout': False,
+        'metadata_db': None,
+    }
+
+    if args is not None:
+        for key in config:
+            value = getattr(args, key, None)
+            if value is not None:
+                config[key] = value
+    return config
+
+
+def check_fuseki(config):
+    """Vérifier que le serveur Fuseki et le dataset répondent"""
+    import requests
+
+    try:
+        response = requests.get(f"{config['fuseki_url']}/$/ping", timeout=5)
+        print(f"🔍 Fuseki {config['fuseki_url']}: {response.status_code}")
+        return response.status_code == 200
+    except Exception as e:
+        print(f"❌ Fuseki non accessible: {e}")
+        return False
+
+
+def run_pipeline(config, skip_ontology=False, skip_populate=False, fingerprint=False, resume=False):
+    """Exécuter les trois étapes dans ce processus"""
+    from african_middle_eastern_food_processor import AfricanMiddleEasternFoodProcessor
+    from graph_statistics import SUMMARY_FILENAME
+    from image_layout import check_layout
+
+    if not config['source_dir'] or not os.path.isdir(config['source_dir']):
+        print(f"❌ Dossier source invalide: {config['source_dir']}")
+        return False
+    try:
+        check_layout(config['layout'], config['allow_unserved_layout'])
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+
+    populator = None
+    if not skip_populate:
+        from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+
+        if not skip_ontology:
+            from african_ontology_loader import load_ontology_to_fuseki
+
+            print("🎯 Étape 1: chargement de l'ontologie")
+            if not load_ontology_to_fuseki(config['ontology_file'], config['fuseki_url'], config['dataset_name']):
+                return False
+
+        populator = AfricanMiddleEasternPopulatorFixed(config['fuseki_url'], config['dataset_name'])
+        if not populator.test_endpoints():
+            print("❌ Endpoints non fonctionnels")
+            return False
+        populator.open_journal(config['data_dir'], resume=resume)
+
+    print("🌍 Étape 2: traitement des images")
+    processor = AfricanMiddleEasternFoodProcessor(
+        config['data_dir'], layout=config['layout'], use_metadata_db=bool(config['metadata_db']),
+        allow_unserved_layout=config['allow_unserved_layout']
+    )
+
+    # Point de contrôle du traitement: à la reprise, les catégories déjà acquittées
+    # dont la source n'a pas changé ne sont pas retraitées
+    checkpoint = None
+    reuse = {}
+    if populator is not None:
+        from population_journal import ProcessingCheckpoint, checkpoint_path
+
+        checkpoint = ProcessingCheckpoint(checkpoint_path(config['data_dir']), resume=resume)
+        reuse = {
+            name: entry for name, entry in checkpoint.categories.items()
+            if f"food:{name}" in populator.journal.committed
+        }
+        if resume:
+            print(f"📒 Reprise: {len(reuse)} catégories traitées et acquittées")
+
+    handoff = queue.Queue(maxsize=8)
+    state = {'error': None, 'artifacts': None, 'done': False}
+
+    def produce():
+        """Traiter les catégories, les transmettre, puis écrire les fichiers"""
+        organized_data = {}
+        rows = []
+        try:
+            for category_name, category_data in processor.iter_processed_categories(
+                    config['source_dir'], config['quarantine_file'], reuse=reuse):
+                organized_data[category_name] = category_data
+                if checkpoint is not None and category_data is not reuse.get(category_name, {}).get('data'):
+                    checkpoint.record(category_name, processor.source_signatures[category_name], category_data)
+                # Le moteur nutritionnel ne sert que dans ce thread: la ligne part toute calculée
+                row = processor.nutritional_row(category_name, category_data)
+                rows.append(row)
+                handoff.put((category_name, category_data, row))
+        except BaseException as e:
+            state['error'] = e
+        finally:
+            handoff.put(_END)
+
+        if state['error'] is None and organized_data:
+            state['artifacts'] = len(organized_data)
+            # Le CSV reprend les lignes envoyées au populateur
+            processor.save_results(organized_data, rows)
+
+    producer = threading.Thread(target=produce, name="processor")
+    producer.start()
+
+    def records():
+        """Enregistrements (ligne nutritionnelle, images) au fil du traitement"""
+        while not state['done']:
+            item = handoff.get()
+            if item is _END:
+                state['done'] = True
+                return
+            _, category_data, row = item
+            yield row, category_data['images']
+
+    pushed = []
+    try:
+        if populator is not None:
+            print("📝 Étape 3: population (au fil du traitement)")
+            populator.populate_from_records(
+                records(), summary_file=processor.metadata_dir / SUMMARY_FILENAME, on_pushed=pushed.append
+            )
+    finally:
+        # Vider la file pour ne jamais bloquer le traitement (ni l'écriture des fichiers)
+        for _ in records():
+            pass
+        producer.join()
+        if populator is not None:
+            populator.close_journal()
+            checkpoint.close()
+        # Après la fin du traitement: la connexion SQLite n'est plus utilisée par le producteur
+        if processor.metadata_store is not None and pushed:
+            processor.metadata_store.mark_pushed(pushed)
+        processor.close()
+
+    if state['error'] is not None:
+        raise state['error']
+
+    if populator is not None:
+        if populator.verify_knowledge_graph(fingerprint=fingerprint) is False:
+            return False
+    return bool(state['artifacts'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline NutriGraph non interactif")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(subparser):
+        subparser.add_argument('--fuseki-url', dest='fuseki_url')
+        subparser.add_argument('--dataset', dest='dataset_name')
+        subparser.add_argument('--data-dir', dest='data_dir')
+
+    add_common(subparsers.add_parser('config', help="Afficher la configuration résolue"))
+    add_common(subparsers.add_parser('check', help="Vérifier Fuseki"))
+
+    run_parser = subparsers.add_parser('run', help="Ontologie + traitement + population")
+    add_common(run_parser)
+    run_parser.add_argument('--source', dest='source_dir', help="Dossier source des images")
+    run_parser.add_argument('--ontology', dest='ontology_file')
+    run_parser.add_argument('--quarantine', dest='quarantine_file')
+    run_parser.add_argument('--layout', choices=("flat", "sharded"))
+    run_parser.add_argument('--allow-unserved-layout', action='store_true', default=None,
+                            help="Autoriser une disposition que l'ImageController ne sert pas")
+    run_parser.add_argument('--metadata-db', action='store_true', default=None,
+                            help="Tenir à jour la base SQLite des métadonnées")
+    run_parser.add_argument('--skip-ontology', action='store_true')
+    run_parser.add_argument('--skip-populate', action='store_true', help="Traiter sans Fuseki")
+    run_parser.add_argument('--fingerprint', action='store_true', help="Vérifier le graphe par empreintes")
+    run_parser.add_argument('--resume', action='store_true', help="Sauter les plats déjà acquittés par Fuseki")
+
+    args = parser.parse_args(argv)
+    config = load_config(args)
+
+    if args.command == 'config':
+        for key, value in config.items():
+            print(f"{key}: {value}")
+        return 0
+
+    if args.command == 'check':
+        return 0 if check_fuseki(config) else 1
+
+    success = run_pipeline(config, args.skip_ontology, args.skip_populate, args.fingerprint, args.resume)
+    print("\n🎉 Pipeline terminé" if success else "\n❌ Pipeline en échec")
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Reprise de la population: journal des lots acquittés et fichier de lettres mortes
+
+Chaque mise à jour SPARQL acquittée par Fuseki (un plat, ou un lot
+d'images) est ajoutée au journal, une ligne JSON synchronisée sur disque:
+clé du lot et empreinte de sa requête. Une mise à jour en échec part dans
+le fichier de lettres mortes avec la requête exacte et la réponse HTTP
+complète.
+
+  - reprise: les lots déjà acquittés (même clé, même requête) sont sautés;
+    un lot dont les données ont changé est renvoyé,
+  - rejeu: les lettres mortes sont renvoyées telles quelles; celles qui
+    échouent encore restent dans le fichier.
+
+Le pipeline tient aussi un point de contrôle du traitement: les données
+de chaque catégorie traitée et une signature de ses fichiers source (noms,
+tailles, dates). À la reprise, une catégorie dont la source n'a pas changé
+et dont le plat est acquitté n'est pas retraitée: ses images ne sont ni
+relues ni recopiées.
+
+Le temps de récupération dépend de ce qui a été perdu, pas de la taille du
+jeu de données. Une population complète (sans reprise) repart d'un journal
+vide: après une réinitialisation du dataset, ne pas utiliser la reprise.
+Les fichiers précédents ne sont pas effacés mais décalés en .1, .2, ...
+(JOURNAL_BACKUPS copies).
+
+Usage:
+    python population_journal.py status [--data-dir african_middle_eastern_data]
+    python population_journal.py resume [--data-dir ...] [--fuseki-url ...] [--dataset ...]
+    python population_journal.py replay [--data-dir ...] [--fuseki-url ...] [--dataset ...]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+JOURNAL_FILENAME = "population_journal.jsonl"
+DEAD_LETTER_FILENAME = "population_dead_letters.jsonl"
+CHECKPOINT_FILENAME = "processing_checkpoint.jsonl"
+
+# Copies conservées d'un journal remplacé par une population sans reprise
+JOURNAL_BACKUPS = 3
+
+
+def payload_digest(query):
+    """Empreinte d'une requête SPARQL (détecte les lots dont les données ont changé)"""
+    return hashlib.sha1(query.encode('utf-8')).hexdigest()
+
+
+def _read_jsonl(path):
+    """Lire un fichier JSON Lines en ignorant une dernière ligne tronquée par un arrêt brutal"""
+    entries = []
+    if not path.exists():
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def rotate_file(path, backups=JOURNAL_BACKUPS):
+    """Décaler les copies (.1 → .2, ...) et conserver le fichier courant en .1"""
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    for number in range(backups - 1, 0, -1):
+        older = Path(f"{path}.{number}")
+        if older.exists():
+            os.replace(older, f"{path}.{number + 1}")
+    backup = Path(f"{path}.1")
+    os.replace(path, backup)
+    return backup
+
+
+class _AppendOnlyFile:
+    def __init__(self, path, truncate=False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if truncate:
+            backup = rotate_file(self.path)
+            if backup is not None:
+                print(f"🗄️ {self.path.name} précédent conservé: {backup.name}")
+        self._file = open(self.path, 'w' if truncate else 'a', encoding='utf-8')
+
+    def append(self, entry):
+        """Ajouter une entrée et la forcer sur disque avant de continuer"""
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class PopulationJournal(_AppendOnlyFile):
+    def __init__(self, path, resume=False):
+        # Sans reprise, le journal repart de zéro
+        self.committed = {}
+        if resume:
+            for entry in _read_jsonl(Path(path)):
+                self.committed[entry['key']] = entry['digest']
+        super().__init__(path, truncate=not resume)
+
+    def is_committed(self, key, digest):
+        return self.committed.get(key) == digest
+
+    def commit(self, key, digest):
+        self.append({'key': key, 'digest': digest, 'date': datetime.now().isoformat()})
+        self.committed[key] = digest
+
+
+class DeadLetterFile(_AppendOnlyFile):
+    def __init__(self, path, truncate=False):
+        super().__init__(path, truncate=truncate)
+        self.count = 0
+
+    def add(self, key, query, failure):
+        """Conserver la requête exacte et la réponse (ou l'exception) de Fuseki"""
+        self.append({
+            'key': key,
+            'digest': payload_digest(query),
+            'date': datetime.now().isoformat(),
+            'status': failure.get('status'),
+            'response': failure.get('response'),
+            'error': failure.get('error'),
+            'payload': query
+        })
+        self.count += 1
+
+
+class ProcessingCheckpoint(_AppendOnlyFile):
+    """Catégories traitées: signature de la source et données de l'index, pour la reprise"""
+
+    def __init__(self, path, resume=False):
+        self.categories = {}
+        if resume:
+            for entry in _read_jsonl(Path(path)):
+                self.categories[entry['category']] = entry
+        super().__init__(path, truncate=not resume)
+
+    def record(self, category_name, signature, category_data):
+        entry = {
+            'category': category_name,
+            'signature': signature,
+            'date': datetime.now().isoformat(),
+            'data': category_data
+        }
+        self.append(entry)
+        self.categories[category_name] = entry
+
+
+def checkpoint_path(data_dir):
+    return Path(data_dir) / "metadata" / CHECKPOINT_FILENAME
+
+
+def journal_paths(data_dir):
+    metadata_dir = Path(data_dir) / "metadata"
+    return metadata_dir / JOURNAL_FILENAME, metadata_dir / DEAD_LETTER_FILENAME
+
+
+def replay_dead_letters(populator, dead_letter_file, journal):
+    """Renvoyer les lettres mortes; ne garder dans le fichier que celles qui échouent encore"""
+    dead_letter_file = Path(dead_letter_file)
+    letters = _read_jsonl(dead_letter_file)
+    if not letters:
+        print("📭 Aucune lettre morte")
+        return 0, 0
+
+    # Dernière version de chaque lot, et seulement si elle n'a pas été acquittée depuis
+    latest = {}
+    for letter in letters:
+        latest[letter['key']] = letter
+    pending = [letter for key, letter in latest.items() if not journal.is_committed(key, letter['digest'])]
+
+    print(f"📬 {len(pending)} lettres mortes à rejouer ({len(letters) - len(pending)} obsolètes)")
+    remaining = []
+    for letter in pending:
+        if populator.execute_sparql_update(letter['payload']):
+            journal.commit(letter['key'], letter['digest'])
+            print(f"   ✅ {letter['key']}")
+        else:
+            failure = populator.last_failure
+            remaining.append(dict(letter, date=datetime.now().isoformat(), status=failure.get('status'),
+                                  response=failure.get('response'), error=failure.get('error')))
+            print(f"   ❌ {letter['key']}: {failure.get('status') or failure.get('error')}")
+
+    # Réécriture atomique du fichier avec les seuls échecs restants
+    tmp_file = Path(f"{dead_letter_file}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for letter in remaining:
+            f.write(json.dumps(letter, ensure_ascii=False) + "\n")
+    os.replace(tmp_file, dead_letter_file)
+
+    return len(pending) - len(remaining), len(remaining)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprise et rejeu de la population Fuseki")
+    parser.add_argument('command', choices=("status", "resume", "replay"))
+    parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    parser.add_argument('--fuseki-url', default="http://localhost:3030")
+    parser.add_argument('--dataset', default="african-middle-eastern-kg")
+    args = parser.parse_args(argv)
+
+    journal_file, dead_letter_file = journal_paths(args.data_dir)
+
+    if args.command == "status":
+        print(f"📒 Lots acquittés: {len({e['key'] for e in _read_jsonl(journal_file)})} ({journal_file})")
+        print(f"📬 Lettres mortes: {len({e['key'] for e in _read_jsonl(dead_letter_file)})} ({dead_letter_file})")
+        return 0
+
+    from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+
+    populator = AfricanMiddleEasternPopulatorFixed(args.fuseki_url, args.dataset)
+
+    if args.command == "resume":
+        populator.open_journal(args.data_dir, resume=True)
+        success = populator.populate_knowledge_graph(args.data_dir)
+        populator.close_journal()
+        return 0 if success and not populator.dead_letters.count else 1
+
+    journal = PopulationJournal(journal_file, resume=True)
+    try:
+        replayed, remaining = replay_dead_letters(populator, dead_letter_file, journal)
+    finally:
+        journal.close()
+    print(f"\n📬 Rejouées: {replayed}, toujours en échec: {remaining}")
+    return 0 if remaining == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Archives d'images en gros fichiers (shards) compatibles tar
+
+Chaque shard `shard-00000.tar` est un tar standard (lisible par `tar -xf`),
+accompagné d'un index binaire `shard-00000.idx`: tableau trié de
+(clé 16 octets, offset, longueur) où la clé est un hachage de l'image_id.
+
+À la fermeture du writer, les index des nouveaux shards sont fusionnés
+avec la table existante dans `lookup-NNNNN.idx` (NNNNN: dernier shard
+couvert): triée par clé, une seule entrée par clé.
+
+Lecture:
+  - accès aléatoire: table fusionnée projetée en mémoire (memmap) +
+    recherche dichotomique + un pread; les index des shards plus récents
+    que la table (écrits sans compaction) sont consultés d'abord
+  - lecture séquentielle: parcours d'un shard entier en streaming
+
+Chaque relance du writer ajoute de nouveaux shards; une image réécrite sous
+le même image_id (ids déterministes) est donc présente plusieurs fois. La
+version la plus récente l'emporte: dernier shard, puis plus grand offset
+dans un même shard.
+"""
+
+import hashlib
+import io
+import os
+import tarfile
+from pathlib import Path
+
+import numpy as np
+
+SHARD_PREFIX = "shard-"
+LOOKUP_PREFIX = "lookup-"
+DEFAULT_MAX_SHARD_BYTES = 1024 * 1024 * 1024
+
+INDEX_DTYPE = np.dtype([('key', 'S16'), ('offset', '<u8'), ('length', '<u8')])
+MERGED_DTYPE = np.dtype([('key', 'S16'), ('shard', '<u4'), ('offset', '<u8'), ('length', '<u8')])
+
+
+def image_key(image_id):
+    """Clé d'index sur 16 octets pour un image_id"""
+    return hashlib.blake2b(str(image_id).encode('utf-8'), digest_size=16).digest()
+
+
+def shard_name(shard_number):
+    return f"{SHARD_PREFIX}{shard_number:05d}.tar"
+
+
+def _number(path, prefix):
+    return int(path.stem[len(prefix):])
+
+
+def _load_index(index_file, dtype):
+    """Projeter un index binaire en mémoire (tableau vide si le fichier est vide)"""
+    if index_file.stat().st_size == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(index_file, dtype=dtype, mode='r')
+
+
+def latest_lookup(shard_dir):
+    """Table fusionnée la plus récente: (fichier, dernier shard couvert) ou (None, -1)"""
+    lookups = sorted(Path(shard_dir).glob(f"{LOOKUP_PREFIX}*.idx"))
+    if not lookups:
+        return None, -1
+    return lookups[-1], _number(lookups[-1], LOOKUP_PREFIX)
+
+
+def indexed_shards(shard_dir, after=-1):
+    """Shards dont l'index est écrit, numérotés au-delà de `after`: [(numéro, tar, idx)]"""
+    shards = []
+    for tar_file in sorted(Path(shard_dir).glob(f"{SHARD_PREFIX}*.tar")):
+        number = _number(tar_file, SHARD_PREFIX)
+        index_file = tar_file.with_suffix('.idx')
+        if number > after and index_file.exists():
+            shards.append((number, tar_file, index_file))
+    return shards
+
+
+def compact_index(shard_dir):
+    """Fusionner la table existante et les index des shards plus récents
+
+    La table résultante est triée par clé et ne garde que la version la plus
+    récente de chaque image. Écriture atomique; retourne le fichier de table.
+    """
+    shard_dir = Path(shard_dir)
+    lookup_file, covered = latest_lookup(shard_dir)
+    tail = indexed_shards(shard_dir, covered)
+    if not tail:
+        return lookup_file
+
+    parts = [] if lookup_file is None else [_load_index(lookup_file, MERGED_DTYPE)]
+    for number, _, index_file in tail:
+        index = _load_index(index_file, INDEX_DTYPE)
+        part = np.empty(len(index), dtype=MERGED_DTYPE)
+        part['key'] = index['key']
+        part['shard'] = number
+        part['offset'] = index['offset']
+        part['length'] = index['length']
+        parts.append(part)
+
+    merged = np.concatenate(parts)
+    merged = merged[np.lexsort((merged['offset'], merged['shard'], merged['key']))]
+    # La plus récente version de chaque clé est la dernière de son groupe
+    if len(merged):
+        merged = merged[np.append(merged['key'][1:] != merged['key'][:-1], True)]
+
+    new_lookup = shard_dir / f"{LOOKUP_PREFIX}{tail[-1][0]:05d}.idx"
+    tmp_file = Path(f"{new_lookup}.{os.getpid()}.tmp")
+    merged.tofile(tmp_file)
+    os.replace(tmp_file, new_lookup)
+    if lookup_file is not None:
+        # Un lecteur qui projette encore l'ancienne table la garde jusqu'à sa fermeture
+        lookup_file.unlink()
+    return new_lookup
+
+
+class ShardWriter:
+    def __init__(self, output_dir, max_shard_bytes=DEFAULT_MAX_SHARD_BYTES):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_shard_bytes = max_shard_bytes
+
+        # Reprendre après les shards déjà présents
+        existing = sorted(self.output_dir.glob(f"{SHARD_PREFIX}*.tar"))
+        self.shard_number = int(existing[-1].stem[len(SHARD_PREFIX):]) + 1 if existing else 0
+
+        self._tar = None
+        self._records = []
+
+    def _open_shard(self):
+        self._tar = tarfile.open(self.output_dir / shard_name(self.shard_number), 'w', format=tarfile.PAX_FORMAT)
+        self._records = []
+
+    def _close_shard(self):
+        """Fermer le tar courant et écrire son index trié"""
+        if self._tar is None:
+            return
+        self._tar.close()
+
+        records = np.array(self._records, dtype=INDEX_DTYPE)
+        records.sort(order='key')
+        index_file = self.output_dir / shard_name(self.shard_number).replace('.tar', '.idx')
+        records.tofile(index_file)
+
+        self._tar = None
+        self.shard_number += 1
+
+    def add(self, image_id, arcname, source_path):
+        """Ajouter une image; retourne (nom du shard, offset, longueur)"""
+        size = os.path.getsize(source_path)
+
+        if self._tar is not None and self._tar.offset + size > self.max_shard_bytes:
+            self._close_shard()
+        if self._tar is None:
+            self._open_shard()
+
+        tarinfo = self._tar.gettarinfo(source_path, arcname=arcname)
+        tarinfo.uid = tarinfo.gid = 0
+        tarinfo.uname = tarinfo.gname = ""
+        with open(source_path, 'rb') as f:
+            self._tar.addfile(tarinfo, f)
+
+        # Les données finissent au bloc de 512 octets qui précède l'offset courant
+        padded = (size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+        offset = self._tar.offset - padded
+        self._records.append((image_key(image_id), offset, size))
+
+        return shard_name(self.shard_number), offset, size
+
+    def close(self):
+        self._close_shard()
+        compact_index(self.output_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShardReader:
+    def __init__(self, shard_dir):
+        self.shard_dir = Path(shard_dir)
+        shards = indexed_shards(self.shard_dir)
+        self.shards = [tar_file for _, tar_file, _ in shards]
+        self._shard_files = {number: tar_file for number, tar_file, _ in shards}
+        self._fds = {}
+
+        # Table fusionnée (memmap), et index des shards écrits depuis, du plus récent au plus ancien
+        lookup_file, covered = latest_lookup(self.shard_dir)
+        self.lookup = np.empty(0, dtype=MERGED_DTYPE) if lookup_file is None else _load_index(lookup_file, MERGED_DTYPE)
+        self._tail = [
+            (number, _load_index(index_file, INDEX_DTYPE))
+            for number, _, index_file in reversed(indexed_shards(self.shard_dir, covered))
+        ]
+
+    def _fd(self, tar_file):
+        if tar_file not in self._fds:
+            self._fds[tar_file] = os.open(tar_file, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        return self._fds[tar_file]
+
+    def locate(self, image_id):
+        """(fichier shard, offset, longueur) de la version la plus récente d'une image, ou None"""
+        key = np.array(image_key(image_id), dtype='S16')
+        for number, index in self._tail:
+            # Index d'un shard trié par (clé, offset): la dernière occurrence est la plus récente
+            position = np.searchsorted(index['key'], key, side='right') - 1
+            if position >= 0 and index['key'][position] == key:
+                return self._shard_files[number], int(index['offset'][position]), int(index['length'][position])
+
+        position = np.searchsorted(self.lookup['key'], key)
+        if position < len(self.lookup) and self.lookup['key'][position] == key:
+            record = self.lookup[position]
+            tar_file = self._shard_files.get(int(record['shard']))
+            if tar_file is not None:
+                return tar_file, int(record['offset']), int(record['length'])
+        return None
+
+    def read(self, image_id):
+        """Octets de l'image (un seul pread), ou None si absente"""
+        location = self.locate(image_id)
+        if location is None:
+            return None
+        tar_file, offset, length = location
+        fd = self._fd(tar_file)
+        if hasattr(os, 'pread'):
+            return os.pread(fd, length, offset)
+        with open(tar_file, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def iter_shard(self, tar_file, chunk_size=8 * 1024 * 1024):
+        """Parcourir séquentiellement un shard: (nom dans l'archive, octets)"""
+        with open(tar_file, 'rb', buffering=chunk_size) as f:
+            with tarfile.open(fileobj=f, mode='r|') as tar:
+                for member in tar:
+                    if member.isfile():
+                        yield member.name, tar.extractfile(member).read()
+
+    def iter_all(self):
+        """Parcourir séquentiellement tous les shards"""
+        for tar_file in self.shards:
+            yield from self.iter_shard(tar_file)
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_image(reader, image_id):
+    """Ouvrir une image d'un shard avec PIL sans l'extraire sur disque"""
+    from PIL import Image
+
+    data = reader.read(image_id)
+    return None if data is None else Image.open(io.BytesIO(data))
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Dossiers du catalogue: résolus sans correspondance floue
+SOURCE_CATEGORIES = {
+    "Drop Scones": 3,
+    "Kebda": 2,
+    "Stuffed Grape Leaves": 4,
+}
+
+
+def write_jpeg(path, size=(8, 6), color=(200, 120, 40)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path, "JPEG")
+    return path
+
+
+@pytest.fixture
+def image_source(tmp_path):
+    """Petit dossier source: un sous-dossier d'images JPEG par catégorie"""
+    source = tmp_path / "source"
+    for shade, (folder, count) in enumerate(SOURCE_CATEGORIES.items()):
+        for number in range(count):
+            write_jpeg(source / folder / f"photo_{number}.jpg", color=(40 * shade, 10 * number, 90))
+    return source
@@ -0,0 +1,76 @@
+import pytest
+
+from autocomplete_index import CACHE_MIN_RANGE, CACHE_TOP_K, AutocompleteBuilder, AutocompleteIndex, fold
+
+
+@pytest.fixture
+def index(tmp_path):
+    builder = AutocompleteBuilder()
+    builder.add("dish", "fried_egg_mayai_ya_kukaangwa", 40)
+    builder.add("dish", "kebda", 25, aliases=["Kébda Iskandarani"])
+    builder.add("dish", "Crème Brûlée", 12)
+    builder.add("dish", "ʿAsida", 8)
+    builder.add("dish", "kibbe_quipe", 30)
+    builder.add("ingredient", "kale", 5)
+    builder.add("ingredient", "eggs", 9)
+    index = AutocompleteIndex(builder.write(tmp_path / "autocomplete.idx"))
+    yield index
+    index.close()
+
+
+def names(results):
+    return [name for name, _, _ in results]
+
+
+def test_prefix_returns_most_popular_targets_first(index):
+    assert index.complete("k") == [
+        ("fried egg mayai ya kukaangwa", "dish", 40), ("kibbe quipe", "dish", 30),
+        ("kebda", "dish", 25), ("kale", "ingredient", 5)
+    ]
+    assert names(index.complete("ke")) == ["kebda"]
+    assert names(index.complete("k", k=2)) == ["fried egg mayai ya kukaangwa", "kibbe quipe"]
+
+
+def test_any_word_of_a_name_or_alias_matches(index):
+    assert names(index.complete("mayai")) == ["fried egg mayai ya kukaangwa"]
+    assert names(index.complete("iskan")) == ["kebda"]
+    assert names(index.complete("egg")) == ["fried egg mayai ya kukaangwa", "eggs"]
+
+
+def test_kind_filter(index):
+    assert index.complete("egg", kind="ingredient") == [("eggs", "ingredient", 9)]
+    assert names(index.complete("k", kind="dish")) == ["fried egg mayai ya kukaangwa", "kibbe quipe", "kebda"]
+
+
+def test_accents_case_and_transliteration_marks_are_folded(index):
+    assert fold("ʿAsīda_Crème-Brûlée") == "asida creme brulee"
+    assert names(index.complete("KÉB")) == ["kebda"]
+    assert names(index.complete("creme b")) == ["Crème Brûlée"]
+    assert names(index.complete("brûl")) == ["Crème Brûlée"]
+    assert names(index.complete("asi")) == ["ʿAsida"]
+    assert names(index.complete("ʿasi")) == ["ʿAsida"]
+
+
+def test_empty_or_unknown_prefix(index):
+    assert index.complete("") == []
+    assert index.complete("   ") == []
+    assert index.complete("_-") == []
+    assert index.complete("zz") == []
+    assert index.prefix_range("zz")[0] == index.prefix_range("zz")[1]
+
+
+def test_cached_short_prefix_matches_the_range_scan(tmp_path):
+    builder = AutocompleteBuilder()
+    for n in range(CACHE_MIN_RANGE + 100):
+        builder.add("dish", f"ka dish {n:04d}", n % 97)
+    builder.add("ingredient", "kale", 500)
+    index = AutocompleteIndex(builder.write(tmp_path / "autocomplete.idx"))
+    try:
+        assert b"ka" in [index.cache_keys[i] for i in range(len(index.cache_keys))]
+        cached = index.complete("ka", k=CACHE_TOP_K)
+        scanned = index.complete("ka", k=CACHE_TOP_K + 1)[:CACHE_TOP_K]
+        assert cached == scanned
+        assert cached[0] == ("kale", "ingredient", 500)
+        assert index.complete("ka", k=3, kind="ingredient") == [("kale", "ingredient", 500)]
+    finally:
+        index.close()
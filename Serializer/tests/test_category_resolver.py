@@ -0,0 +1,49 @@
+import pytest
+
+from category_resolver import CategoryResolver, normalize_name
+
+
+@pytest.fixture
+def resolver():
+    return CategoryResolver.from_file()
+
+
+def test_exact_match_shortcuts_the_trigram_search(resolver, monkeypatch):
+    def no_search(name, k=2):
+        raise AssertionError("recherche floue pour un nom exact")
+
+    monkeypatch.setattr(resolver, "candidates", no_search)
+    assert resolver.match("Drop Scones") == ("drop_scones", 1.0)
+    assert resolver.resolve("Stuffed-Grape  Leaves") is resolver.catalog["stuffed_grape_leaves"]
+    assert resolver.guesses == {}
+
+
+def test_accented_names_normalize_to_the_catalog_key():
+    assert normalize_name("Kébda") == "kebda"
+    catalog = {"creme_brulee": {"class": "Dessert"}, "default": {"class": "Food"}}
+    resolver = CategoryResolver(catalog)
+    assert resolver.match("Crème Brûlée") == ("creme_brulee", 1.0)
+
+
+def test_close_spelling_is_accepted_and_recorded_as_a_guess(resolver):
+    assert resolver.match("Kebdah") == ("kebda", 0.769)
+    assert resolver.resolve("Kebdah") is resolver.catalog["kebda"]
+    assert resolver.guesses == {"Kebdah": ("kebda", 0.769)}
+    assert resolver.unresolved == set()
+
+
+def test_ambiguous_name_is_not_guessed(resolver):
+    # "chapati" est aussi proche de brown_chapati que de white_chapati
+    key, score = resolver.match("chapati")
+    assert key is None and score >= resolver.threshold
+
+    assert resolver.resolve("chapati") is resolver.catalog["default"]
+    assert resolver.ambiguous == {"chapati": [("brown_chapati", 0.636), ("white_chapati", 0.636)]}
+    assert "chapati" not in resolver.guesses
+    assert resolver.unresolved == set()
+
+
+def test_unknown_name_falls_back_to_default(resolver):
+    assert resolver.match("Ugali") == (None, 0.0)
+    assert resolver.resolve("Ugali") is resolver.catalog["default"]
+    assert resolver.unresolved == {"Ugali"}
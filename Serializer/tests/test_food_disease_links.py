@@ -0,0 +1,59 @@
+from rdflib import Dataset, URIRef
+
+from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+from food_disease_links import LINKS_GRAPH, STAGING_SUFFIX, FoodDiseaseLinks, load_disease_classes, load_rules
+from nutrient_engine import NUTRIENTS
+
+SALTY = dict(zip(NUTRIENTS, (300, 10, 20, 20, 1, 900, 2)))
+LIGHT = dict(zip(NUTRIENTS, (80, 4, 12, 2, 5, 50, 3)))
+
+
+class DatasetPopulator(AfricanMiddleEasternPopulatorFixed):
+    """Populateur qui applique les mises à jour à un Dataset rdflib local"""
+
+    def __init__(self, dataset, fail_after=None):
+        super().__init__()
+        self.dataset = dataset
+        self.fail_after = fail_after
+        self.sent = 0
+
+    def execute_sparql_update(self, query):
+        if self.fail_after is not None and self.sent >= self.fail_after:
+            self.errors.append("connexion perdue")
+            return False
+        self.dataset.update(query)
+        self.sent += 1
+        return True
+
+
+def compute_links(rows):
+    return FoodDiseaseLinks.compute(rows, load_disease_classes(), load_rules())
+
+
+def food_rows(*foods):
+    return [{'food_name': name, 'ingredients': '', **profile} for name, profile in foods]
+
+
+def test_interrupted_publish_leaves_the_published_graph_intact():
+    dataset = Dataset()
+    links = compute_links(food_rows(("salty_stew", SALTY), ("light_salad", LIGHT)))
+    assert links.publish(DatasetPopulator(dataset))
+
+    published = dataset.graph(URIRef(LINKS_GRAPH))
+    before = set(published)
+    assert before
+    assert not set(dataset.graph(URIRef(LINKS_GRAPH + STAGING_SUFFIX)))
+
+    # Nouveaux liens en plusieurs lots, connexion coupée avant le MOVE
+    bigger = compute_links(food_rows(*[(f"stew_{n}", SALTY) for n in range(40)]))
+    queries = bigger.graph_updates(DatasetPopulator(dataset), batch_size=20)
+    assert len(queries) > 2 and queries[-1].startswith("MOVE")
+    assert not bigger.publish(DatasetPopulator(dataset, fail_after=len(queries) - 1), batch_size=20)
+    assert set(dataset.graph(URIRef(LINKS_GRAPH))) == before
+
+    # Publication complète: le graphe est remplacé, sans reste de l'ancien
+    assert bigger.publish(DatasetPopulator(dataset))
+    replaced = {str(s) for s, _, _ in dataset.graph(URIRef(LINKS_GRAPH))}
+    assert not any(s.endswith("#salty_stew") for s in replaced)
+    assert any(s.endswith("#stew_39") for s in replaced)
+    assert not set(dataset.graph(URIRef(LINKS_GRAPH + STAGING_SUFFIX)))
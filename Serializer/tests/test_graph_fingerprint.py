@@ -0,0 +1,80 @@
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import XSD
+
+from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+from graph_fingerprint import FingerprintVerifier, numeric_lexical
+
+ROWS = [
+    {'food_name': "kebda", 'region': "North Africa", 'calories_per_100g': "405.4", 'proteins': "100",
+     'fats': "0.0", 'sodium': "362.2", 'ingredients': "liver,garlic"},
+    {'food_name': "drop_scones", 'region': "East Africa", 'calories_per_100g': "227.0", 'sugar': "12.5"},
+]
+
+
+class GraphPopulator(AfricanMiddleEasternPopulatorFixed):
+    """Populateur branché sur un graphe rdflib local au lieu de Fuseki"""
+
+    def __init__(self, graph):
+        super().__init__()
+        self.graph = graph
+
+    def execute_sparql_update(self, query):
+        self.graph.update(query)
+        return True
+
+    def execute_sparql_query(self, query, timeout=60):
+        return [
+            {name: {'value': str(term)} for name, term in row.asdict().items()}
+            for row in self.graph.query(query)
+        ]
+
+
+def populated():
+    populator = GraphPopulator(Graph())
+    for row in ROWS:
+        assert populator.add_food_with_specialization(row, [])
+    return populator
+
+
+def numeric_triples(graph):
+    numeric = (XSD.decimal, XSD.double, XSD.integer)
+    return [(s, p, o) for s, p, o in graph if isinstance(o, Literal) and o.datatype in numeric]
+
+
+def test_numeric_lexical_matches_export_rounding():
+    assert numeric_lexical(405.4) == numeric_lexical("405.40") == numeric_lexical(4.054e2) == "4054"
+    assert numeric_lexical(100) == numeric_lexical("1.0E2") == "1000"
+    assert numeric_lexical(0.25) == "3"
+
+
+def test_fingerprint_ignores_the_lexical_form_of_numbers():
+    populator = populated()
+    verifier = FingerprintVerifier(populator, populator.fingerprint)
+    assert verifier.verify().ok
+
+    # Le serveur renvoie d'autres formes lexicales: doubles (1.0E2) ou entiers (100)
+    graph = populator.graph
+    numbers = numeric_triples(graph)
+    assert len(numbers) == 6
+    for s, p, o in numbers:
+        value = float(o.toPython())
+        graph.remove((s, p, o))
+        if value.is_integer():
+            graph.add((s, p, Literal(str(int(value)), datatype=XSD.integer)))
+        else:
+            graph.add((s, p, Literal(f"{value:E}", datatype=XSD.double)))
+    assert verifier.verify().ok
+
+
+def test_changed_number_is_reported_with_canonical_values():
+    populator = populated()
+    kebda = URIRef(populator.create_uri("kebda"))
+    calories = URIRef(f"{populator.food_ns}calories")
+    populator.graph.set((kebda, calories, Literal("410.0", datatype=XSD.decimal)))
+
+    report = FingerprintVerifier(populator, populator.fingerprint).verify()
+    assert not report.ok
+    assert report.mismatched_foods == [str(kebda)]
+    missing, extra = report.triple_diffs[str(kebda)]
+    assert missing == [(str(kebda), str(calories), "4054")]
+    assert extra == [(str(kebda), str(calories), "4100")]
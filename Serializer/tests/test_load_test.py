@@ -0,0 +1,100 @@
+import csv
+import time
+
+import pytest
+
+from load_test import (
+    DEFAULT_MIX, QueryMix, RecordedBackend, compare_with_baseline, load_recording, parse_mix, query_digest, record,
+    run_load
+)
+
+
+@pytest.fixture
+def query_mix(tmp_path):
+    nutrition_file = tmp_path / "nutritional" / "african_middle_eastern_nutritional.csv"
+    nutrition_file.parent.mkdir(parents=True)
+    with open(nutrition_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['food_name', 'region'])
+        writer.writeheader()
+        writer.writerow({'food_name': "kebda", 'region': "North Africa"})
+        writer.writerow({'food_name': "drop_scones", 'region': "East Africa"})
+    return QueryMix(tmp_path)
+
+
+class CountingBackend:
+    """Fuseki simulé: chaque réponse a autant de lignes que de caractères dans la requête, modulo 7"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def execute(self, query):
+        self.calls += 1
+        return [{'n': {'value': str(i)}} for i in range(len(query) % 7)]
+
+
+def test_parse_mix():
+    assert parse_mix(None) == DEFAULT_MIX
+    assert parse_mix("text=3, food_detail=0.5,count") == {'text': 3.0, 'food_detail': 0.5, 'count': 1.0}
+    with pytest.raises(ValueError, match="inconnu"):
+        parse_mix("text=1,joins=2")
+    with pytest.raises(ValueError, match="vide"):
+        parse_mix("text=0,count=0")
+
+
+def test_compare_with_baseline():
+    baseline = {'summary': {
+        'text': {'p95_ms': 10.0},
+        'region': {'p95_ms': 20.0},
+        'count': {'p95_ms': 0.0},
+    }}
+    summary = {
+        'text': {'p95_ms': 13.0},          # +30 %: régression
+        'region': {'p95_ms': 24.0},        # +20 %: toléré
+        'count': {'p95_ms': 5.0},          # référence nulle: ignorée
+        'food_detail': {'p95_ms': 99.0},   # absent de la référence
+        'group_by': {'requests': 0},       # aucune requête réussie
+    }
+    regressions = compare_with_baseline(summary, baseline, max_regression=0.25)
+    assert [(t, before, after) for t, before, after, _ in regressions] == [('text', 10.0, 13.0)]
+    assert regressions[0][3] == pytest.approx(0.3)
+    assert len(compare_with_baseline(summary, baseline, max_regression=0.1)) == 2
+    assert compare_with_baseline(summary, {}) == []
+
+
+def test_recorded_backend_replays_every_possible_query(tmp_path, query_mix):
+    fuseki = CountingBackend()
+    output_file = tmp_path / "recording.json"
+    assert record(fuseki, query_mix, output_file, "test")
+
+    recording = load_recording(output_file)
+    replay = RecordedBackend(recording, latency_scale=0)
+    for _, queries in query_mix.all_queries():
+        for query in queries:
+            assert replay.execute(query) == CountingBackend().execute(query)
+            assert recording['responses'][query_digest(query)]['rows'] == len(replay.execute(query))
+    with pytest.raises(KeyError):
+        replay.execute("SELECT * WHERE { ?s ?p ?o }")
+
+    # Rejeu sous charge: aucune erreur ni écart de lignes
+    result = run_load(replay, query_mix, concurrency=2, duration=5, max_requests=40,
+                      expected=recording['responses'], seed=1)
+    summary = result.summary()
+    assert sum(stats['requests'] for stats in summary.values()) == 40
+    assert not any(stats['errors'] or stats['mismatches'] for stats in summary.values())
+
+
+def test_closed_loop_throughput_counts_only_elapsed_time(tmp_path, query_mix):
+    # Requêtes de 150 ms, échéance à 200 ms: chaque client finit sa 2e requête à 300 ms
+    query_mix.mix = {'count': 1}
+    query = query_mix.count_query()[0]
+    recording = {'responses': {query_digest(query): {'latency': 0.15, 'rows': 1, 'bindings': [{}]}}}
+
+    started = time.perf_counter()
+    result = run_load(RecordedBackend(recording), query_mix, concurrency=2, duration=0.2)
+    wall = time.perf_counter() - started
+
+    completed = result.summary()['count']['requests']
+    assert completed == 4
+    assert result.elapsed == pytest.approx(wall, abs=0.05)
+    # Un client ne peut pas terminer plus d'une requête par 150 ms
+    assert result.summary()['count']['throughput'] <= 2 / 0.15
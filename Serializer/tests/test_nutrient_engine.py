@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from nutrient_engine import NUTRIENTS, NutrientEngine
+
+# calories, protéines, glucides, lipides, fibres, sodium, sucres, grammes typiques
+COMPOSITION = {
+    "flour": (360, 10.0, 76.0, 1.0, 3.0, 2, 0.0, 100),
+    "oil": (900, 0.0, 0.0, 100.0, 0.0, 0, 0.0, 10),
+    "salt": (0, 0.0, 0.0, 0.0, 0.0, 40000, 0.0, 1),
+}
+
+# Profils calculés à la main: Σ grammes·valeurs / Σ grammes des ingrédients connus
+BREAD = {  # 100 g de farine, 10 g d'huile, 1 g de sel (111 g)
+    'calories_per_100g': 405.4,   # 45000 / 111
+    'proteins': 9.0,              # 1000 / 111
+    'carbohydrates': 68.5,        # 7600 / 111
+    'fats': 9.9,                  # 1100 / 111
+    'fiber': 2.7,                 # 300 / 111
+    'sodium': 362.2,              # 40200 / 111
+    'sugar': 0.0,
+}
+FRIED_DOUGH = {  # farine et huile aux grammes typiques, levure inconnue ignorée (110 g)
+    'calories_per_100g': 409.1,   # 45000 / 110
+    'proteins': 9.1,              # 1000 / 110
+    'carbohydrates': 69.1,        # 7600 / 110
+    'fats': 10.0,                 # 1100 / 110
+    'fiber': 2.7,                 # 300 / 110
+    'sodium': 1.8,                # 200 / 110
+    'sugar': 0.0,
+}
+
+
+def new_engine():
+    engine = NutrientEngine(COMPOSITION)
+    engine.set_dishes({"bread": {"flour": 100, "oil": 10, "salt": 1}})
+    return engine
+
+
+def test_profiles_match_hand_computed_values():
+    engine = new_engine()
+    assert engine.get_profile("bread") == BREAD
+    assert engine.get_profile("bread", decimals=2)['calories_per_100g'] == 405.41
+    assert engine.get_profile("bread", decimals=0)['sodium'] == 362.0
+
+
+def test_dish_without_known_ingredient_has_unknown_values():
+    engine = new_engine()
+    engine.add_dishes({"mystery": ["yeast"]})
+    assert engine.get_profile("mystery") == {nutrient: None for nutrient in NUTRIENTS}
+    assert engine.missing_ingredients["mystery"] == ["yeast"]
+
+
+def test_added_dishes_stay_pending_until_merged():
+    engine = new_engine()
+    engine.compute()
+
+    assert engine.add_dishes({"bread": "flour", "fried_dough": "flour, oil, yeast"}) == ["fried_dough"]
+    assert len(engine._pending) == 1
+    assert engine.weights.shape[0] == 1
+
+    # Profil lu dans le bloc en attente, sans fusion
+    assert engine.get_profile("fried_dough") == FRIED_DOUGH
+    assert len(engine._pending) == 1
+
+    engine._merge_pending()
+    assert engine._pending == [] and engine._pending_profiles == []
+    assert engine.weights.shape == (2, len(engine.typical_grams))
+    assert engine.get_profile("bread") == BREAD
+    assert engine.get_profile("fried_dough") == FRIED_DOUGH
+    np.testing.assert_allclose(engine.profiles, engine.compute())
+
+
+def test_add_dishes_before_any_set_dishes():
+    engine = NutrientEngine(COMPOSITION)
+    engine.add_dishes({"bread": {"flour": 100, "oil": 10, "salt": 1}})
+    engine.add_dishes({"fried_dough": ["flour", "oil", "yeast"]})
+    assert len(engine._pending) == 2
+
+    engine._merge_pending()
+    assert engine.dish_names == ["bread", "fried_dough"]
+    assert engine.get_all_profiles() == {"bread": BREAD, "fried_dough": FRIED_DOUGH}
+
+
+def test_update_ingredient_merges_and_recomputes_affected_dishes():
+    engine = new_engine()
+    engine.add_dishes({"fried_dough": "flour,oil,yeast"})
+
+    yeast = dict(zip(NUTRIENTS, (300, 41.0, 40.0, 5.0, 20.0, 50, 0.0)))
+    assert engine.update_ingredient("Yeast", yeast) == ["fried_dough"]
+    assert engine._pending == []
+    assert "fried_dough" not in engine.missing_ingredients
+
+    # Levure comptée à 50 g: 160 g au total
+    profile = engine.get_profile("fried_dough")
+    assert profile['calories_per_100g'] == 375.0   # 60000 / 160
+    assert profile['proteins'] == 19.1             # 3050 / 160
+    assert profile['sodium'] == 16.9               # 2700 / 160
+    assert engine.get_profile("bread") == BREAD
+
+
+def test_compute_without_dishes_raises():
+    with pytest.raises(ValueError):
+        NutrientEngine(COMPOSITION).compute()
@@ -0,0 +1,47 @@
+import numpy as np
+
+from nutrient_engine import NUTRIENTS
+from nutrition_index import NutritionIndex
+
+NAN = np.nan
+
+# calories_per_100g, proteins, carbohydrates, fats, fiber, sodium, sugar
+PROFILES = {
+    "lentil_soup": (120, 9, 18, 2, 6, 400, 2),
+    "honey_cake": (380, 5, 60, 14, 1, 150, 35),
+    "grilled_fish": (210, 22, NAN, 11, NAN, 300, NAN),
+    "flatbread": (270, 8, 52, 3, 2, 480, 3),
+}
+
+
+def build_index():
+    return NutritionIndex(list(PROFILES), list(PROFILES.values()))
+
+
+def test_partial_profile_finds_dishes_with_unknown_other_nutrients():
+    index = build_index()
+    assert index.nearest(k=1, calories=200)[0][0] == "grilled_fish"
+    assert index.nearest(k=1, calories=205, protein=21)[0][0] == "grilled_fish"
+
+    # Un nutriment inconnu du plat l'exclut seulement des sous-espaces qui le demandent
+    assert "grilled_fish" not in [name for name, _ in index.nearest(k=4, sugar=3)]
+    assert len(index.nearest(k=4, calories=200)) == 4
+
+
+def test_full_profile_uses_complete_dishes_only():
+    index = build_index()
+    names = [name for name, _ in index.nearest(k=4, **dict(zip(NUTRIENTS, PROFILES["flatbread"])))]
+    assert names[0] == "flatbread"
+    assert "grilled_fish" not in names
+
+
+def test_range_query_skips_unknown_values():
+    index = build_index()
+    assert index.range_query(calories=(None, 250)) == ["lentil_soup", "grilled_fish"]
+    assert index.range_query(fiber=(1, None)) == ["lentil_soup", "honey_cake", "flatbread"]
+
+
+def test_saved_index_answers_the_same(tmp_path):
+    index = build_index()
+    reloaded = NutritionIndex.load(index.save(tmp_path / "index.npz"))
+    assert reloaded.nearest(k=2, calories=200, fat=10) == index.nearest(k=2, calories=200, fat=10)
@@ -0,0 +1,86 @@
+import json
+import os
+import socket
+import time
+
+import pytest
+
+from african_middle_eastern_food_processor import AfricanMiddleEasternFoodProcessor
+from partitioned_ingest import PartitionedJob, main
+
+PROCESSING_DATE = "2025-01-01T00:00:00"
+OUTPUTS = (
+    ("metadata", "african_middle_eastern_food_index.json"),
+    ("nutritional", "african_middle_eastern_nutritional.csv"),
+)
+
+
+def read_outputs(data_dir):
+    return {name: data_dir.joinpath(folder, name).read_bytes() for folder, name in OUTPUTS}
+
+
+def run_job(tmp_path, source, name, workers, mode):
+    data_dir = tmp_path / name
+    exit_code = main([
+        "run", str(tmp_path / f"work-{name}"), str(source), "--partitions", "5", "--by", mode,
+        "--workers", str(workers), "--data-dir", str(data_dir), "--processing-date", PROCESSING_DATE
+    ])
+    assert exit_code == 0
+    return read_outputs(data_dir)
+
+
+@pytest.mark.parametrize("mode", ["file", "category"])
+def test_one_or_several_workers_give_identical_outputs(tmp_path, image_source, mode):
+    single = run_job(tmp_path, image_source, "single", 1, mode)
+    several = run_job(tmp_path, image_source, "several", 3, mode)
+
+    # Référence: traitement séquentiel avec la même date
+    sequential_dir = tmp_path / "sequential"
+    processor = AfricanMiddleEasternFoodProcessor(str(sequential_dir))
+    processor.processing_date = PROCESSING_DATE
+    processor.process_images(str(image_source))
+    processor.close()
+
+    assert single == several == read_outputs(sequential_dir)
+    index = json.loads(single["african_middle_eastern_food_index.json"])
+    assert index["total_images"] == 9
+
+
+def write_claim(job, index, generation, host, pid, age):
+    claim_file = job.claims_dir / f"partition-{index:04d}.{generation}"
+    claim_file.write_text(json.dumps({'host': host, 'pid': pid, 'generation': generation}))
+    stamp = time.time() - age
+    os.utime(claim_file, (stamp, stamp))
+    return claim_file
+
+
+def test_expired_lease_is_reclaimed_by_the_next_generation(tmp_path, image_source):
+    job = PartitionedJob(tmp_path / "work")
+    job.init(image_source, 3, data_dir=tmp_path / "data", processing_date=PROCESSING_DATE, lease_seconds=60)
+
+    # Partition 0: bail d'une autre machine expiré; partition 1: bail encore valide
+    write_claim(job, 0, 0, "other-host", 4242, age=120)
+    write_claim(job, 1, 0, "other-host", 4242, age=10)
+
+    index, claim_file = job.claim()
+    assert (index, claim_file.name) == (0, "partition-0000.1")
+    assert json.loads(claim_file.read_text())['pid'] == os.getpid()
+
+    # La partition 1 est ignorée: le bail court toujours
+    index, claim_file = job.claim()
+    assert (index, claim_file.name) == (2, "partition-0002.0")
+    assert job.claim() is None
+    assert any("partition-0001: en cours" in line for line in job.describe_pending())
+
+
+def test_dead_process_on_this_host_loses_its_lease(tmp_path, image_source):
+    job = PartitionedJob(tmp_path / "work")
+    job.init(image_source, 1, data_dir=tmp_path / "data", processing_date=PROCESSING_DATE, lease_seconds=60)
+
+    dead_pid = 2 ** 22 + 1
+    write_claim(job, 0, 0, socket.gethostname(), dead_pid, age=0)
+    assert "abandonnée" in job.describe_pending()[0]
+
+    assert job.work() == 1
+    assert job.pending() == []
+    assert (job.claims_dir / "partition-0000.1").exists()
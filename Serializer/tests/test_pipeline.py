@@ -0,0 +1,64 @@
+import csv
+
+import african_middle_eastern_populator
+import pipeline
+from african_middle_eastern_food_processor import AfricanMiddleEasternFoodProcessor
+
+CSV_PATH = ("nutritional", "african_middle_eastern_nutritional.csv")
+
+
+class FakeJournal:
+    committed = {}
+
+
+class FakePopulator:
+    """Populateur sans Fuseki: consomme les enregistrements au fil du traitement"""
+
+    received = []
+
+    def __init__(self, fuseki_url, dataset_name):
+        self.journal = FakeJournal()
+
+    def test_endpoints(self):
+        return True
+
+    def open_journal(self, data_dir, resume=False):
+        pass
+
+    def close_journal(self):
+        pass
+
+    def populate_from_records(self, records, total=None, summary_file=None, on_pushed=None):
+        for row, images in records:
+            FakePopulator.received.append(row)
+            if on_pushed is not None:
+                on_pushed(row['food_name'])
+
+    def verify_knowledge_graph(self, fingerprint=False):
+        return True
+
+
+def read_csv(data_dir):
+    with open(data_dir.joinpath(*CSV_PATH), newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_pipeline_csv_matches_batch_export(tmp_path, image_source, monkeypatch):
+    monkeypatch.setattr(african_middle_eastern_populator, "AfricanMiddleEasternPopulatorFixed", FakePopulator)
+    FakePopulator.received = []
+
+    config = pipeline.load_config(env_file=tmp_path / "absent.env")
+    config.update(source_dir=str(image_source), data_dir=str(tmp_path / "pipeline"), metadata_db=True)
+    assert pipeline.run_pipeline(config, skip_ontology=True)
+
+    batch_dir = tmp_path / "batch"
+    processor = AfricanMiddleEasternFoodProcessor(str(batch_dir))
+    processor.process_images(str(image_source))
+    processor.close()
+
+    pipeline_rows = read_csv(tmp_path / "pipeline")
+    assert pipeline_rows == read_csv(batch_dir)
+    assert [row['food_name'] for row in pipeline_rows] == ["drop_scones", "kebda", "stuffed_grape_leaves"]
+
+    # Le populateur a reçu les mêmes lignes que le CSV
+    assert [{k: str(v) for k, v in row.items()} for row in FakePopulator.received] == pipeline_rows
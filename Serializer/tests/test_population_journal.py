@@ -0,0 +1,112 @@
+import re
+
+import pytest
+
+from african_middle_eastern_food_processor import AfricanMiddleEasternFoodProcessor
+from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+from population_journal import PopulationJournal, _read_jsonl, journal_paths, replay_dead_letters
+
+FOODS = ["drop_scones", "kebda", "stuffed_grape_leaves"]
+
+
+class Crash(Exception):
+    """Arrêt brutal du processus au milieu de la population"""
+
+
+class ScriptedPopulator(AfricanMiddleEasternPopulatorFixed):
+    """Populateur sans Fuseki: chaque plat peut échouer (HTTP 503) ou couper le processus"""
+
+    def __init__(self, failing=(), crash_on=None):
+        super().__init__()
+        self.failing = set(failing)
+        self.crash_on = crash_on
+        self.sent = []
+
+    def test_endpoints(self):
+        return True
+
+    def execute_sparql_update(self, query):
+        food = food_of(query)
+        if food is not None and food == self.crash_on:
+            raise Crash(food)
+        if food in self.failing:
+            self.last_failure = {'status': 503, 'response': "Service Unavailable"}
+            self.errors.append("HTTP 503")
+            return False
+        if food is not None:
+            self.sent.append(food)
+        return True
+
+
+def food_of(query):
+    """Plat d'une mise à jour (premier :name de la requête), None pour le résumé"""
+    match = re.search(r':name "([^"]+)"', query)
+    return match.group(1) if match else None
+
+
+@pytest.fixture
+def data_dir(tmp_path, image_source):
+    processor = AfricanMiddleEasternFoodProcessor(str(tmp_path / "data"))
+    processor.process_images(str(image_source))
+    processor.close()
+    return tmp_path / "data"
+
+
+def populate(data_dir, populator, resume):
+    populator.open_journal(data_dir, resume=resume)
+    try:
+        populator.populate_knowledge_graph(data_dir)
+    finally:
+        populator.close_journal()
+
+
+def test_resume_after_interruption_never_sends_a_batch_twice(data_dir):
+    first = ScriptedPopulator(failing={"kebda"}, crash_on="stuffed_grape_leaves")
+    with pytest.raises(Crash):
+        populate(data_dir, first, resume=False)
+    assert first.sent == ["drop_scones"]
+
+    journal_file, dead_letter_file = journal_paths(data_dir)
+    assert [entry['key'] for entry in _read_jsonl(journal_file)] == ["food:drop_scones"]
+    assert [letter['status'] for letter in _read_jsonl(dead_letter_file)] == [503]
+
+    second = ScriptedPopulator()
+    populate(data_dir, second, resume=True)
+    assert second.sent == ["kebda", "stuffed_grape_leaves"]
+    assert second.batches_skipped == 1
+    assert sorted(entry['key'] for entry in _read_jsonl(journal_file)) == [f"food:{name}" for name in FOODS]
+
+    # La lettre morte de "kebda" a été acquittée par la reprise: rien à rejouer
+    third = ScriptedPopulator()
+    journal = PopulationJournal(journal_file, resume=True)
+    try:
+        assert replay_dead_letters(third, dead_letter_file, journal) == (0, 0)
+    finally:
+        journal.close()
+    assert third.sent == []
+    assert _read_jsonl(dead_letter_file) == []
+
+    # Une nouvelle reprise ne renvoie plus aucun plat
+    fourth = ScriptedPopulator()
+    populate(data_dir, fourth, resume=True)
+    assert fourth.sent == []
+    assert fourth.batches_skipped == len(FOODS)
+
+
+def test_dead_letters_are_replayed_once(data_dir):
+    populate(data_dir, ScriptedPopulator(failing={"kebda"}), resume=False)
+    journal_file, dead_letter_file = journal_paths(data_dir)
+    assert len(_read_jsonl(dead_letter_file)) == 1
+
+    # Fuseki toujours indisponible: la lettre reste, avec la nouvelle réponse
+    journal = PopulationJournal(journal_file, resume=True)
+    try:
+        assert replay_dead_letters(ScriptedPopulator(failing={"kebda"}), dead_letter_file, journal) == (0, 1)
+        replayer = ScriptedPopulator()
+        assert replay_dead_letters(replayer, dead_letter_file, journal) == (1, 0)
+        assert replay_dead_letters(replayer, dead_letter_file, journal) == (0, 0)
+    finally:
+        journal.close()
+    assert replayer.sent == ["kebda"]
+    assert [entry['key'] for entry in _read_jsonl(journal_file)] == ["food:drop_scones", "food:stuffed_grape_leaves",
+                                                                    "food:kebda"]
@@ -0,0 +1,78 @@
+import numpy as np
+
+from shard_archive import ShardReader, ShardWriter, compact_index
+
+
+def write_image(tmp_path, name, data):
+    source = tmp_path / name
+    source.write_bytes(data)
+    return source
+
+
+def test_rewrite_returns_newest_version(tmp_path):
+    shard_dir = tmp_path / "shards"
+
+    with ShardWriter(shard_dir) as writer:
+        writer.add("img-1", "images/cat/a.jpg", write_image(tmp_path, "old.jpg", b"OLD"))
+        writer.add("img-2", "images/cat/b.jpg", write_image(tmp_path, "other.jpg", b"OTHER"))
+    # Nouvelle exécution: nouveau shard, même image_id
+    with ShardWriter(shard_dir) as writer:
+        writer.add("img-1", "images/cat/a.jpg", write_image(tmp_path, "new.jpg", b"NEW"))
+
+    with ShardReader(shard_dir) as reader:
+        assert len(reader.shards) == 2
+        assert reader.read("img-1") == b"NEW"
+        assert reader.read("img-2") == b"OTHER"
+        assert reader.read("missing") is None
+
+
+def test_rewrite_within_one_shard_returns_last_write(tmp_path):
+    shard_dir = tmp_path / "shards"
+
+    with ShardWriter(shard_dir) as writer:
+        writer.add("img-1", "images/cat/a.jpg", write_image(tmp_path, "v1.jpg", b"V1"))
+        writer.add("img-1", "images/cat/a.jpg", write_image(tmp_path, "v2.jpg", b"V2"))
+
+    with ShardReader(shard_dir) as reader:
+        assert reader.read("img-1") == b"V2"
+        assert [name for name, _ in reader.iter_all()] == ["images/cat/a.jpg", "images/cat/a.jpg"]
+
+
+def test_empty_directory(tmp_path):
+    with ShardReader(tmp_path) as reader:
+        assert reader.locate("img-1") is None
+
+
+def test_writer_compacts_into_one_memory_mapped_lookup(tmp_path):
+    shard_dir = tmp_path / "shards"
+
+    for version in (b"V1", b"V2", b"V3"):
+        with ShardWriter(shard_dir) as writer:
+            writer.add("img-1", "images/cat/a.jpg", write_image(tmp_path, "a.jpg", version))
+            writer.add(f"img-{version.decode()}", "images/cat/b.jpg", write_image(tmp_path, "b.jpg", version))
+
+    assert [p.name for p in shard_dir.glob("lookup-*.idx")] == ["lookup-00002.idx"]
+    with ShardReader(shard_dir) as reader:
+        assert isinstance(reader.lookup, np.memmap)
+        assert len(reader.lookup) == 4
+        assert reader.read("img-1") == b"V3"
+        assert reader.read("img-V1") == b"V1"
+
+
+def test_shards_written_after_the_lookup_are_read_first(tmp_path):
+    shard_dir = tmp_path / "shards"
+
+    with ShardWriter(shard_dir) as writer:
+        writer.add("img-1", "images/cat/a.jpg", write_image(tmp_path, "old.jpg", b"OLD"))
+    # Arrêt avant la compaction: l'index du shard existe, pas la table fusionnée
+    writer = ShardWriter(shard_dir)
+    writer.add("img-1", "images/cat/a.jpg", write_image(tmp_path, "new.jpg", b"NEW"))
+    writer._close_shard()
+
+    with ShardReader(shard_dir) as reader:
+        assert reader.read("img-1") == b"NEW"
+
+    compact_index(shard_dir)
+    with ShardReader(shard_dir) as reader:
+        assert reader._tail == []
+        assert reader.read("img-1") == b"NEW"
@@ -0,0 +1,44 @@
+from african_middle_eastern_food_processor import AfricanMiddleEasternFoodProcessor
+from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+from conftest import write_jpeg
+from graph_statistics import MAX_LINKED_IMAGES
+from watch_ingest import WatchIngestor
+
+
+class RecordingPopulator(AfricanMiddleEasternPopulatorFixed):
+    """Populateur dont les mises à jour SPARQL sont gardées au lieu d'être envoyées"""
+
+    def __init__(self):
+        super().__init__()
+        self.updates = []
+
+    def execute_sparql_update(self, query):
+        self.updates.append(query)
+        return True
+
+
+def linked_images(updates, food_name):
+    return sum(query.count(" a :FoodImage") for query in updates if f"#{food_name}>" in query)
+
+
+def test_watch_batches_keep_the_image_cap_and_the_store(tmp_path, image_source):
+    data_dir = tmp_path / "data"
+    processor = AfricanMiddleEasternFoodProcessor(str(data_dir), use_metadata_db=True)
+    processor.process_images(str(image_source))
+
+    populator = RecordingPopulator()
+    ingestor = WatchIngestor(image_source, processor, populator)
+
+    # "Kebda" a déjà 2 images: une seule place reste parmi les images liées
+    new_files = [write_jpeg(image_source / "Kebda" / f"late_{n}.jpg", color=(n, 0, 0)) for n in range(3)]
+    for path in new_files:
+        ingestor.pending[path] = (0.0, path.stat().st_size, 0)
+    assert ingestor.process_batch(new_files) == 3
+
+    assert linked_images(populator.updates, "kebda") == MAX_LINKED_IMAGES - 2
+    assert populator.statistics.foods["kebda"]["images"] == MAX_LINKED_IMAGES
+
+    store = processor.metadata_store
+    assert len(store.category_images("kebda")) == 5
+    assert "kebda" not in store.find_categories(dirty_only=True)
+    processor.close()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Démon de surveillance: ingestion incrémentale des nouvelles images
+
+Surveille <source>/<catégorie>/<image> (inotify via watchdog si installé,
+sinon scrutation périodique du dossier), regroupe les événements par lots
+après un délai de stabilisation, traite uniquement les nouveaux fichiers
+et pousse dans Fuseki les seuls triplets :FoodImage (et les nouveaux plats).
+
+Chaque lot ne touche que ses catégories: les lignes nutritionnelles des
+nouveaux plats sont ajoutées au CSV, les catégories touchées sont mises à
+jour dans la base SQLite (si elle existe, ou avec --metadata-db) et seuls
+leurs triplets partent vers Fuseki, dans la limite de MAX_LINKED_IMAGES
+images par plat comme pour une population complète. L'index JSON, l'index nutritionnel et l'autocomplétion sont
+réécrits ensemble au plus toutes les --flush-interval secondes, et à
+l'arrêt. Après un arrêt brutal, les images non encore inscrites dans
+l'index sont simplement retraitées au démarrage suivant.
+
+Usage:
+    python watch_ingest.py <dossier_source> [--data-dir african_middle_eastern_data]
+                           [--debounce 1.0] [--max-delay 5.0] [--poll-interval 2.0]
+                           [--flush-interval 30.0] [--metadata-db] [--no-push] [--polling]
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+from dataset_audit import IMAGE_EXTENSIONS
+from graph_statistics import GraphStatistics, MAX_LINKED_IMAGES, SUMMARY_FILENAME, load_statistics
+
+# Nombre de tentatives pour une image encore en cours d'écriture
+MAX_ATTEMPTS = 5
+
+# Délai minimal entre deux réécritures complètes des index (s)
+DEFAULT_FLUSH_INTERVAL = 30.0
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, events):
+        self.events = events
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.events.put(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.events.put(event.dest_path)
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.events.put(event.src_path)
+
+
+class PollingWatcher(threading.Thread):
+    """Repli sans inotify: liste les dossiers (os.scandir) et signale les nouveaux fichiers"""
+
+    def __init__(self, source_path, events, interval=2.0):
+        super().__init__(daemon=True)
+        self.source_path = Path(source_path)
+        self.events = events
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._seen = self.snapshot()
+
+    def snapshot(self):
+        seen = set()
+        with os.scandir(self.source_path) as categories:
+            for category in categories:
+                if not category.is_dir():
+                    continue
+                with os.scandir(category.path) as entries:
+                    seen.update(entry.path for entry in entries if entry.is_file())
+        return seen
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            current = self.snapshot()
+            for path in current - self._seen:
+                self.events.put(path)
+            self._seen = current
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class WatchIngestor:
+    def __init__(self, source_dir, processor, populator=None, debounce=1.0, max_delay=5.0,
+                 poll_interval=2.0, force_polling=False, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.source_path = Path(source_dir).absolute()
+        self.processor = processor
+        self.populator = populator
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+        self.flush_interval = flush_interval
+
+        self.events = queue.Queue()
+        self.pending = {}   # chemin → (premier événement, taille vue, tentatives)
+        self.index_file = processor.metadata_dir / "african_middle_eastern_food_index.json"
+        self.organized_data = {}
+        self.known = set()
+        self.dirty = False
+        self.last_flush = time.monotonic()
+        self.load_state()
+        
+        if populator is not None:
+            # Agrégats du graphe déjà chargé, relus depuis le CSV exporté
+            statistics = load_statistics(processor.base_dir, self.organized_data)
+            if statistics is None:
+                # Pas encore d'export: recalcul
+                rows = processor.nutritional_rows(self.organized_data) if self.organized_data else []
+                statistics = GraphStatistics.from_records(
+                    (row, self.organized_data[name]['images'][:MAX_LINKED_IMAGES])
+                    for name, row in zip(self.organized_data, rows)
+                )
+            populator.statistics = statistics
+
+    def load_state(self):
+        """Charger l'index existant: images déjà traitées par (dossier, fichier)"""
+        if self.index_file.exists():
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.organized_data = json.load(f).get('categories', {})
+
+        for category_data in self.organized_data.values():
+            for img in category_data['images']:
+                self.known.add((img['original_category_name'], img['original_filename']))
+
+        print(f"📚 {len(self.known)} images déjà indexées dans {len(self.organized_data)} catégories")
+
+    def catch_up(self):
+        """Mettre en attente les fichiers arrivés pendant que le démon était arrêté"""
+        for category_folder in self.processor.list_category_folders(self.source_path):
+            with os.scandir(category_folder) as entries:
+                for entry in entries:
+                    if entry.is_file() and (category_folder.name, entry.name) not in self.known:
+                        self.events.put(entry.path)
+
+    def _accept(self, path):
+        """Ne garder que les images <source>/<catégorie>/<fichier> non encore traitées"""
+        path = Path(path)
+        try:
+            relative = path.absolute().relative_to(self.source_path)
+        except ValueError:
+            return None
+        if len(relative.parts) != 2 or path.suffix.lower() not in IMAGE_EXTENSIONS:
+            return None
+        if tuple(relative.parts) in self.known:
+            return None
+        return path
+
+    def _drain_events(self, timeout):
+        try:
+            path = self.events.get(timeout=timeout)
+        except queue.Empty:
+            return False
+
+        while True:
+            accepted = self._accept(path)
+            if accepted is not None and accepted not in self.pending:
+                self.pending[accepted] = (time.monotonic(), -1, 0)
+            elif accepted is not None:
+                first_seen, _, attempts = self.pending[accepted]
+                self.pending[accepted] = (first_seen, -1, attempts)
+            try:
+                path = self.events.get_nowait()
+            except queue.Empty:
+                return True
+
+    def _ready_batch(self):
+        """Fichiers dont la taille n'a pas bougé depuis le dernier passage"""
+        ready = []
+        for path, (first_seen, last_size, attempts) in list(self.pending.items()):
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            if size > 0 and size == last_size:
+                ready.append(path)
+            else:
+                self.pending[path] = (first_seen, size, attempts)
+        return ready
+
+    def process_batch(self, paths):
+        """Traiter un lot de nouvelles images et pousser leurs triplets"""
+        new_images = {}
+        new_categories = []
+
+        for path in sorted(paths):
+            original_name = path.parent.name
+            cleaned_name = self.processor.clean_folder_name(original_name)
+
+            category_data = self.organized_data.get(cleaned_name)
+            if category_data is None:
+                category_data = {
+                    'images': [],
+                    'total_images': 0,
+                    'category_info': self.processor.get_food_category_info(cleaned_name),
+                    'original_folder_name': original_name
+                }
+                self.organized_data[cleaned_name] = category_data
+                new_categories.append(cleaned_name)
+
+            image_number = max((img['image_number'] for img in category_data['images']), default=0) + 1
+            image_metadata = self.processor.process_image(path, image_number, cleaned_name, original_name)
+
+            if image_metadata is None:
+                first_seen, _, attempts = self.pending[path]
+                if attempts + 1 >= MAX_ATTEMPTS:
+                    print(f"   ❌ Abandon après {MAX_ATTEMPTS} tentatives: {path}")
+                    self.known.add((original_name, path.name))
+                    del self.pending[path]
+                else:
+                    self.pending[path] = (first_seen, -1, attempts + 1)
+                continue
+
+            category_data['images'].append(image_metadata)
+            category_data['total_images'] = len(category_data['images'])
+            self.known.add((original_name, path.name))
+            del self.pending[path]
+            new_images.setdefault(cleaned_name, []).append(image_metadata)
+
+        if not new_images:
+            return 0
+
+        # Seuls les nouveaux plats ont des lignes à ajouter au CSV
+        rows = {name: self.processor.nutritional_row(name, self.organized_data[name]) for name in new_images}
+        new_rows = [rows[name] for name in new_categories if name in rows]
+        if new_rows:
+            self.processor.append_nutritional_rows(new_rows)
+        self.dirty = True
+
+        store = self.processor.metadata_store
+        if store is not None:
+            store.upsert_categories((name, self.organized_data[name], row) for name, row in rows.items())
+
+        if self.populator is not None:
+            pushed = self.push(new_images, new_rows)
+            if store is not None:
+                store.mark_pushed(pushed)
+
+        count = sum(len(images) for images in new_images.values())
+        print(f"✅ {count} nouvelles images ({', '.join(sorted(new_images))})")
+        return count
+
+    def push(self, new_images, new_rows):
+        """Envoyer à Fuseki les nouveaux plats puis les nouvelles images; retourne les plats acquittés"""
+        failed = set()
+        for row in new_rows:
+            if self.populator.add_food_with_specialization(row, []) is False:
+                failed.add(row['food_name'])
+
+        for food_name, images in new_images.items():
+            # Images déjà liées avant ce lot (au plus MAX_LINKED_IMAGES)
+            linked = min(MAX_LINKED_IMAGES, len(self.organized_data[food_name]['images']) - len(images))
+            if not self.populator.add_food_images(food_name, images, linked):
+                failed.add(food_name)
+                print(f"   ❌ Échec Fuseki pour {food_name}: {self.populator.errors[-1]}")
+        
+        self.populator.publish_statistics(self.processor.metadata_dir / SUMMARY_FILENAME)
+        return [name for name in new_images if name not in failed]
+
+    def flush(self, force=False):
+        """Réécrire l'index JSON et les index dérivés, au plus toutes les flush_interval secondes"""
+        if not self.dirty:
+            return False
+        if not force and time.monotonic() - self.last_flush < self.flush_interval:
+            return False
+
+        self.processor.save_results(self.organized_data)
+        self.dirty = False
+        self.last_flush = time.monotonic()
+        return True
+
+    def start_watcher(self):
+        if Observer is not None and not self.force_polling:
+            observer = Observer()
+            observer.schedule(_EventHandler(self.events), str(self.source_path), recursive=True)
+            observer.start()
+            print("👀 Surveillance inotify (watchdog)")
+            return observer
+
+        watcher = PollingWatcher(self.source_path, self.events, self.poll_interval)
+        watcher.start()
+        print(f"👀 Surveillance par scrutation (toutes les {self.poll_interval}s)")
+        return watcher
+
+    def run(self, stop_event=None):
+        """Boucle principale: regrouper les événements, traiter dès que le lot est stable"""
+        stop_event = stop_event or threading.Event()
+        watcher = self.start_watcher()
+        self.catch_up()
+
+        try:
+            while not stop_event.is_set():
+                got_events = self._drain_events(self.debounce)
+                if not self.pending:
+                    self.flush()
+                    continue
+
+                oldest = min(first_seen for first_seen, _, _ in self.pending.values())
+                # Attendre le calme, sauf si le plus ancien fichier attend depuis trop longtemps
+                if got_events and time.monotonic() - oldest < self.max_delay:
+                    continue
+
+                batch = self._ready_batch()
+                if batch:
+                    self.process_batch(batch)
+                self.flush()
+        except KeyboardInterrupt:
+            print("\n⏹️ Arrêt demandé")
+        finally:
+            watcher.stop()
+            if hasattr(watcher, 'join'):
+                watcher.join(timeout=5)
+            self.flush(force=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestion continue des nouvelles images")
+    parser.add_argument('source', help="Dossier source surveillé (un sous-dossier par catégorie)")
+    parser.add_argument('--data-dir', default="african_middle_eastern_data", help="Dossier de données")
+    parser.add_argument('--debounce', type=float, default=1.0, help="Calme requis avant un lot (s)")
+    parser.add_argument('--max-delay', type=float, default=5.0, help="Attente maximale d'un fichier (s)")
+    parser.add_argument('--poll-interval', type=float, default=2.0, help="Période de scrutation (s)")
+    parser.add_argument('--flush-interval', type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="Délai minimal entre deux réécritures complètes des index (s)")
+    parser.add_argument('--polling', action='store_true', help="Forcer la scrutation au lieu d'inotify")
+    parser.add_argument('--metadata-db', action='store_true',
+                        help="Tenir à jour la base SQLite des métadonnées (automatique si elle existe)")
+    parser.add_argument('--no-push', action='store_true', help="Ne pas envoyer les triplets à Fuseki")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.source):
+        print(f"❌ Le dossier {args.source} n'existe pas!")
+        return 1
+
+    from african_middle_eastern_food_processor import AfricanMiddleEasternFoodProcessor
+    from metadata_store import DB_FILENAME
+
+    use_metadata_db = args.metadata_db or (Path(args.data_dir) / "metadata" / DB_FILENAME).exists()
+    processor = AfricanMiddleEasternFoodProcessor(args.data_dir, use_metadata_db=use_metadata_db)
+    populator = None
+    if not args.no_push:
+        from african_middle_eastern_populator import AfricanMiddleEasternPopulatorFixed
+
+        populator = AfricanMiddleEasternPopulatorFixed()
+        if not populator.test_simple_query():
+            print("❌ Fuseki non accessible (utilisez --no-push pour seulement indexer)")
+            processor.close()
+            return 1
+
+    ingestor = WatchIngestor(
+        args.source, processor, populator,
+        debounce=args.debounce, max_delay=args.max_delay,
+        poll_interval=args.poll_interval, force_polling=args.polling,
+        flush_interval=args.flush_interval
+    )
+    try:
+        ingestor.run()
+    finally:
+        processor.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())